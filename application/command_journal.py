@@ -0,0 +1,354 @@
+"""Command Journal - Ghi nhật ký (write-ahead) các thao tác giữa 2 lần snapshot."""
+
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from application.device_controller import CommandRecorder
+from application.fleet_config import create_device, device_record
+
+
+WRITE_RETRY_SECONDS = 0.5  # Chờ trước khi ghi lại batch bị lỗi
+
+
+class CommandJournal(CommandRecorder):
+    """Journal append-only (JSON lines) cho lệnh điều khiển và thao tác cấu trúc.
+    
+    Thao tác chỉ được đưa vào hàng đợi trong bộ nhớ; 1 thread nền gom các thao
+    tác trong mỗi cửa sổ durability_window rồi ghi + fsync 1 lần (group commit),
+    nên luồng điều khiển không bao giờ chờ fsync. Khi crash, tối đa
+    durability_window giây thao tác cuối có thể bị mất.
+    
+    Khi journal vượt compact_bytes, 1 thread nền đổi file journal sang đoạn mới
+    rồi lưu trạng thái hiện tại thành snapshot; thread ghi tiếp tục group commit
+    vào đoạn mới trong lúc snapshot đang được lưu. Thao tác được replay theo kiểu idempotent
+    (lệnh đặt giá trị tuyệt đối, thêm thiết bị đã có/xóa thiết bị không có
+    được bỏ qua), nên replay lại thao tác đã nằm trong snapshot là vô hại.
+    """
+    
+    def __init__(self, path: str, snapshot_path: str, durability_window: float = 0.05,
+                 compact_bytes: int = 4 * 1024 * 1024):
+        """Khởi tạo journal (chưa ghi cho tới khi open()).
+        
+        Args:
+            path: Đường dẫn file journal
+            snapshot_path: File snapshot dùng khi nén journal
+            durability_window: Khoảng thời gian tối đa (giây) trước khi thao tác được fsync
+            compact_bytes: Kích thước journal (byte) kích hoạt nén thành snapshot
+        """
+        self.path = path
+        self.compacting_path = path + '.1'  # Đoạn journal đang được nén vào snapshot
+        self.snapshot_path = snapshot_path
+        self.durability_window = durability_window
+        self.compact_bytes = compact_bytes
+        self.controller = None
+        
+        self._cond = threading.Condition()
+        self._pending: List[Dict[str, Any]] = []  # Thao tác chờ ghi
+        self._recorded = 0  # Số thao tác đã nhận
+        self._durable = 0  # Số thao tác đã fsync
+        self._urgent = False  # flush()/close() đang chờ - không gom thêm
+        self._closed = False
+        self._error: Optional[OSError] = None  # Lỗi ghi gần nhất (xóa khi ghi lại được)
+        self._lost = 0  # Số thao tác bỏ khi đóng mà vẫn không ghi được
+        
+        self._file_lock = threading.Lock()  # Thread ghi vs. xoay file khi nén
+        self._compact_lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._writer: Optional[threading.Thread] = None
+        self._compactor: Optional[threading.Thread] = None
+    
+    # Startup
+    
+    def open(self, controller) -> int:
+        """Replay journal lên controller rồi bắt đầu ghi các thao tác mới.
+        
+        Gọi sau khi đã nạp snapshot.
+        
+        Args:
+            controller: DeviceController instance
+        
+        Returns:
+            Số thao tác đã replay
+        """
+        replayed = 0
+        for path in (self.compacting_path, self.path):
+            if os.path.exists(path):
+                replayed += self._replay_file(path, controller)
+        if replayed:
+            print(f"📜 Đã replay {replayed} thao tác từ journal")
+        
+        self.controller = controller
+        self._file = open(self.path, 'ab')
+        self._size = self._file.tell()
+        self._writer = threading.Thread(target=self._run_writer, name="CommandJournal", daemon=True)
+        self._writer.start()
+        controller.register_command_recorder(self)
+        
+        if os.path.exists(self.compacting_path):
+            # Lần nén trước bị gián đoạn trước khi kịp lưu snapshot
+            self._start_compaction()
+        return replayed
+    
+    def _replay_file(self, path: str, controller) -> int:
+        """Replay 1 file journal.
+        
+        Dòng cuối bị ghi dở (crash giữa chừng) được cắt bỏ để các lần ghi
+        sau không nối vào dòng hỏng.
+        
+        Returns:
+            Số thao tác đã replay
+        """
+        replayed = 0
+        commands = []  # Lệnh điều khiển liên tiếp được gửi thành 1 batch
+        good_end = 0
+        
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("dòng ghi dở")
+                    entry = json.loads(line)
+                except ValueError:
+                    print(f"⚠️ Journal {os.path.basename(path)}: bỏ qua phần ghi dở ở cuối file")
+                    break
+                good_end += len(line)
+                replayed += 1
+                
+                if entry["op"] == "control":
+                    commands.append((entry["device_id"], entry["command"], entry.get("params")))
+                    continue
+                if commands:
+                    controller.control_devices(commands)
+                    commands = []
+                self._apply_structural(entry, controller)
+        
+        if commands:
+            controller.control_devices(commands)
+        if good_end != os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(good_end)
+        return replayed
+    
+    @staticmethod
+    def _apply_structural(entry: Dict[str, Any], controller):
+        """Áp dụng 1 thao tác cấu trúc khi replay."""
+        op = entry["op"]
+        if op == "add":
+            for record in entry["devices"]:
+                try:
+                    device = create_device(record)
+                except (ValueError, TypeError) as e:
+                    print(f"❌ Journal: bản ghi thiết bị không hợp lệ: {e}")
+                    continue
+                if device.device_id not in controller.devices:
+                    controller.add_device(device)
+        elif op == "remove":
+            controller.remove_devices(entry["device_ids"])
+        elif op == "rename_room":
+            controller.rename_room(entry["old"], entry["new"], entry.get("ids"))
+        else:
+            print(f"❌ Journal: thao tác không hợp lệ: {op}")
+    
+    # CommandRecorder
+    
+    def record_command(self, device_id: str, command: str, params: Optional[Dict]):
+        """Ghi 1 lệnh điều khiển đã thực thi."""
+        self._append({"op": "control", "device_id": device_id, "command": command,
+                      "params": dict(params) if params else None})
+    
+    def record_devices_added(self, devices: List):
+        """Ghi các thiết bị vừa thêm (kèm trạng thái đầy đủ)."""
+        self._append({"op": "add", "devices": [device_record(device) for device in devices]})
+    
+    def record_devices_removed(self, devices: List):
+        """Ghi các thiết bị vừa xóa."""
+        self._append({"op": "remove", "device_ids": [device.device_id for device in devices]})
+    
+    def record_room_renamed(self, old_name: str, new_name: str, device_ids: List[str]):
+        """Ghi thao tác đổi tên phòng."""
+        self._append({"op": "rename_room", "old": old_name, "new": new_name, "ids": device_ids})
+    
+    def _append(self, entry: Dict[str, Any]):
+        """Đưa 1 thao tác vào hàng đợi ghi (không chờ I/O)."""
+        entry["ts"] = time.time()
+        with self._cond:
+            if self._closed:
+                return
+            self._pending.append(entry)
+            self._recorded += 1
+            if len(self._pending) == 1:
+                self._cond.notify_all()  # Thread ghi đang ngủ vì hàng đợi rỗng
+    
+    # Group commit
+    
+    def _run_writer(self):
+        """Vòng lặp của thread ghi: gom thao tác theo cửa sổ rồi ghi + fsync 1 lần."""
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # Đã đóng và ghi hết
+                if not self._urgent and not self._closed:
+                    # Gom thêm thao tác; flush()/close() đánh thức sớm
+                    self._cond.wait(self.durability_window)
+                batch, self._pending = self._pending, []
+                batch_end = self._recorded
+                self._urgent = False
+            
+            data = ''.join(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+                           for entry in batch).encode('utf-8')
+            error = None
+            with self._file_lock:
+                try:
+                    self._file.write(data)
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self._size += len(data)
+                except OSError as e:
+                    print(f"❌ Lỗi khi ghi journal: {e}")
+                    error = e
+                    self._discard_partial_write()
+                needs_compaction = self._size >= self.compact_bytes
+            
+            with self._cond:
+                if error is None:
+                    self._durable = batch_end
+                    self._error = None
+                elif self._closed:
+                    # Nobody will retry: close() reports the loss
+                    self._lost += len(batch)
+                    self._error = error
+                else:
+                    # Retry the batch (ahead of newer operations) after a pause
+                    self._pending[:0] = batch
+                    self._error = error
+                self._cond.notify_all()
+            
+            if error is not None and not self._closed:
+                time.sleep(WRITE_RETRY_SECONDS)
+            if needs_compaction:
+                self._start_compaction()
+    
+    def _discard_partial_write(self):
+        """Cắt phần đã ghi dở của batch lỗi khỏi file journal (gọi khi đã giữ _file_lock).
+        
+        Dòng hỏng ở giữa file sẽ chặn replay các dòng sau nó, nên file được mở
+        lại (bỏ buffer chưa ghi) và cắt về kích thước trước batch.
+        """
+        try:
+            self._file.close()
+        except OSError:
+            pass
+        try:
+            os.truncate(self.path, self._size)
+        except OSError as e:
+            print(f"❌ Không cắt được phần ghi dở của journal: {e}")
+        self._file = open(self.path, 'ab')
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Chờ tới khi mọi thao tác đã nhận được fsync.
+        
+        Args:
+            timeout: Thời gian chờ tối đa (giây), None = chờ tới khi xong
+        
+        Returns:
+            True nếu đã ghi xong, False nếu hết thời gian chờ
+        
+        Raises:
+            OSError: Nếu thao tác chưa ghi được vì lỗi ghi file (thread ghi vẫn thử lại)
+        """
+        with self._cond:
+            target = self._recorded
+            self._urgent = True
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._durable >= target or self._error is not None, timeout)
+            if self._durable >= target:
+                return True
+            if self._error is not None:
+                raise OSError(f"Chưa ghi được {target - self._durable} thao tác vào journal: {self._error}")
+            return False
+    
+    # Compaction
+    
+    def _start_compaction(self):
+        """Chạy compact() trên thread nền (bỏ qua nếu đang nén).
+        
+        Lưu snapshot của cả hệ thống có thể mất vài giây, không được chặn
+        thread ghi - nếu không các thao tác mới sẽ không được fsync đúng hạn.
+        """
+        with self._cond:
+            if self._closed or (self._compactor is not None and self._compactor.is_alive()):
+                return
+            self._compactor = threading.Thread(target=self.compact, name="CommandJournalCompactor",
+                                               daemon=True)
+            self._compactor.start()
+    
+    def compact(self):
+        """Lưu trạng thái hiện tại thành snapshot mới và làm rỗng journal.
+        
+        Journal hiện tại được đổi tên thành path.1 trước khi lưu snapshot và
+        chỉ bị xóa sau khi snapshot đã ghi xong, nên crash ở bất kỳ bước nào
+        cũng không mất thao tác.
+        """
+        with self._compact_lock:
+            with self._file_lock:
+                self._file.close()
+                if os.path.exists(self.compacting_path):
+                    # Đoạn cũ chưa nén xong: nối đoạn hiện tại vào sau để giữ thứ tự replay
+                    with open(self.compacting_path, 'ab') as old, open(self.path, 'rb') as current:
+                        old.write(current.read())
+                    os.remove(self.path)
+                else:
+                    os.replace(self.path, self.compacting_path)
+                self._file = open(self.path, 'ab')
+                self._size = 0
+            
+            try:
+                self.controller.save_snapshot(self.snapshot_path)
+            except (OSError, ValueError) as e:
+                print(f"❌ Không nén được journal: {e}")
+                return
+            os.remove(self.compacting_path)
+            print("📜 Đã nén journal vào snapshot")
+    
+    def close(self, compact: bool = False):
+        """Ghi nốt các thao tác đang chờ và dừng thread ghi.
+        
+        Args:
+            compact: Lưu snapshot rồi xóa journal (khi thoát bình thường)
+        
+        Raises:
+            OSError: Nếu có thao tác không ghi được vào journal và cũng không được lưu vào snapshot
+        """
+        if self.controller is not None:
+            self.controller.unregister_command_recorder(self)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join()
+        compactor = self._compactor  # No new compaction can start once closed
+        if compactor is not None:
+            compactor.join()
+        
+        with self._compact_lock:
+            if self._file is not None:
+                self._file.close()
+            saved = False
+            if compact and self.controller is not None:
+                try:
+                    self.controller.save_snapshot(self.snapshot_path)
+                    saved = True
+                except (OSError, ValueError) as e:
+                    print(f"❌ Không nén được journal: {e}")
+            if saved:
+                for path in (self.compacting_path, self.path):
+                    if os.path.exists(path):
+                        os.remove(path)
+            elif self._lost:
+                # The snapshot would have covered them; without it they are gone
+                raise OSError(f"Mất {self._lost} thao tác không ghi được vào journal: {self._error}")
@@ -0,0 +1,142 @@
+"""Command Stream - Gửi lệnh cho điều khiển liên tục (slider) có giới hạn tần suất."""
+
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def _thread_scheduler(delay: float, callback: Callable[[], None]) -> threading.Timer:
+    """Scheduler mặc định: chạy callback sau delay giây trên 1 thread Timer."""
+    timer = threading.Timer(delay, callback)
+    timer.daemon = True
+    timer.start()
+    return timer
+
+
+def _thread_cancel(timer: threading.Timer):
+    """Hủy lần hẹn của scheduler mặc định."""
+    timer.cancel()
+
+
+class CommandStream:
+    """Luồng lệnh last-value-wins cho các điều khiển liên tục.
+    
+    Mỗi thiết bị nhận tối đa max_rate lệnh mỗi giây. Giá trị gửi tới trong
+    khoảng chờ chỉ ghi đè giá trị đang chờ (theo từng lệnh), và giá trị cuối
+    cùng luôn được gửi khi hết khoảng chờ - nên kéo slider chỉ tạo ra vài
+    lệnh thay vì 1 lệnh cho mỗi pixel.
+    
+    Thời điểm gửi gần nhất chỉ được giữ trong lúc đang kéo: flush() (thả
+    slider) và lần hẹn cuối không còn gì để gửi sẽ xóa nó, các mục đã quá
+    khoảng chờ được dọn định kỳ.
+    """
+    
+    PRUNE_MIN = 256  # Số mục _last_sent tối thiểu trước khi dọn mục cũ
+    
+    def __init__(self, controller, max_rate: float = 10.0,
+                 scheduler: Optional[Callable[[float, Callable[[], None]], Any]] = None,
+                 cancel: Optional[Callable[[Any], None]] = None):
+        """Khởi tạo command stream.
+        
+        Args:
+            controller: DeviceController instance
+            max_rate: Số lệnh tối đa mỗi giây cho 1 thiết bị
+            scheduler: Hàm (delay, callback) -> handle để hẹn gửi giá trị đang chờ,
+                mặc định dùng threading.Timer (GUI nên truyền hàm dựa trên after())
+            cancel: Hàm hủy handle do scheduler trả về (VD: after_cancel)
+        """
+        self.controller = controller
+        self.interval = 1.0 / max_rate
+        if scheduler is None:
+            scheduler, cancel = _thread_scheduler, _thread_cancel
+        self._schedule = scheduler
+        self._cancel = cancel
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Optional[Dict]]] = {}  # {device_id: {command: params}}
+        self._last_sent: Dict[str, float] = {}  # {device_id: time.monotonic() lúc gửi gần nhất}
+        self._scheduled: Dict[str, Tuple[object, Any]] = {}  # {device_id: (token, handle) của lần hẹn flush}
+        self._prune_at = self.PRUNE_MIN
+        self.submitted = 0
+        self.sent = 0
+    
+    def submit(self, device_id: str, command: str, params: Optional[Dict] = None):
+        """Gửi (hoặc xếp chờ) 1 giá trị mới của lệnh.
+        
+        Args:
+            device_id: ID của thiết bị
+            command: Lệnh (VD: set_brightness)
+            params: Tham số của lệnh
+        """
+        with self._lock:
+            self.submitted += 1
+            self._pending.setdefault(device_id, {})[command] = params
+            
+            wait = self._last_sent.get(device_id, float('-inf')) + self.interval - time.monotonic()
+            if wait > 0:
+                if device_id not in self._scheduled:
+                    token = object()
+                    handle = self._schedule(wait, lambda: self._on_scheduled(device_id, token))
+                    self._scheduled[device_id] = (token, handle)
+                return
+        
+        self._send(device_id)
+    
+    def flush(self, device_id: Optional[str] = None):
+        """Gửi ngay các giá trị đang chờ (VD: khi thả slider) và kết thúc lượt kéo.
+        
+        Args:
+            device_id: Chỉ gửi cho thiết bị này, None = tất cả
+        """
+        with self._lock:
+            device_ids = [device_id] if device_id is not None else list(self._pending)
+        for pending_id in device_ids:
+            self._send(pending_id)
+            with self._lock:
+                if pending_id not in self._pending:
+                    self._last_sent.pop(pending_id, None)
+    
+    def _on_scheduled(self, device_id: str, token: object):
+        """Lần hẹn tới hạn: gửi giá trị đang chờ, hoặc dọn thiết bị nếu không còn gì."""
+        with self._lock:
+            scheduled = self._scheduled.get(device_id)
+            if scheduled is None or scheduled[0] is not token:
+                return  # Cancelled or superseded by a send in the meantime
+            del self._scheduled[device_id]
+            if device_id not in self._pending:
+                self._last_sent.pop(device_id, None)
+                return
+        self._send(device_id)
+    
+    def _send(self, device_id: str):
+        """Gửi các giá trị đang chờ của 1 thiết bị (hủy lần hẹn đang chờ nếu có)."""
+        with self._lock:
+            pending = self._pending.pop(device_id, None)
+            if not pending:
+                return
+            scheduled = self._scheduled.pop(device_id, None)
+            if scheduled is not None and self._cancel is not None:
+                self._cancel(scheduled[1])
+            now = time.monotonic()
+            self._last_sent[device_id] = now
+            self.sent += len(pending)
+            if len(self._last_sent) >= self._prune_at:
+                self._prune(now)
+        
+        if len(pending) == 1:
+            command, params = next(iter(pending.items()))
+            self.controller.control_device(device_id, command, params)
+        else:
+            self.controller.control_devices(
+                [(device_id, command, params) for command, params in pending.items()]
+            )
+    
+    def _prune(self, now: float):
+        """Bỏ các mục _last_sent đã quá khoảng chờ (gọi khi đã giữ lock).
+        
+        Ngưỡng dọn tiếp theo gấp đôi số mục còn lại, nên chi phí được chia đều.
+        """
+        cutoff = now - self.interval
+        for device_id in [d for d, sent_at in self._last_sent.items()
+                          if sent_at <= cutoff and d not in self._scheduled]:
+            del self._last_sent[device_id]
+        self._prune_at = max(self.PRUNE_MIN, 2 * len(self._last_sent))
@@ -1,7 +1,9 @@
 """Device Controller - Quản lý tập trung tất cả thiết bị."""
 
-from typing import Dict, List, Optional, Any
+import os
+from typing import Dict, List, Optional, Any, Iterable, Tuple
 from abc import ABC, abstractmethod
+from application.device_snapshot import DEVICE_TYPES, read_snapshot, write_snapshot
 
 
 class Observer(ABC):
@@ -19,6 +21,95 @@ class Observer(ABC):
             device_id: ID của thiết bị đã thay đổi
         """
         pass
+    
+    def update_batch(self, device_ids: List[str]):
+        """Gọi khi nhiều thiết bị thay đổi trong cùng một lần gửi lệnh (batch).
+        
+        Mặc định gọi update() cho từng thiết bị. Các observer có thể
+        override để gộp việc cập nhật (VD: chỉ vẽ lại status bar 1 lần).
+        
+        Args:
+            device_ids: Danh sách ID các thiết bị đã thay đổi (không trùng lặp)
+        """
+        for device_id in device_ids:
+            self.update(device_id)
+    
+    def on_devices_added(self, device_ids: List[str]):
+        """Gọi khi có thiết bị mới được thêm vào hệ thống (mặc định không làm gì).
+        
+        Args:
+            device_ids: Danh sách ID các thiết bị vừa thêm
+        """
+        pass
+    
+    def on_devices_removed(self, device_ids: List[str]):
+        """Gọi khi thiết bị bị xóa khỏi hệ thống (mặc định không làm gì).
+        
+        Được gọi trước update()/update_batch() để observer kịp dọn dữ liệu
+        liên quan tới thiết bị (VD: timers).
+        
+        Args:
+            device_ids: Danh sách ID các thiết bị vừa xóa
+        """
+        pass
+
+
+class CommandRecorder(ABC):
+    """Interface nhận các thao tác đã thực hiện thành công trên controller.
+    
+    Khác với Observer (chỉ biết thiết bị nào đã thay đổi), recorder nhận
+    đúng lệnh/thao tác đã chạy - dùng cho journal, lịch sử, undo...
+    Chỉ thao tác thành công mới được ghi.
+    """
+    
+    @abstractmethod
+    def record_command(self, device_id: str, command: str, params: Optional[Dict]):
+        """Gọi sau khi 1 lệnh điều khiển thực thi thành công.
+        
+        Args:
+            device_id: ID của thiết bị
+            command: Lệnh đã thực thi
+            params: Tham số của lệnh
+        """
+        pass
+    
+    def record_commands(self, commands: List[Tuple[str, str, Optional[Dict]]]):
+        """Gọi sau 1 lần gửi lệnh batch với các lệnh đã thực thi thành công.
+        
+        Mặc định gọi record_command() cho từng lệnh. Recorder có thể override
+        để xử lý cả batch như 1 thao tác (VD: undo).
+        
+        Args:
+            commands: List các tuple (device_id, command, params) theo thứ tự thực thi
+        """
+        for device_id, command, params in commands:
+            self.record_command(device_id, command, params)
+    
+    def record_devices_added(self, devices: List):
+        """Gọi sau khi thiết bị được thêm vào hệ thống (mặc định không làm gì).
+        
+        Args:
+            devices: Các đối tượng thiết bị vừa thêm
+        """
+        pass
+    
+    def record_devices_removed(self, devices: List):
+        """Gọi sau khi thiết bị bị xóa khỏi hệ thống (mặc định không làm gì).
+        
+        Args:
+            devices: Các đối tượng thiết bị vừa xóa
+        """
+        pass
+    
+    def record_room_renamed(self, old_name: str, new_name: str, device_ids: List[str]):
+        """Gọi sau khi đổi tên phòng (mặc định không làm gì).
+        
+        Args:
+            old_name: Tên phòng cũ
+            new_name: Tên phòng mới
+            device_ids: ID các thiết bị đã được chuyển sang tên mới
+        """
+        pass
 
 
 class DeviceController:
@@ -44,6 +135,11 @@ class DeviceController:
         
         self.devices: Dict[str, Any] = {}  # {device_id: device_object}
         self.observers: List[Observer] = []  # Danh sách observers
+        self.command_recorders: List[CommandRecorder] = []  # Journal, lịch sử...
+        
+        # Index phụ để tra cứu nhanh theo phòng/loại (dict dùng như ordered set)
+        self._room_index: Dict[str, Dict[str, None]] = {}  # {room: {device_id: None}}
+        self._type_index: Dict[str, Dict[str, None]] = {}  # {device_type: {device_id: None}}
         self._initialized = True
         print("✅ DeviceController đã khởi tạo (Singleton)")
     
@@ -61,9 +157,43 @@ class DeviceController:
             return False
         
         self.devices[device.device_id] = device
+        self._index_device(device)
         print(f"✅ Đã thêm thiết bị: {device}")
+        self._record('record_devices_added', [device])
+        self.notify_structure_changed(added=[device.device_id])
         return True
     
+    def add_devices(self, devices: Iterable) -> int:
+        """Thêm nhiều thiết bị cùng lúc, observers chỉ được thông báo 1 lần.
+        
+        Args:
+            devices: Các đối tượng thiết bị (ID đã tồn tại được bỏ qua)
+            
+        Returns:
+            Số thiết bị đã thêm
+        """
+        added = self._insert_devices(devices)
+        if added:
+            print(f"✅ Đã thêm {len(added)} thiết bị")
+            if self.command_recorders:
+                self._record('record_devices_added', [self.devices[device_id] for device_id in added])
+            self.notify_structure_changed(added=added)
+        return len(added)
+    
+    def generate_device_id(self, device_type: str) -> str:
+        """Tạo ID chưa dùng dạng "<loại>_<số thứ tự>" (VD: light_004).
+        
+        Args:
+            device_type: Loại thiết bị
+            
+        Returns:
+            ID mới
+        """
+        number = len(self._type_index.get(device_type, ())) + 1
+        while f"{device_type}_{number:03d}" in self.devices:
+            number += 1
+        return f"{device_type}_{number:03d}"
+    
     def remove_device(self, device_id: str) -> bool:
         """Xóa thiết bị khỏi hệ thống.
         
@@ -78,10 +208,151 @@ class DeviceController:
             return False
         
         device = self.devices.pop(device_id)
+        self._unindex_device(device)
         print(f"🗑️ Đã xóa thiết bị: {device.name}")
+        self._record('record_devices_removed', [device])
+        self.notify_structure_changed(removed=[device_id])
         self.notify_observers(device_id)
         return True
     
+    def remove_devices(self, device_ids: Iterable[str]) -> int:
+        """Xóa nhiều thiết bị cùng lúc, observers chỉ được thông báo 1 lần.
+        
+        Args:
+            device_ids: Các ID thiết bị cần xóa (ID không tồn tại được bỏ qua)
+            
+        Returns:
+            Số thiết bị đã xóa
+        """
+        removed = []
+        removed_devices = []
+        for device_id in device_ids:
+            device = self.devices.pop(device_id, None)
+            if device is None:
+                continue
+            self._unindex_device(device)
+            removed.append(device_id)
+            removed_devices.append(device)
+        
+        if removed:
+            print(f"🗑️ Đã xóa {len(removed)} thiết bị")
+            self._record('record_devices_removed', removed_devices)
+            self.notify_structure_changed(removed=removed)
+            self.notify_observers_batch(removed)
+        
+        return len(removed)
+    
+    def rename_room(self, old_name: str, new_name: str, device_ids: Optional[Iterable[str]] = None) -> int:
+        """Đổi tên phòng cho tất cả thiết bị trong phòng.
+        
+        Args:
+            old_name: Tên phòng cũ
+            new_name: Tên phòng mới
+            device_ids: Chỉ chuyển các thiết bị này (mặc định: cả phòng)
+            
+        Returns:
+            Số thiết bị đã được cập nhật
+        """
+        room_ids = self._room_index.get(old_name, {})
+        if device_ids is None:
+            device_ids = list(room_ids)
+        else:
+            device_ids = [device_id for device_id in device_ids if device_id in room_ids]
+        if not device_ids or old_name == new_name:
+            return 0
+        
+        for device_id in device_ids:
+            device = self.devices[device_id]
+            self._unindex_device(device)
+            device.room = new_name
+            self._index_device(device)
+        
+        print(f"✏️ Đã đổi tên phòng: '{old_name}' → '{new_name}' ({len(device_ids)} thiết bị)")
+        self._record('record_room_renamed', old_name, new_name, device_ids)
+        self.notify_observers_batch(device_ids)
+        return len(device_ids)
+    
+    def save_snapshot(self, path: str) -> int:
+        """Lưu trạng thái tất cả thiết bị ra file snapshot nhị phân.
+        
+        Args:
+            path: Đường dẫn file snapshot
+            
+        Returns:
+            Số thiết bị đã lưu
+        """
+        # list() copies under the GIL, so commands from other threads can't break the iteration
+        count = write_snapshot(path, list(self.devices.values()))
+        print(f"💾 Đã lưu snapshot {count} thiết bị → {os.path.basename(path)}")
+        return count
+    
+    def load_snapshot(self, path: str) -> int:
+        """Nạp thiết bị từ file snapshot, observers chỉ được thông báo 1 lần.
+        
+        Thiết bị có ID đã tồn tại được bỏ qua (giống add_device).
+        
+        Args:
+            path: Đường dẫn file snapshot
+            
+        Returns:
+            Số thiết bị đã thêm
+            
+        Raises:
+            ValueError: Nếu file không phải snapshot hợp lệ
+        """
+        added = self._insert_devices(read_snapshot(path))
+        print(f"📦 Đã nạp {len(added)} thiết bị từ snapshot {os.path.basename(path)}")
+        if added:
+            if self.command_recorders:
+                self._record('record_devices_added', [self.devices[device_id] for device_id in added])
+            self.notify_structure_changed(added=added)
+        return len(added)
+    
+    def _insert_devices(self, devices: Iterable) -> List[str]:
+        """Thêm thiết bị vào dict và index, bỏ qua ID đã tồn tại (không notify).
+        
+        Returns:
+            ID các thiết bị đã thêm
+        """
+        added = []
+        existing = self.devices
+        # Same as _index_device, inlined: this loop runs once per device in bulk loads
+        room_index = self._room_index
+        type_index = self._type_index
+        for device in devices:
+            device_id = device.device_id
+            if device_id in existing:
+                continue
+            existing[device_id] = device
+            
+            room_ids = room_index.get(device.room)
+            if room_ids is None:
+                room_ids = room_index[device.room] = {}
+            room_ids[device_id] = None
+            device_type = DEVICE_TYPES.get(type(device)) or device.get_status()['device_type']
+            type_ids = type_index.get(device_type)
+            if type_ids is None:
+                type_ids = type_index[device_type] = {}
+            type_ids[device_id] = None
+            added.append(device_id)
+        return added
+    
+    def _index_device(self, device):
+        """Thêm thiết bị vào index phòng/loại."""
+        device_type = device.get_status()['device_type']
+        self._room_index.setdefault(device.room, {})[device.device_id] = None
+        self._type_index.setdefault(device_type, {})[device.device_id] = None
+    
+    def _unindex_device(self, device):
+        """Xóa thiết bị khỏi index phòng/loại."""
+        for index, key in ((self._room_index, device.room),
+                           (self._type_index, device.get_status()['device_type'])):
+            ids = index.get(key)
+            if ids is not None:
+                ids.pop(device.device_id, None)
+                if not ids:
+                    del index[key]
+    
     def control_device(self, device_id: str, command: str, params: Optional[Dict] = None) -> bool:
         """Điều khiển thiết bị.
         
@@ -90,6 +361,55 @@ class DeviceController:
             command: Lệnh điều khiển (turn_on, turn_off, set_brightness, v.v.)
             params: Tham số bổ sung (VD: {"brightness": 80})
             
+        Returns:
+            True nếu thành công, False nếu thất bại
+        """
+        result = self._execute_command(device_id, command, params)
+        
+        # Notify observers if command succeeded
+        if result:
+            self._record('record_command', device_id, command, params)
+            self.notify_observers(device_id)
+        
+        return result
+    
+    def control_devices(self, commands: Iterable[Tuple[str, str, Optional[Dict]]]) -> List[bool]:
+        """Điều khiển nhiều thiết bị trong một lần gửi lệnh (batch).
+        
+        Các lệnh được thực thi tuần tự, sau đó observers chỉ được thông báo
+        một lần cho toàn bộ các thiết bị đã thay đổi.
+        
+        Args:
+            commands: Iterable các tuple (device_id, command, params)
+            
+        Returns:
+            List kết quả True/False theo đúng thứ tự các lệnh
+        """
+        results = []
+        changed: Dict[str, None] = {}  # dict giữ thứ tự, loại trùng lặp
+        executed = []
+        
+        for device_id, command, params in commands:
+            result = self._execute_command(device_id, command, params)
+            results.append(result)
+            if result:
+                changed[device_id] = None
+                executed.append((device_id, command, params))
+        
+        if changed:
+            self._record('record_commands', executed)
+            self.notify_observers_batch(list(changed))
+        
+        return results
+    
+    def _execute_command(self, device_id: str, command: str, params: Optional[Dict] = None) -> bool:
+        """Thực thi lệnh trên thiết bị (không notify observers).
+        
+        Args:
+            device_id: ID của thiết bị
+            command: Lệnh điều khiển
+            params: Tham số bổ sung
+            
         Returns:
             True nếu thành công, False nếu thất bại
         """
@@ -147,10 +467,6 @@ class DeviceController:
                 print(f"❌ Lệnh không hợp lệ: {command}")
                 return False
             
-            # Notify observers if command succeeded
-            if result:
-                self.notify_observers(device_id)
-            
             return result
             
         except Exception as e:
@@ -199,7 +515,7 @@ class DeviceController:
         Returns:
             List các thiết bị trong phòng đó
         """
-        return [device for device in self.devices.values() if device.room == room]
+        return [self.devices[device_id] for device_id in self._room_index.get(room, {})]
     
     def get_devices_by_type(self, device_type: str) -> List:
         """Lấy tất cả thiết bị theo loại.
@@ -210,10 +526,37 @@ class DeviceController:
         Returns:
             List các thiết bị cùng loại
         """
-        return [
-            device for device in self.devices.values()
-            if device.get_status().get('device_type') == device_type
-        ]
+        return [self.devices[device_id] for device_id in self._type_index.get(device_type, {})]
+    
+    def get_device_ids_by_room(self, room: str) -> List[str]:
+        """Lấy ID các thiết bị trong một phòng (tra index).
+        
+        Args:
+            room: Tên phòng
+            
+        Returns:
+            List ID thiết bị
+        """
+        return list(self._room_index.get(room, {}))
+    
+    def get_device_ids_by_type(self, device_type: str) -> List[str]:
+        """Lấy ID các thiết bị theo loại (tra index).
+        
+        Args:
+            device_type: Loại thiết bị ('light', 'fan', 'door')
+            
+        Returns:
+            List ID thiết bị
+        """
+        return list(self._type_index.get(device_type, {}))
+    
+    def get_rooms(self) -> List[str]:
+        """Lấy danh sách phòng đang có thiết bị.
+        
+        Returns:
+            List tên phòng đã sắp xếp
+        """
+        return sorted(self._room_index)
     
     # Observer Pattern Methods
     
@@ -237,6 +580,39 @@ class DeviceController:
             self.observers.remove(observer)
             print(f"👁️ Đã hủy đăng ký observer: {observer.__class__.__name__}")
     
+    def register_command_recorder(self, recorder: CommandRecorder):
+        """Đăng ký recorder nhận các thao tác đã thực hiện.
+        
+        Args:
+            recorder: Đối tượng implement CommandRecorder interface
+        """
+        if recorder not in self.command_recorders:
+            self.command_recorders.append(recorder)
+            print(f"📝 Đã đăng ký recorder: {recorder.__class__.__name__}")
+    
+    def unregister_command_recorder(self, recorder: CommandRecorder):
+        """Hủy đăng ký recorder.
+        
+        Args:
+            recorder: Đối tượng cần hủy đăng ký
+        """
+        if recorder in self.command_recorders:
+            self.command_recorders.remove(recorder)
+            print(f"📝 Đã hủy đăng ký recorder: {recorder.__class__.__name__}")
+    
+    def _record(self, method: str, *args):
+        """Gửi 1 thao tác đã thực hiện tới tất cả recorders.
+        
+        Args:
+            method: Tên phương thức của CommandRecorder
+            *args: Tham số của phương thức
+        """
+        for recorder in self.command_recorders:
+            try:
+                getattr(recorder, method)(*args)
+            except Exception as e:
+                print(f"❌ Lỗi khi ghi thao tác vào {recorder.__class__.__name__}: {e}")
+    
     def notify_observers(self, device_id: str):
         """Thông báo cho tất cả observers về sự thay đổi.
         
@@ -249,6 +625,35 @@ class DeviceController:
             except Exception as e:
                 print(f"❌ Lỗi khi notify observer {observer.__class__.__name__}: {e}")
     
+    def notify_structure_changed(self, added: Optional[List[str]] = None,
+                                 removed: Optional[List[str]] = None):
+        """Thông báo cho observers khi thiết bị được thêm/xóa.
+        
+        Args:
+            added: ID các thiết bị vừa thêm
+            removed: ID các thiết bị vừa xóa
+        """
+        for observer in self.observers:
+            try:
+                if added:
+                    observer.on_devices_added(added)
+                if removed:
+                    observer.on_devices_removed(removed)
+            except Exception as e:
+                print(f"❌ Lỗi khi notify observer {observer.__class__.__name__}: {e}")
+    
+    def notify_observers_batch(self, device_ids: List[str]):
+        """Thông báo một lần cho tất cả observers về nhiều thiết bị đã thay đổi.
+        
+        Args:
+            device_ids: Danh sách ID các thiết bị đã thay đổi
+        """
+        for observer in self.observers:
+            try:
+                observer.update_batch(device_ids)
+            except Exception as e:
+                print(f"❌ Lỗi khi notify observer {observer.__class__.__name__}: {e}")
+    
     def get_summary(self) -> Dict[str, Any]:
         """Lấy thông tin tổng quan về hệ thống.
         
@@ -263,7 +668,7 @@ class DeviceController:
             'total_devices': total,
             'devices_on': on_count,
             'devices_off': off_count,
-            'rooms': list(set(d.room for d in self.devices.values())),
+            'rooms': list(self._room_index),
             'observers_count': len(self.observers)
         }
     
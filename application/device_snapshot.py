@@ -0,0 +1,230 @@
+"""Device Snapshot - Lưu/nạp trạng thái thiết bị dạng nhị phân (bản ghi cố định + bảng chuỗi)."""
+
+import gc
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Iterable, List, Optional
+from simulation.base_device import LAST_UPDATE_EPOCH
+from simulation.light_simulator import Light
+from simulation.fan_simulator import Fan
+from simulation.door_simulator import Door
+
+
+MAGIC = b'SHCSNAP\x00'
+VERSION = 1
+
+# magic, version, record_size, device_count, string_count, strings_offset
+HEADER = struct.Struct('<8sHHIIQ')
+# id_ref, name_ref, room_ref, last_update (µs kể từ LAST_UPDATE_EPOCH), type_code, flags, value, door_state
+RECORD = struct.Struct('<IIIqBBBB')
+WRITE_CHUNK = 4096  # Số bản ghi gom lại cho mỗi lần ghi file
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+TYPE_LIGHT = 1
+TYPE_FAN = 2
+TYPE_DOOR = 3
+TYPE_CODES = {Light: TYPE_LIGHT, Fan: TYPE_FAN, Door: TYPE_DOOR}
+DEVICE_TYPES = {Light: 'light', Fan: 'fan', Door: 'door'}  # Class -> device_type (không cần get_status())
+
+FLAG_ON = 0x01
+FLAG_LOCKED = 0x02
+
+DOOR_STATES = (Door.STATE_CLOSED, Door.STATE_OPEN, Door.STATE_LOCKED)
+DOOR_STATE_CODES = {state: code for code, state in enumerate(DOOR_STATES)}
+
+# Chuỗi trong bảng chuỗi được kết thúc bằng NUL, nạp lại bằng 1 lần decode + split
+STRING_TERMINATOR = '\x00'
+
+
+def _timestamp_us(value) -> int:
+    """Đổi last_update (datetime hoặc giá trị µs chưa giải mã) thành µs."""
+    if isinstance(value, datetime):
+        # last_update is naive local time: wall-clock arithmetic is exact and
+        # avoids a slow local-time conversion
+        return (value - LAST_UPDATE_EPOCH) // ONE_MICROSECOND
+    return value
+
+
+def write_snapshot(path: str, devices: Iterable) -> int:
+    """Ghi snapshot của các thiết bị.
+    
+    Bản ghi được ghi tuần tự ra file theo từng khối, bảng chuỗi được ghi song
+    song ra 1 file tạm rồi nối vào cuối - không dựng cấu trúc trung gian cho
+    toàn bộ thiết bị. File được ghi ra path.tmp rồi đổi tên, nên snapshot cũ
+    không bị hỏng khi lỗi.
+    
+    Args:
+        path: Đường dẫn file snapshot
+        devices: Các thiết bị cần lưu
+    
+    Returns:
+        Số thiết bị đã lưu
+    
+    Raises:
+        ValueError: Nếu có thiết bị không hỗ trợ hoặc chuỗi chứa ký tự NUL
+    """
+    tmp_path = path + '.tmp'
+    room_refs = {}  # Tên phòng lặp lại nhiều nên chỉ lưu 1 lần
+    string_count = 0
+    device_count = 0
+    pack = RECORD.pack
+    
+    try:
+        with open(tmp_path, 'wb') as f, tempfile.TemporaryFile() as strings:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, 0, 0, 0))  # Ghi lại khi đã biết số lượng
+            
+            def flush(records: List[bytes], texts: List[str]):
+                chunk = STRING_TERMINATOR.join(texts)
+                if chunk.count(STRING_TERMINATOR) != len(texts) - 1:
+                    raise ValueError("tên/ID/phòng chứa ký tự NUL")
+                strings.write(chunk.encode('utf-8'))
+                strings.write(b'\x00')
+                f.write(b''.join(records))
+                records.clear()
+                texts.clear()
+            
+            records: List[bytes] = []
+            texts: List[str] = []
+            for device in devices:
+                type_code = TYPE_CODES.get(type(device))
+                if type_code is None:
+                    raise ValueError(f"loại thiết bị không hỗ trợ: {device.__class__.__name__}")
+                
+                room_ref = room_refs.get(device.room)
+                if room_ref is None:
+                    room_ref = room_refs[device.room] = string_count
+                    texts.append(device.room)
+                    string_count += 1
+                texts.append(device.device_id)
+                texts.append(device.name)
+                string_count += 2
+                
+                flags = FLAG_ON if device.is_on else 0
+                value = door_state = 0
+                if type_code == TYPE_LIGHT:
+                    value = device.brightness
+                elif type_code == TYPE_FAN:
+                    value = device.speed
+                else:
+                    door_state = DOOR_STATE_CODES[device.state]
+                    if device.is_locked:
+                        flags |= FLAG_LOCKED
+                
+                records.append(pack(string_count - 2, string_count - 1, room_ref,
+                                    _timestamp_us(device._last_update), type_code, flags, value, door_state))
+                device_count += 1
+                if len(records) >= WRITE_CHUNK:
+                    flush(records, texts)
+            if records:
+                flush(records, texts)
+            
+            strings_offset = f.tell()
+            strings.seek(0)
+            shutil.copyfileobj(strings, f)
+            
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, device_count, string_count, strings_offset))
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    return device_count
+
+
+def read_snapshot(path: str) -> List[Any]:
+    """Nạp snapshot qua mmap.
+    
+    Bảng chuỗi được giải mã 1 lần, các bản ghi được unpack thẳng từ mmap và
+    thiết bị được dựng trực tiếp từ trạng thái đã lưu (không qua __init__,
+    last_update được giải mã lười).
+    
+    Args:
+        path: Đường dẫn file snapshot
+    
+    Returns:
+        List thiết bị theo thứ tự đã lưu
+    
+    Raises:
+        ValueError: Nếu file không phải snapshot hợp lệ
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < HEADER.size:
+            raise ValueError("file snapshot quá ngắn")
+        
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, record_size, device_count, string_count, strings_offset = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise ValueError("không phải file snapshot")
+            if version != VERSION or record_size != RECORD.size:
+                raise ValueError(f"phiên bản snapshot không được hỗ trợ: {version}")
+            records_end = HEADER.size + device_count * RECORD.size
+            if records_end != strings_offset or strings_offset > size:
+                raise ValueError("file snapshot bị hỏng")
+            
+            strings = mm[strings_offset:].decode('utf-8').split(STRING_TERMINATOR)
+            if len(strings) != string_count + 1:
+                raise ValueError("bảng chuỗi của snapshot bị hỏng")
+            
+            view = memoryview(mm)
+            records = view[HEADER.size:records_end]
+            # Allocating millions of objects would trigger repeated, useless GC passes
+            gc_was_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                loaded = _build_devices(RECORD.iter_unpack(records), strings)
+            finally:
+                if gc_was_enabled:
+                    gc.enable()
+                records.release()
+                view.release()
+    
+    if loaded is None:
+        raise ValueError("bản ghi snapshot bị hỏng")
+    return loaded
+
+
+def _build_devices(records, strings: List[str]) -> Optional[List[Any]]:
+    """Dựng thiết bị từ các bản ghi đã unpack.
+    
+    Lỗi được báo bằng None thay vì exception: traceback sẽ giữ iterator
+    trên mmap và khiến mmap không đóng được.
+    """
+    new = object.__new__
+    loaded = []
+    append = loaded.append
+    
+    try:
+        for id_ref, name_ref, room_ref, stamp, type_code, flags, value, door_state in records:
+            if type_code == TYPE_LIGHT:
+                device = new(Light)
+                device.__dict__ = {
+                    'device_id': strings[id_ref], 'name': strings[name_ref], 'room': strings[room_ref],
+                    'is_on': flags & FLAG_ON != 0, '_last_update': stamp, '_brightness': value
+                }
+            elif type_code == TYPE_FAN:
+                device = new(Fan)
+                device.__dict__ = {
+                    'device_id': strings[id_ref], 'name': strings[name_ref], 'room': strings[room_ref],
+                    'is_on': flags & FLAG_ON != 0, '_last_update': stamp, '_speed': value
+                }
+            elif type_code == TYPE_DOOR:
+                device = new(Door)
+                device.__dict__ = {
+                    'device_id': strings[id_ref], 'name': strings[name_ref], 'room': strings[room_ref],
+                    'is_on': flags & FLAG_ON != 0, '_last_update': stamp,
+                    'state': DOOR_STATES[door_state], 'is_locked': flags & FLAG_LOCKED != 0
+                }
+            else:
+                return None
+            append(device)
+    except IndexError:  # Tham chiếu ngoài bảng chuỗi hoặc trạng thái cửa không hợp lệ
+        return None
+    
+    return loaded
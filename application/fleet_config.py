@@ -0,0 +1,295 @@
+"""Fleet Config - Tạo danh sách thiết bị từ file cấu hình JSON, nhập/xuất thiết bị (JSON Lines, CSV)."""
+
+import csv
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from simulation.light_simulator import Light
+from simulation.fan_simulator import Fan
+from simulation.door_simulator import Door
+from application.schedule_importer import import_schedule, iter_csv_records, iter_json_records
+
+
+# Loại thiết bị trong file cấu hình -> class mô phỏng
+DEVICE_CLASSES = {
+    'light': Light,
+    'fan': Fan,
+    'door': Door
+}
+DEVICE_TYPES = {device_class: device_type for device_type, device_class in DEVICE_CLASSES.items()}
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+# Cột của file CSV xuất/nhập (JSON Lines dùng cùng các key)
+FLEET_FIELDS = ("type", "device_id", "name", "room", "is_on", "brightness", "speed", "state")
+
+
+@dataclass
+class FleetImportReport:
+    """Kết quả nhập thiết bị."""
+    imported: int = 0
+    failed: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (dòng, lỗi), tối đa max_errors
+    max_errors: int = 100
+    
+    def add_error(self, line: int, message: str):
+        """Ghi nhận lỗi của 1 dòng."""
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+
+def _parse_bool(value) -> bool:
+    """Đọc giá trị bool từ JSON (bool) hoặc CSV (chuỗi)."""
+    if isinstance(value, str):
+        return value.strip().lower() in TRUE_VALUES
+    return bool(value)
+
+
+def _parse_level(value, name: str, low: int, high: int) -> int:
+    """Đọc mức độ sáng/tốc độ nguyên trong khoảng [low, high].
+    
+    Raises:
+        ValueError: Nếu giá trị không phải số nguyên hoặc nằm ngoài khoảng
+    """
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError(f"{name} phải là số nguyên: {value}")
+    try:
+        level = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} phải là số nguyên: {value!r}") from None
+    if not low <= level <= high:
+        raise ValueError(f"{name} phải trong khoảng {low}-{high}: {level}")
+    return level
+
+
+def create_device(record: Dict[str, Any]):
+    """Tạo thiết bị từ 1 bản ghi cấu hình.
+    
+    Các key hỗ trợ: type, device_id, name, room, brightness (đèn), speed (quạt),
+    is_on và state (cửa: closed/open/locked). Trạng thái được gán trực tiếp,
+    không qua lệnh điều khiển. is_on của cửa luôn suy ra từ state; bản ghi cửa
+    chỉ có is_on được hiểu là mở (true) hoặc đóng (false).
+    
+    Args:
+        record: Dictionary cấu hình thiết bị
+    
+    Returns:
+        Đối tượng thiết bị
+    
+    Raises:
+        ValueError: Nếu bản ghi không hợp lệ
+    """
+    if not isinstance(record, dict):
+        raise ValueError("bản ghi thiết bị phải là object")
+    
+    device_type = record.get("type")
+    if device_type not in DEVICE_CLASSES:
+        raise ValueError(f"loại thiết bị không hợp lệ: {device_type}")
+    
+    device_id = record.get("device_id")
+    if not device_id:
+        raise ValueError("thiếu device_id")
+    if not isinstance(device_id, str):
+        raise ValueError(f"device_id phải là chuỗi: {device_id!r}")
+    name = record.get("name") or device_id
+    room = record.get("room") or ""
+    
+    if device_type == "light" and record.get("brightness") not in (None, ""):
+        device = Light(device_id, name, room, brightness=_parse_level(record["brightness"], "brightness", 0, 100))
+    elif device_type == "fan" and record.get("speed") not in (None, ""):
+        device = Fan(device_id, name, room,
+                     speed=_parse_level(record["speed"], "speed", min(Fan.SPEED_NAMES), max(Fan.SPEED_NAMES)))
+    else:
+        device = DEVICE_CLASSES[device_type](device_id, name, room)
+    
+    if device_type == "door":
+        state = record.get("state")
+        if state in (None, ""):
+            state = Door.STATE_OPEN if _parse_bool(record.get("is_on") or False) else Door.STATE_CLOSED
+        elif not isinstance(state, str) or state not in Door.STATE_NAMES:
+            raise ValueError(f"trạng thái cửa không hợp lệ: {state}")
+        device.state = state
+        device.is_on = state == Door.STATE_OPEN
+        device.is_locked = state == Door.STATE_LOCKED
+    elif record.get("is_on") not in (None, ""):
+        device.is_on = _parse_bool(record["is_on"])
+    return device
+
+
+def device_record(device) -> Dict[str, Any]:
+    """Tạo bản ghi cấu hình đầy đủ trạng thái của thiết bị (ngược lại của create_device).
+    
+    Args:
+        device: Đối tượng thiết bị
+    
+    Returns:
+        Dictionary bản ghi thiết bị
+    
+    Raises:
+        ValueError: Nếu loại thiết bị không hỗ trợ
+    """
+    device_type = DEVICE_TYPES.get(type(device))
+    if device_type is None:
+        raise ValueError(f"loại thiết bị không hỗ trợ: {device.__class__.__name__}")
+    
+    record = {
+        "type": device_type,
+        "device_id": device.device_id,
+        "name": device.name,
+        "room": device.room,
+        "is_on": device.is_on
+    }
+    if device_type == "light":
+        record["brightness"] = device.brightness
+    elif device_type == "fan":
+        record["speed"] = device.speed
+    else:
+        record["state"] = device.state
+    return record
+
+
+def load_fleet_config(path: str, controller, timer_manager: Optional[Any] = None) -> int:
+    """Nạp cấu hình hệ thống: thêm thiết bị và (tùy chọn) nhập lịch hẹn giờ.
+    
+    File JSON có dạng:
+        {
+            "devices": [{"type": "light", "device_id": "light_001", "name": "...", "room": "..."}],
+            "schedule": "schedule.csv"
+        }
+    Đường dẫn schedule tính tương đối theo thư mục của file cấu hình.
+    
+    Args:
+        path: Đường dẫn file cấu hình
+        controller: DeviceController instance
+        timer_manager: TimerManager instance (cần khi có "schedule")
+    
+    Returns:
+        Số thiết bị đã thêm
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    
+    added = 0
+    for position, record in enumerate(config.get("devices", []), start=1):
+        try:
+            device = create_device(record)
+        except (ValueError, TypeError) as e:
+            print(f"❌ Thiết bị #{position}: {e}")
+            continue
+        if controller.add_device(device):
+            added += 1
+    print(f"📦 Đã nạp {added} thiết bị từ {os.path.basename(path)}")
+    
+    schedule = config.get("schedule")
+    if schedule and timer_manager is not None:
+        import_schedule(os.path.join(os.path.dirname(os.path.abspath(path)), schedule), timer_manager)
+    
+    return added
+
+
+def _fleet_format(path: str) -> str:
+    """Chọn định dạng theo phần mở rộng file: "csv" hoặc "jsonl"."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".json", ".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Định dạng file không hỗ trợ: {extension}")
+
+
+def iter_fleet_records(path: str) -> Iterator[Tuple[int, Any]]:
+    """Đọc bản ghi thiết bị từng dòng một (CSV có header, JSON Lines hoặc mảng JSON).
+    
+    Yields:
+        Tuple (số dòng / vị trí, dictionary dữ liệu hoặc ValueError)
+    """
+    if _fleet_format(path) == "csv":
+        return iter_csv_records(path)
+    return iter_json_records(path)
+
+
+def import_fleet(path: str, controller, batch_size: int = 5000) -> FleetImportReport:
+    """Nhập thiết bị từ file, thêm theo từng batch qua add_devices().
+    
+    Mỗi dòng được kiểm tra ngay khi đọc (create_device, ID trùng) và lỗi được
+    báo theo số dòng; chỉ giữ tối đa batch_size thiết bị chờ thêm.
+    
+    Args:
+        path: Đường dẫn file CSV/JSON Lines
+        controller: DeviceController instance
+        batch_size: Số thiết bị mỗi lần gọi add_devices()
+    
+    Returns:
+        FleetImportReport
+    """
+    report = FleetImportReport()
+    pending: Dict[str, Any] = {}  # {device_id: device} chờ thêm
+    
+    for line, record in iter_fleet_records(path):
+        if isinstance(record, Exception):
+            report.add_error(line, str(record))
+            continue
+        try:
+            device = create_device(record)
+        except (ValueError, TypeError) as e:
+            report.add_error(line, str(e))
+            continue
+        if device.device_id in pending or device.device_id in controller.devices:
+            report.add_error(line, f"device_id đã tồn tại: {device.device_id}")
+            continue
+        pending[device.device_id] = device
+        if len(pending) >= batch_size:
+            report.imported += controller.add_devices(pending.values())
+            pending.clear()
+    if pending:
+        report.imported += controller.add_devices(pending.values())
+    
+    print(f"📥 Nhập thiết bị từ {os.path.basename(path)}: "
+          f"{report.imported} thiết bị, {report.failed} lỗi")
+    return report
+
+
+def export_fleet(path: str, devices: Iterable) -> int:
+    """Xuất thiết bị (kèm phòng và trạng thái) ra file CSV/JSON Lines.
+    
+    Ghi từng dòng ra file tạm, fsync rồi đổi tên, nên file cũ không bao giờ bị
+    ghi dở (kể cả khi crash); lỗi giữa chừng xóa file tạm và giữ nguyên file cũ.
+    File xuất ra nhập lại được bằng import_fleet().
+    
+    Args:
+        path: Đường dẫn file (.csv hoặc .jsonl)
+        devices: Các đối tượng thiết bị
+    
+    Returns:
+        Số thiết bị đã xuất
+    
+    Raises:
+        ValueError: Nếu có thiết bị không hỗ trợ
+        OSError: Nếu không ghi được file
+    """
+    file_format = _fleet_format(path)
+    tmp_path = path + ".tmp"
+    count = 0
+    try:
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            if file_format == "csv":
+                writer = csv.DictWriter(f, fieldnames=FLEET_FIELDS)
+                writer.writeheader()
+                for device in devices:
+                    writer.writerow(device_record(device))
+                    count += 1
+            else:
+                for device in devices:
+                    f.write(json.dumps(device_record(device), ensure_ascii=False) + "\n")
+                    count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    print(f"📤 Đã xuất {count} thiết bị → {os.path.basename(path)}")
+    return count
@@ -0,0 +1,92 @@
+"""Latency Histogram - Histogram bộ nhớ cố định cho đo độ trễ."""
+
+import math
+from typing import Dict, List
+
+
+class LatencyHistogram:
+    """Histogram log-bucket với số bucket cố định.
+    
+    Mỗi bucket rộng hơn bucket trước một tỉ lệ cố định (growth), nên sai số
+    tương đối của percentile luôn nhỏ hơn (growth - 1). Bộ nhớ không phụ thuộc
+    số lượng mẫu đã ghi. Giá trị tính bằng giây.
+    """
+    
+    def __init__(self, min_value: float = 1e-6, max_value: float = 3600.0, growth: float = 1.05):
+        """Khởi tạo histogram.
+        
+        Args:
+            min_value: Giá trị nhỏ nhất phân biệt được (nhỏ hơn được gộp vào bucket 0)
+            max_value: Giá trị lớn nhất (lớn hơn được gộp vào bucket cuối)
+            growth: Tỉ lệ độ rộng giữa 2 bucket liên tiếp
+        """
+        self.min_value = min_value
+        self.growth = growth
+        self._log_growth = math.log(growth)
+        bucket_count = int(math.ceil(math.log(max_value / min_value) / self._log_growth)) + 1
+        self._buckets: List[int] = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, value: float):
+        """Ghi một mẫu (giá trị âm được tính là 0).
+        
+        Args:
+            value: Giá trị (giây)
+        """
+        value = max(0.0, value)
+        if value <= self.min_value:
+            index = 0
+        else:
+            index = min(
+                len(self._buckets) - 1,
+                int(math.log(value / self.min_value) / self._log_growth) + 1
+            )
+        self._buckets[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+    
+    def percentile(self, p: float) -> float:
+        """Tính percentile (xấp xỉ bằng cận trên của bucket).
+        
+        Args:
+            p: Percentile trong khoảng 0-100
+        
+        Returns:
+            Giá trị percentile (giây), 0 nếu chưa có mẫu
+        """
+        if self.count == 0:
+            return 0.0
+        
+        rank = max(1, int(math.ceil(self.count * p / 100.0)))
+        seen = 0
+        for index, bucket in enumerate(self._buckets):
+            seen += bucket
+            if seen >= rank:
+                upper = self.min_value * (self.growth ** index)
+                return min(upper, self.max)
+        return self.max
+    
+    def reset(self):
+        """Xóa toàn bộ mẫu đã ghi."""
+        self._buckets = [0] * len(self._buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def summary(self) -> Dict[str, float]:
+        """Lấy thống kê tóm tắt (đơn vị mili giây).
+        
+        Returns:
+            Dictionary gồm count, mean_ms, p50_ms, p99_ms, max_ms
+        """
+        return {
+            'count': self.count,
+            'mean_ms': (self.total / self.count * 1000) if self.count else 0.0,
+            'p50_ms': self.percentile(50) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000
+        }
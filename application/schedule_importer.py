@@ -0,0 +1,280 @@
+"""Schedule Importer - Nhập lịch hẹn giờ từ file CSV/JSON theo kiểu streaming."""
+
+import csv
+import json
+import math
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from application.timer_manager import MAX_DELAY_SECONDS, MAX_SLACK_SECONDS, TimerSpec, TimerTarget
+
+
+# Cột trong CSV / key trong JSON được map trực tiếp thành params của hành động
+PARAM_FIELDS = ("brightness", "speed")
+
+
+@dataclass
+class ScheduleImportReport:
+    """Kết quả nhập lịch hẹn giờ."""
+    imported: int = 0
+    failed: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)  # (dòng, lỗi), tối đa max_errors
+    max_errors: int = 100
+    
+    def add_error(self, line: int, message: str):
+        """Ghi nhận lỗi của 1 dòng."""
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, message))
+
+
+def parse_timer_record(record: Dict[str, Any], now: Optional[datetime] = None) -> TimerSpec:
+    """Chuyển 1 bản ghi (dòng CSV hoặc object JSON) thành TimerSpec.
+    
+    Các key hỗ trợ:
+        device_id: ID thiết bị (CSV: nhiều ID ngăn cách bằng ';')
+        room, device_type: Bộ chọn nhiều thiết bị
+        action: Hành động
+        delay: Số giây trễ, hoặc at: giờ thực thi "HH:MM[:SS]" (lần tới)
+        slack: Số giây slack
+        brightness, speed, params: Tham số của hành động
+    
+    Args:
+        record: Dictionary dữ liệu thô
+        now: Thời điểm gốc để tính "at"
+    
+    Returns:
+        TimerSpec
+    
+    Raises:
+        ValueError: Nếu bản ghi không hợp lệ
+    """
+    if not isinstance(record, dict):
+        raise ValueError("bản ghi phải là object")
+    
+    action = (record.get("action") or "").strip()
+    if not action:
+        raise ValueError("thiếu action")
+    
+    # Timing
+    if record.get("delay") not in (None, ""):
+        delay_seconds = int(_parse_seconds(record["delay"], "delay", MAX_DELAY_SECONDS))
+    elif record.get("at") not in (None, ""):
+        delay_seconds = _seconds_until(str(record["at"]), now or datetime.now())
+    else:
+        raise ValueError("thiếu delay hoặc at")
+    slack_seconds = _parse_seconds(record.get("slack") or 0, "slack", MAX_SLACK_SECONDS)
+    
+    # Params
+    params = dict(record.get("params") or {})
+    for name in PARAM_FIELDS:
+        if record.get(name) not in (None, ""):
+            params[name] = int(float(record[name]))
+    
+    # Target
+    device_ids = record.get("device_id") or record.get("device_ids") or ()
+    if isinstance(device_ids, str):
+        device_ids = [d.strip() for d in device_ids.split(";") if d.strip()]
+    room = record.get("room") or None
+    device_type = record.get("device_type") or None
+    
+    if len(device_ids) == 1 and room is None and device_type is None:
+        return TimerSpec(action, delay_seconds, device_id=device_ids[0],
+                         params=params or None, slack_seconds=slack_seconds)
+    
+    target = TimerTarget(device_ids=tuple(device_ids), room=room, device_type=device_type)
+    return TimerSpec(action, delay_seconds, target=target,
+                     params=params or None, slack_seconds=slack_seconds)
+
+
+def _parse_seconds(value, name: str, maximum: float) -> float:
+    """Đọc số giây hữu hạn trong khoảng [0, maximum].
+    
+    Raises:
+        ValueError: Nếu không phải số, không hữu hạn hoặc ngoài khoảng
+    """
+    seconds = float(value)
+    if not math.isfinite(seconds):
+        raise ValueError(f"{name} phải là số hữu hạn: {value}")
+    if not 0 <= seconds <= maximum:
+        raise ValueError(f"{name} phải trong khoảng 0-{maximum} giây: {value}")
+    return seconds
+
+
+def _seconds_until(clock: str, now: datetime) -> int:
+    """Tính số giây từ now tới lần kế tiếp của giờ "HH:MM[:SS]"."""
+    parts = [int(p) for p in clock.strip().split(":")]
+    if len(parts) not in (2, 3):
+        raise ValueError(f"giờ không hợp lệ: {clock}")
+    hour, minute, second = (parts + [0])[:3]
+    target = now.replace(hour=hour, minute=minute, second=second, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return max(1, int((target - now).total_seconds()))
+
+
+def iter_csv_records(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Đọc file CSV (có header) từng dòng một.
+    
+    Yields:
+        Tuple (số dòng, dictionary dữ liệu)
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def _element_end(buffer: str, index: int) -> int:
+    """Vị trí dấu ',' hoặc ']' kết thúc phần tử mảng JSON bắt đầu tại index.
+    
+    Bỏ qua ngoặc và dấu phẩy nằm trong chuỗi hoặc object/mảng lồng nhau.
+    
+    Returns:
+        Vị trí dấu kết thúc, -1 nếu buffer chưa chứa hết phần tử
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for position in range(index, len(buffer)):
+        char = buffer[position]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        elif char in "]}" and depth:
+            depth -= 1
+        elif char in ",]" and not depth:
+            return position
+    return -1
+
+
+def iter_json_records(path: str, chunk_size: int = 65536) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Đọc file JSON Lines hoặc 1 mảng JSON lớn mà không nạp cả file vào bộ nhớ.
+    
+    Với mảng JSON, số thứ tự trả về là vị trí phần tử (bắt đầu từ 1).
+    Dòng (JSON Lines) hoặc phần tử (mảng) sai cú pháp được trả về dưới dạng
+    ValueError thay cho dữ liệu, để bên gọi báo lỗi theo dòng và đọc tiếp.
+    
+    Yields:
+        Tuple (số dòng / vị trí, dictionary dữ liệu hoặc ValueError)
+    """
+    with open(path, encoding="utf-8") as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        
+        if first != "[":
+            # JSON Lines: mỗi dòng 1 object
+            f.seek(0)
+            for line_no, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    record = ValueError(f"JSON không hợp lệ: {e.msg}")
+                yield line_no, record
+            return
+        
+        decoder = json.JSONDecoder()
+        buffer = ""
+        index = 0  # Đầu phần tử tiếp theo; buffer chỉ bị cắt khi đọc thêm
+        position = 0
+        eof = False
+        while True:
+            while index < len(buffer) and buffer[index] in " \t\r\n,":
+                index += 1
+            if index < len(buffer) and buffer[index] == "]":
+                return
+            if index < len(buffer):
+                try:
+                    record, after = decoder.raw_decode(buffer, index)
+                except json.JSONDecodeError as e:
+                    end = _element_end(buffer, index)
+                    if end != -1 or eof:
+                        # The element is complete (or the file ended) and still invalid: skip it
+                        position += 1
+                        yield position, ValueError(f"JSON không hợp lệ ở phần tử {position}: {e.msg}")
+                        if end == -1:
+                            return
+                        index = end
+                        continue
+                else:
+                    # A bare number may continue in the next chunk
+                    if after < len(buffer) or eof:
+                        index = after
+                        position += 1
+                        yield position, record
+                        continue
+            elif eof:
+                position += 1
+                yield position, ValueError("Mảng JSON thiếu ']' ở cuối file")
+                return
+            
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[index:] + chunk
+            index = 0
+
+
+def iter_schedule_records(path: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Chọn bộ đọc theo phần mở rộng file (.csv hoặc .json/.jsonl/.ndjson)."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return iter_csv_records(path)
+    if extension in (".json", ".jsonl", ".ndjson"):
+        return iter_json_records(path)
+    raise ValueError(f"Định dạng file không hỗ trợ: {extension}")
+
+
+def import_schedule(path: str, timer_manager, batch_size: int = 5000) -> ScheduleImportReport:
+    """Nhập lịch hẹn giờ từ file, đặt timer theo từng batch qua schedule_timers().
+    
+    Chỉ giữ tối đa batch_size bản ghi trong bộ nhớ tại một thời điểm.
+    
+    Args:
+        path: Đường dẫn file CSV/JSON
+        timer_manager: TimerManager instance
+        batch_size: Số timer mỗi lần gọi schedule_timers()
+    
+    Returns:
+        ScheduleImportReport
+    """
+    report = ScheduleImportReport()
+    specs: List[TimerSpec] = []
+    lines: List[int] = []
+    
+    def flush():
+        timer_ids = timer_manager.schedule_timers(
+            specs, on_error=lambda position, message: report.add_error(lines[position], message)
+        )
+        report.imported += sum(1 for timer_id in timer_ids if timer_id)
+        specs.clear()
+        lines.clear()
+    
+    for line, record in iter_schedule_records(path):
+        if isinstance(record, Exception):
+            report.add_error(line, str(record))
+            continue
+        try:
+            specs.append(parse_timer_record(record))
+            lines.append(line)
+        except (ValueError, TypeError, AttributeError, OverflowError) as e:
+            report.add_error(line, str(e))
+        if len(specs) >= batch_size:
+            flush()
+    if specs:
+        flush()
+    
+    print(f"📥 Nhập lịch hẹn giờ từ {os.path.basename(path)}: "
+          f"{report.imported} timer, {report.failed} lỗi")
+    return report
@@ -0,0 +1,242 @@
+"""SQLite Registry - Bản sao thiết bị và trạng thái trong SQLite để truy vấn."""
+
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from application.device_controller import Observer
+from application.fleet_config import device_record
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    device_id   TEXT PRIMARY KEY,
+    device_type TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    room        TEXT NOT NULL,
+    is_on       INTEGER NOT NULL,
+    brightness  INTEGER,
+    speed       INTEGER,
+    state       TEXT,
+    last_update TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_devices_room ON devices (room);
+CREATE INDEX IF NOT EXISTS idx_devices_type ON devices (device_type);
+CREATE INDEX IF NOT EXISTS idx_devices_is_on ON devices (is_on);
+"""
+
+UPSERT_SQL = """
+INSERT INTO devices (device_id, device_type, name, room, is_on, brightness, speed, state, last_update)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (device_id) DO UPDATE SET
+    device_type = excluded.device_type, name = excluded.name, room = excluded.room,
+    is_on = excluded.is_on, brightness = excluded.brightness, speed = excluded.speed,
+    state = excluded.state, last_update = excluded.last_update
+"""
+DELETE_SQL = "DELETE FROM devices WHERE device_id = ?"
+COLUMNS = ("device_id", "device_type", "name", "room", "is_on", "brightness", "speed", "state", "last_update")
+
+
+class SQLiteRegistry(Observer):
+    """Mirror thiết bị của DeviceController vào SQLite.
+    
+    Dict trong bộ nhớ của controller vẫn là nguồn chính cho luồng điều khiển;
+    observer chỉ đánh dấu thiết bị "bẩn" (O(1), không I/O). 1 thread nền định
+    kỳ đọc trạng thái các thiết bị bẩn và ghi tất cả trong 1 transaction bằng
+    executemany trên câu lệnh đã chuẩn bị - nhiều lệnh cho cùng 1 thiết bị
+    trong 1 chu kỳ chỉ tạo 1 lần ghi.
+    """
+    
+    def __init__(self, path: str, controller, flush_interval: float = 0.5):
+        """Mở database, đồng bộ toàn bộ thiết bị hiện có và bắt đầu theo dõi.
+        
+        Args:
+            path: Đường dẫn file SQLite
+            controller: DeviceController instance
+            flush_interval: Chu kỳ ghi batch (giây)
+        """
+        self.path = path
+        self.controller = controller
+        self.flush_interval = flush_interval
+        
+        # WAL lets queries read while the flush thread writes
+        self._write_conn = sqlite3.connect(path, check_same_thread=False)
+        self._write_conn.execute("PRAGMA journal_mode=WAL")
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_conn.executescript(SCHEMA)
+        self._read_conn = sqlite3.connect(path, check_same_thread=False)
+        self._read_lock = threading.Lock()
+        
+        self._lock = threading.Lock()  # Bảo vệ tập thiết bị bẩn (luồng điều khiển)
+        self._flush_lock = threading.Lock()  # Chỉ 1 lần ghi tại 1 thời điểm
+        self._dirty: Dict[str, None] = {}  # device_id cần upsert
+        self._removed: Dict[str, None] = {}  # device_id cần xóa
+        self._resync = True  # Lần ghi đầu tiên thay toàn bộ bảng
+        self.flush_count = 0
+        self.rows_written = 0
+        self.last_flush_seconds = 0.0
+        
+        self._stop = threading.Event()
+        self._flush_thread = threading.Thread(target=self._run_flusher, name="SQLiteRegistry", daemon=True)
+        self._flush_thread.start()
+        controller.register_observer(self)
+    
+    # Observer
+    
+    def update(self, device_id: str):
+        """Đánh dấu 1 thiết bị cần ghi."""
+        with self._lock:
+            self._dirty[device_id] = None
+    
+    def update_batch(self, device_ids: List[str]):
+        """Đánh dấu nhiều thiết bị cần ghi."""
+        with self._lock:
+            self._dirty.update(dict.fromkeys(device_ids))
+    
+    def on_devices_added(self, device_ids: List[str]):
+        """Thiết bị mới cần được thêm vào database."""
+        with self._lock:
+            for device_id in device_ids:
+                self._removed.pop(device_id, None)
+            self._dirty.update(dict.fromkeys(device_ids))
+    
+    def on_devices_removed(self, device_ids: List[str]):
+        """Thiết bị bị xóa cần được xóa khỏi database."""
+        with self._lock:
+            for device_id in device_ids:
+                self._dirty.pop(device_id, None)
+            self._removed.update(dict.fromkeys(device_ids))
+    
+    # Batched writes
+    
+    def _run_flusher(self):
+        """Vòng lặp của thread ghi."""
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"❌ Lỗi khi ghi SQLite: {e}")
+    
+    def flush(self) -> int:
+        """Ghi ngay các thay đổi đang chờ trong 1 transaction.
+        
+        Returns:
+            Số dòng đã ghi (upsert + xóa)
+        """
+        with self._flush_lock:
+            return self._flush()
+    
+    def _flush(self) -> int:
+        """Ghi các thay đổi đang chờ (gọi khi đã giữ _flush_lock)."""
+        with self._lock:
+            resync = self._resync
+            dirty, self._dirty = self._dirty, {}
+            removed, self._removed = self._removed, {}
+            self._resync = False
+        
+        devices = self.controller.devices
+        if resync:
+            # list() copies under the GIL, so concurrent adds/removes can't break the iteration
+            targets = list(devices.values())
+        else:
+            # get(): a device may be removed concurrently
+            targets = [device for device in map(devices.get, dirty) if device is not None]
+        if not targets and not removed and not resync:
+            return 0
+        
+        started = time.perf_counter()
+        rows = []
+        for device in targets:
+            try:
+                rows.append(self._row(device))
+            except Exception as e:
+                print(f"❌ Bỏ qua thiết bị {device.device_id} khi ghi SQLite: {e}")
+        try:
+            with self._write_conn:  # 1 transaction
+                if resync:
+                    self._write_conn.execute("DELETE FROM devices")
+                self._write_conn.executemany(UPSERT_SQL, rows)
+                self._write_conn.executemany(DELETE_SQL, ((device_id,) for device_id in removed))
+        except sqlite3.Error as e:
+            print(f"❌ Lỗi khi ghi SQLite: {e}")
+            # Rolled back: retry these changes on the next flush
+            with self._lock:
+                self._resync = self._resync or resync
+                for device_id in dirty:
+                    if device_id not in self._removed:
+                        self._dirty[device_id] = None
+                for device_id in removed:
+                    if device_id not in self._dirty:
+                        self._removed[device_id] = None
+            return 0
+        
+        self.flush_count += 1
+        self.rows_written += len(rows) + len(removed)
+        self.last_flush_seconds = time.perf_counter() - started
+        return len(rows) + len(removed)
+    
+    @staticmethod
+    def _row(device) -> tuple:
+        """Chuyển thiết bị thành 1 dòng của bảng devices."""
+        record = device_record(device)
+        return (record["device_id"], record["type"], record["name"], record["room"],
+                int(record["is_on"]), record.get("brightness"), record.get("speed"),
+                record.get("state"), device.last_update.isoformat())
+    
+    # Indexed queries
+    
+    def find_devices(self, room: Optional[str] = None, device_type: Optional[str] = None,
+                     is_on: Optional[bool] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Tìm thiết bị theo phòng/loại/trạng thái (dùng index).
+        
+        Kết quả phản ánh lần ghi gần nhất (trễ tối đa flush_interval giây).
+        
+        Args:
+            room: Lọc theo phòng
+            device_type: Lọc theo loại thiết bị
+            is_on: Lọc theo trạng thái bật/tắt
+            limit: Số dòng tối đa
+        
+        Returns:
+            List dictionary theo các cột của bảng devices
+        """
+        conditions = []
+        params: List[Any] = []
+        for column, value in (("room", room), ("device_type", device_type), ("is_on", is_on)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(int(value) if column == "is_on" else value)
+        
+        sql = "SELECT " + ", ".join(COLUMNS) + " FROM devices"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY device_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        
+        with self._read_lock:
+            rows = self._read_conn.execute(sql, params).fetchall()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+    
+    def count_on_by_room(self) -> Dict[str, int]:
+        """Đếm số thiết bị đang bật theo phòng.
+        
+        Returns:
+            Dictionary {room: số thiết bị đang bật}
+        """
+        with self._read_lock:
+            rows = self._read_conn.execute(
+                "SELECT room, COUNT(*) FROM devices WHERE is_on = 1 GROUP BY room"
+            ).fetchall()
+        return dict(rows)
+    
+    def close(self):
+        """Dừng theo dõi, ghi nốt thay đổi và đóng database."""
+        self.controller.unregister_observer(self)
+        self._stop.set()
+        self._flush_thread.join()
+        self.flush()
+        self._write_conn.close()
+        with self._read_lock:
+            self._read_conn.close()
@@ -0,0 +1,272 @@
+"""State History - Lịch sử thay đổi trạng thái (event sourcing) và truy vấn trạng thái theo thời điểm."""
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from application.device_controller import Observer
+from application.fleet_config import device_record
+
+
+ALL_FIELDS = '*'  # Event thêm/xóa thiết bị: old/new là toàn bộ trạng thái (None = không tồn tại)
+KEY_FIELDS = ('type', 'device_id')  # Không đổi trong vòng đời thiết bị - không ghi event
+
+StateEvent = Tuple[float, str, str, Any, Any]  # (timestamp, device_id, field, old, new)
+
+
+def _apply_event(state: Dict[str, Dict[str, Any]], event: StateEvent):
+    """Áp dụng 1 event lên trạng thái toàn nhà."""
+    _, device_id, field, _, new = event
+    if field == ALL_FIELDS:
+        if new is None:
+            state.pop(device_id, None)
+        else:
+            state[device_id] = dict(new)
+    else:
+        state.setdefault(device_id, {})[field] = new
+
+
+class StateHistory(Observer):
+    """Ghi mọi thay đổi trạng thái thành event và dựng lại trạng thái ở thời điểm bất kỳ.
+    
+    Mỗi event ghi thiết bị, trường, giá trị cũ/mới và thời điểm. Checkpoint
+    (bản sao trạng thái toàn nhà) được tạo định kỳ, nên state_at(t) chỉ cần
+    checkpoint gần nhất trước t cộng với các event sau nó - không bao giờ
+    quét từ đầu lịch sử. Khoảng cách giữa 2 checkpoint ít nhất bằng số thiết
+    bị, nên chi phí chép checkpoint được chia đều O(1) cho mỗi event.
+    """
+    
+    def __init__(self, controller, checkpoint_every: int = 10000, max_events: int = 1000000):
+        """Khởi tạo lịch sử và tạo checkpoint đầu tiên từ trạng thái hiện tại.
+        
+        Args:
+            controller: DeviceController instance
+            checkpoint_every: Số event tối thiểu giữa 2 checkpoint
+            max_events: Số event tối đa giữ lại (bỏ dần các khoảng checkpoint cũ nhất)
+        """
+        self.controller = controller
+        self.checkpoint_every = checkpoint_every
+        self.max_events = max_events
+        
+        self._lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {}  # Trạng thái đã biết gần nhất
+        self._events: List[StateEvent] = []
+        self._times: List[float] = []  # Song song với _events, để bisect theo thời gian
+        self._base = 0  # Số thứ tự (seq) của _events[0] sau khi đã bỏ event cũ
+        self._device_seqs: Dict[str, List[int]] = {}  # {device_id: [seq...]} cho truy vấn 1 thiết bị
+        self._checkpoints: List[Tuple[int, float, Dict[str, Dict[str, Any]]]] = []  # (seq, timestamp, state)
+        self._checkpoint_times: List[float] = []
+        
+        for device in list(controller.devices.values()):
+            self._state[device.device_id] = self._fields(device)
+        with self._lock:
+            self._checkpoint(time.time())
+        controller.register_observer(self)
+    
+    @staticmethod
+    def _fields(device) -> Dict[str, Any]:
+        """Các trường trạng thái được theo dõi của thiết bị."""
+        record = device_record(device)
+        for key in KEY_FIELDS:
+            del record[key]
+        return record
+    
+    # Observer
+    
+    def update(self, device_id: str):
+        """Ghi các trường đã thay đổi của thiết bị."""
+        self.update_batch([device_id])
+    
+    def update_batch(self, device_ids: List[str]):
+        """Ghi các trường đã thay đổi của nhiều thiết bị (cùng 1 timestamp)."""
+        with self._lock:
+            now = self._now()
+            for device_id in device_ids:
+                device = self.controller.get_device(device_id)
+                old = self._state.get(device_id)
+                if device is None or old is None:
+                    continue  # Thêm/xóa được ghi qua on_devices_added/removed
+                new = self._fields(device)
+                for field, value in new.items():
+                    if old.get(field) != value:
+                        self._append((now, device_id, field, old.get(field), value))
+                        old[field] = value
+            self._maybe_checkpoint(now)
+    
+    def on_devices_added(self, device_ids: List[str]):
+        """Ghi event thiết bị xuất hiện (kèm trạng thái đầy đủ)."""
+        with self._lock:
+            now = self._now()
+            for device_id in device_ids:
+                device = self.controller.get_device(device_id)
+                if device is None:
+                    continue
+                fields = self._fields(device)
+                self._append((now, device_id, ALL_FIELDS, None, dict(fields)))
+                self._state[device_id] = fields
+            self._maybe_checkpoint(now)
+    
+    def on_devices_removed(self, device_ids: List[str]):
+        """Ghi event thiết bị biến mất."""
+        with self._lock:
+            now = self._now()
+            for device_id in device_ids:
+                old = self._state.pop(device_id, None)
+                if old is not None:
+                    self._append((now, device_id, ALL_FIELDS, old, None))
+            self._maybe_checkpoint(now)
+    
+    # Event log
+    
+    def _now(self) -> float:
+        """Timestamp cho event mới, không nhỏ hơn event trước (gọi khi đã giữ lock).
+        
+        Giữ _times luôn tăng dần để bisect đúng kể cả khi đồng hồ bị chỉnh lùi.
+        """
+        last = self._times[-1] if self._times else self._checkpoint_times[-1]
+        return max(time.time(), last)
+    
+    def _append(self, event: StateEvent):
+        """Thêm 1 event vào log (gọi khi đã giữ lock)."""
+        seq = self._base + len(self._events)
+        self._events.append(event)
+        self._times.append(event[0])
+        self._device_seqs.setdefault(event[1], []).append(seq)
+    
+    def _maybe_checkpoint(self, now: float):
+        """Tạo checkpoint khi đủ event kể từ checkpoint trước (gọi khi đã giữ lock)."""
+        since = self._base + len(self._events) - self._checkpoints[-1][0]
+        if since >= max(self.checkpoint_every, len(self._state)):
+            self._checkpoint(now)
+            if len(self._events) > self.max_events:
+                self._trim()
+    
+    def _checkpoint(self, now: float):
+        """Chép trạng thái hiện tại thành checkpoint (gọi khi đã giữ lock)."""
+        state = {device_id: dict(fields) for device_id, fields in self._state.items()}
+        self._checkpoints.append((self._base + len(self._events), now, state))
+        self._checkpoint_times.append(now)
+    
+    def _trim(self):
+        """Bỏ các khoảng checkpoint cũ nhất cho tới khi không vượt max_events."""
+        while len(self._checkpoints) > 1 and len(self._events) > self.max_events:
+            del self._checkpoints[0]
+            del self._checkpoint_times[0]
+            drop = self._checkpoints[0][0] - self._base
+            del self._events[:drop]
+            del self._times[:drop]
+            self._base += drop
+        
+        for device_id in list(self._device_seqs):
+            seqs = self._device_seqs[device_id]
+            del seqs[:bisect.bisect_left(seqs, self._base)]
+            if not seqs:
+                del self._device_seqs[device_id]
+    
+    # Time-travel queries
+    
+    def _locate(self, timestamp: float) -> Optional[Tuple[int, Dict[str, Dict[str, Any]], int]]:
+        """Tìm checkpoint gần nhất trước timestamp (gọi khi đã giữ lock).
+        
+        Returns:
+            (seq của checkpoint, trạng thái checkpoint, seq của event đầu tiên sau timestamp)
+            hoặc None nếu timestamp trước lịch sử còn giữ
+        """
+        index = bisect.bisect_right(self._checkpoint_times, timestamp) - 1
+        if index < 0:
+            return None
+        checkpoint_seq, _, checkpoint_state = self._checkpoints[index]
+        end_seq = self._base + bisect.bisect_right(self._times, timestamp)
+        return checkpoint_seq, checkpoint_state, end_seq
+    
+    def state_at(self, timestamp: float) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Dựng lại trạng thái toàn nhà tại 1 thời điểm.
+        
+        Args:
+            timestamp: Thời điểm (epoch giây, như time.time())
+        
+        Returns:
+            Dictionary {device_id: {trường: giá trị}}, hoặc None nếu thời điểm
+            nằm trước lịch sử còn giữ
+        """
+        with self._lock:
+            located = self._locate(timestamp)
+            if located is None:
+                return None
+            checkpoint_seq, checkpoint_state, end_seq = located
+            state = {device_id: dict(fields) for device_id, fields in checkpoint_state.items()}
+            for event in self._events[checkpoint_seq - self._base:end_seq - self._base]:
+                _apply_event(state, event)
+        return state
+    
+    def device_state_at(self, device_id: str, timestamp: float) -> Optional[Dict[str, Any]]:
+        """Dựng lại trạng thái của 1 thiết bị tại 1 thời điểm.
+        
+        Chỉ replay các event của thiết bị đó (tra index theo thiết bị).
+        
+        Args:
+            device_id: ID của thiết bị
+            timestamp: Thời điểm (epoch giây)
+        
+        Returns:
+            Dictionary {trường: giá trị}, hoặc None nếu thiết bị chưa tồn tại /
+            đã bị xóa / thời điểm nằm trước lịch sử còn giữ
+        """
+        with self._lock:
+            located = self._locate(timestamp)
+            if located is None:
+                return None
+            checkpoint_seq, checkpoint_state, end_seq = located
+            state = {}
+            if device_id in checkpoint_state:
+                state[device_id] = dict(checkpoint_state[device_id])
+            seqs = self._device_seqs.get(device_id, [])
+            for seq in seqs[bisect.bisect_left(seqs, checkpoint_seq):bisect.bisect_left(seqs, end_seq)]:
+                _apply_event(state, self._events[seq - self._base])
+        return state.get(device_id)
+    
+    def devices_on_at(self, timestamp: float) -> List[str]:
+        """ID các thiết bị đang bật (cửa: đang mở) tại 1 thời điểm.
+        
+        Args:
+            timestamp: Thời điểm (epoch giây)
+        
+        Returns:
+            List ID thiết bị
+        """
+        state = self.state_at(timestamp) or {}
+        return [device_id for device_id, fields in state.items() if fields.get('is_on')]
+    
+    def events_between(self, start: float, end: float, device_id: Optional[str] = None) -> List[StateEvent]:
+        """Lấy các event trong khoảng thời gian [start, end].
+        
+        Args:
+            start: Thời điểm bắt đầu (epoch giây)
+            end: Thời điểm kết thúc (epoch giây)
+            device_id: Chỉ lấy event của thiết bị này
+        
+        Returns:
+            List event (timestamp, device_id, field, old, new)
+        """
+        with self._lock:
+            first = bisect.bisect_left(self._times, start)
+            last = bisect.bisect_right(self._times, end)
+            if device_id is None:
+                return self._events[first:last]
+            seqs = self._device_seqs.get(device_id, [])
+            lo = bisect.bisect_left(seqs, self._base + first)
+            hi = bisect.bisect_left(seqs, self._base + last)
+            return [self._events[seq - self._base] for seq in seqs[lo:hi]]
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Thống kê kích thước lịch sử.
+        
+        Returns:
+            Dictionary với số event và số checkpoint đang giữ
+        """
+        with self._lock:
+            return {'events': len(self._events), 'checkpoints': len(self._checkpoints)}
+    
+    def close(self):
+        """Ngừng ghi lịch sử."""
+        self.controller.unregister_observer(self)
@@ -0,0 +1,658 @@
+"""Telemetry Store - Lưu time-series trạng thái thiết bị dạng cột, nén và đọc qua mmap."""
+
+import bisect
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from application.device_controller import Observer
+from application.fleet_config import device_record
+
+
+CHUNK_MAGIC = b'TC'
+# magic, key_len, count, first_ts, last_ts, min, max, sum, payload_len
+CHUNK_HEADER = struct.Struct('<2sHIqqqqqI')
+SEGMENT_PREFIX = 'telemetry-'
+SEGMENT_SUFFIX = '.tsc'
+WAL_NAME = 'telemetry.wal'
+# key_len, seq (thứ tự điểm trong series), timestamp, value
+WAL_RECORD = struct.Struct('<HQqq')
+WAL_CHECKPOINT_MIN = 65536  # Số bản ghi WAL đã nằm trong chunk tối thiểu trước khi viết lại WAL
+
+# Trường được ghi và cách đổi giá trị thành số nguyên
+DOOR_STATE_CODES = {'closed': 0, 'open': 1, 'locked': 2}
+FIELDS = ('is_on', 'brightness', 'speed', 'state')
+
+SeriesKey = Tuple[str, str]  # (device_id, field)
+# (first_ts, last_ts, segment, offset, payload_len, count, min, max, sum) - offset trỏ vào payload
+ChunkRef = Tuple[int, int, int, int, int, int, int, int, int]
+
+
+def _zigzag(n: int) -> int:
+    """Đổi số có dấu thành số không dấu (số nhỏ có trị tuyệt đối nhỏ -> varint ngắn)."""
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+
+def _unzigzag(n: int) -> int:
+    """Ngược lại của _zigzag."""
+    return n >> 1 if not n & 1 else -((n + 1) >> 1)
+
+
+def _put_varint(out: bytearray, n: int):
+    """Ghi số không dấu dạng varint (7 bit mỗi byte)."""
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(buf, pos: int) -> Tuple[int, int]:
+    """Đọc 1 varint.
+    
+    Returns:
+        Tuple (giá trị, vị trí sau varint)
+    """
+    result = 0
+    shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_chunk(timestamps: List[int], values: List[int]) -> bytes:
+    """Nén 1 chunk: timestamp delta-of-delta rồi giá trị run-length, đều là varint.
+    
+    Args:
+        timestamps: Timestamp (ms) tăng dần, phần tử đầu nằm trong header chunk
+        values: Giá trị nguyên tương ứng
+    
+    Returns:
+        Payload đã nén
+    """
+    out = bytearray()
+    previous_delta = 0
+    for i in range(1, len(timestamps)):
+        delta = timestamps[i] - timestamps[i - 1]
+        _put_varint(out, _zigzag(delta - previous_delta))
+        previous_delta = delta
+    
+    # Runs: (value - previous run value, run length)
+    previous_value = 0
+    i = 0
+    while i < len(values):
+        value = values[i]
+        run = 1
+        while i + run < len(values) and values[i + run] == value:
+            run += 1
+        _put_varint(out, _zigzag(value - previous_value))
+        _put_varint(out, run)
+        previous_value = value
+        i += run
+    return bytes(out)
+
+
+def decode_chunk(buf, pos: int, count: int, first_ts: int) -> Tuple[List[int], List[int]]:
+    """Giải nén 1 chunk.
+    
+    Args:
+        buf: Buffer chứa payload (bytes hoặc mmap)
+        pos: Vị trí bắt đầu payload
+        count: Số điểm
+        first_ts: Timestamp của điểm đầu
+    
+    Returns:
+        Tuple (timestamps, values)
+    """
+    timestamps = [first_ts]
+    delta = 0
+    for _ in range(count - 1):
+        dod, pos = _get_varint(buf, pos)
+        delta += _unzigzag(dod)
+        timestamps.append(timestamps[-1] + delta)
+    
+    values = []
+    value = 0
+    while len(values) < count:
+        diff, pos = _get_varint(buf, pos)
+        run, pos = _get_varint(buf, pos)
+        value += _unzigzag(diff)
+        values.extend([value] * run)
+    return timestamps, values
+
+
+class TelemetryStore:
+    """Kho time-series nhúng: mỗi (thiết bị, trường) là 1 series gồm các chunk cột.
+    
+    Điểm mới nằm trong buffer của series; đủ chunk_points điểm thì được nén
+    (timestamp delta-of-delta, giá trị run-length, varint) và ghi nối vào
+    segment file. Header chunk lưu min/max/sum nên downsample bỏ qua giải nén
+    khi 1 chunk nằm trọn trong 1 bucket. Segment được đọc qua mmap; trong bộ
+    nhớ chỉ giữ index chunk và buffer chưa ghi.
+    
+    Series ít thay đổi có thể mất rất lâu mới đủ 1 chunk. Để điểm trong buffer
+    không mất khi crash mà không phải đóng chunk sớm (chunk 1 điểm mất hết tác
+    dụng nén), 1 thread nền ghi nối các điểm mới vào WAL và fsync khi điểm cũ
+    nhất chưa fsync đã quá max_buffer_age giây. Chunk chỉ được đóng khi series
+    đủ chunk_points điểm, hoặc khi tổng số điểm trong buffer đạt
+    max_buffer_points. Mỗi bản ghi WAL mang thứ tự của điểm trong series nên
+    khi mở lại, điểm đã nằm trong chunk được bỏ qua; WAL được viết lại (chỉ còn
+    các buffer) khi phần lớn bản ghi của nó đã nằm trong chunk.
+    """
+    
+    def __init__(self, directory: str, chunk_points: int = 1024, segment_bytes: int = 64 * 1024 * 1024,
+                 max_buffer_age: Optional[float] = 5.0, max_buffer_points: int = 262144):
+        """Mở (hoặc tạo) kho trong thư mục, nạp lại buffer từ WAL.
+        
+        Args:
+            directory: Thư mục chứa các segment file
+            chunk_points: Số điểm mỗi chunk
+            segment_bytes: Kích thước segment (byte) trước khi chuyển sang file mới
+            max_buffer_age: Thời gian tối đa (giây) 1 điểm chờ trước khi được fsync vào WAL
+                (None = chỉ ghi khi gọi sync()/flush()/close())
+            max_buffer_points: Tổng số điểm trong buffer trước khi đóng mọi buffer thành chunk
+        """
+        self.directory = directory
+        self.chunk_points = chunk_points
+        self.segment_bytes = segment_bytes
+        self.max_buffer_age = max_buffer_age
+        self.max_buffer_points = max_buffer_points
+        os.makedirs(directory, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)  # Đánh thức thread flush
+        self._sync_lock = threading.Lock()  # Chỉ 1 lần ghi WAL tại 1 thời điểm
+        self._chunks: Dict[SeriesKey, List[ChunkRef]] = {}  # Index chunk theo series, tăng dần theo thời gian
+        self._chunk_ends: Dict[SeriesKey, List[int]] = {}  # last_ts của từng chunk (để bisect)
+        self._heads: Dict[SeriesKey, Tuple[List[int], List[int]]] = {}  # Điểm chưa ghi (timestamps, values)
+        self._counts: Dict[SeriesKey, int] = {}  # Tổng số điểm của series (thứ tự của điểm tiếp theo)
+        self._maps: Dict[int, mmap.mmap] = {}  # {segment: mmap}
+        self._buffered = 0  # Tổng số điểm trong các buffer
+        self._wal_pending = bytearray()  # Bản ghi WAL chưa ghi ra file
+        self._wal_dead = 0  # Bản ghi trong WAL của điểm đã nằm trong chunk
+        self._segment_dirty = False  # Có chunk chưa fsync
+        self._oldest: Optional[float] = None  # time.monotonic() của điểm cũ nhất chưa fsync
+        self._closed = False
+        self.points_written = 0
+        
+        segments = sorted(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) for name in os.listdir(directory)
+                          if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        for segment in segments:
+            self._scan_segment(segment)
+        self._segment = segments[-1] if segments else 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        self._wal_path = os.path.join(directory, WAL_NAME)
+        self._replay_wal()
+        self._wal = open(self._wal_path, 'ab')
+        
+        self._flush_thread = threading.Thread(target=self._run_flusher, name="TelemetryStore", daemon=True)
+        self._flush_thread.start()
+    
+    def _segment_path(self, segment: int) -> str:
+        """Đường dẫn segment file."""
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{segment:06d}{SEGMENT_SUFFIX}")
+    
+    def _scan_segment(self, segment: int):
+        """Dựng index từ header các chunk của 1 segment (không giải nén payload).
+        
+        Chunk cuối bị ghi dở (crash giữa chừng) được cắt bỏ.
+        """
+        path = self._segment_path(segment)
+        size = os.path.getsize(path)
+        good_end = 0
+        if size:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = 0
+                while pos + CHUNK_HEADER.size <= size:
+                    (magic, key_len, count, first_ts, last_ts, low, high, total,
+                     payload_len) = CHUNK_HEADER.unpack_from(mm, pos)
+                    payload_pos = pos + CHUNK_HEADER.size + key_len
+                    if magic != CHUNK_MAGIC or payload_pos + payload_len > size:
+                        break
+                    device_id, field = mm[pos + CHUNK_HEADER.size:payload_pos].decode('utf-8').split('\x00')
+                    self._index_chunk((device_id, field), (first_ts, last_ts, segment, payload_pos, payload_len,
+                                                           count, low, high, total))
+                    pos = good_end = payload_pos + payload_len
+        if good_end != size:
+            print(f"⚠️ Telemetry {os.path.basename(path)}: bỏ qua chunk ghi dở ở cuối file")
+            with open(path, 'r+b') as f:
+                f.truncate(good_end)
+    
+    def _index_chunk(self, key: SeriesKey, chunk: ChunkRef):
+        """Thêm chunk vào index của series."""
+        self._chunks.setdefault(key, []).append(chunk)
+        self._chunk_ends.setdefault(key, []).append(chunk[1])
+        self._counts[key] = self._counts.get(key, 0) + chunk[5]
+        self.points_written += chunk[5]
+    
+    def _replay_wal(self):
+        """Nạp lại buffer từ WAL, bỏ qua điểm đã nằm trong chunk.
+        
+        Bản ghi cuối bị ghi dở được cắt bỏ.
+        """
+        if not os.path.exists(self._wal_path):
+            return
+        with open(self._wal_path, 'rb') as f:
+            data = f.read()
+        pos = good_end = 0
+        while pos + WAL_RECORD.size <= len(data):
+            key_len, seq, timestamp_ms, value = WAL_RECORD.unpack_from(data, pos)
+            key_end = pos + WAL_RECORD.size + key_len
+            if key_end > len(data):
+                break
+            device_id, field = data[pos + WAL_RECORD.size:key_end].decode('utf-8').split('\x00')
+            key = (device_id, field)
+            pos = good_end = key_end
+            if seq != self._counts.get(key, 0):
+                # Already sealed into a chunk
+                self._wal_dead += 1
+                continue
+            timestamps, values = self._heads.setdefault(key, ([], []))
+            timestamps.append(timestamp_ms)
+            values.append(value)
+            self._counts[key] = seq + 1
+            self._buffered += 1
+        if good_end != len(data):
+            print(f"⚠️ Telemetry {WAL_NAME}: bỏ qua bản ghi ghi dở ở cuối file")
+            with open(self._wal_path, 'r+b') as f:
+                f.truncate(good_end)
+    
+    # Writes
+    
+    def append(self, device_id: str, field: str, timestamp: float, value: int):
+        """Thêm 1 điểm vào series.
+        
+        Args:
+            device_id: ID của thiết bị
+            field: Tên trường
+            timestamp: Thời điểm (epoch giây); nhỏ hơn điểm trước thì được nâng lên bằng
+            value: Giá trị nguyên
+        """
+        timestamp_ms = int(timestamp * 1000)
+        key = (device_id, field)
+        with self._lock:
+            head = self._heads.get(key)
+            if head is None:
+                head = self._heads[key] = ([], [])
+            timestamps, values = head
+            last = timestamps[-1] if timestamps else self._chunks.get(key, [(0, 0)])[-1][1]
+            timestamp_ms = max(timestamp_ms, last)
+            timestamps.append(timestamp_ms)
+            values.append(value)
+            seq = self._counts.get(key, 0)
+            self._counts[key] = seq + 1
+            self._buffered += 1
+            key_bytes = f"{device_id}\x00{field}".encode('utf-8')
+            self._wal_pending += WAL_RECORD.pack(len(key_bytes), seq, timestamp_ms, value)
+            self._wal_pending += key_bytes
+            if len(timestamps) >= self.chunk_points:
+                self._write_chunk(key)
+            if self._oldest is None:
+                self._oldest = time.monotonic()
+                self._cond.notify()
+            elif self._buffered >= self.max_buffer_points:
+                self._cond.notify()
+    
+    def _write_chunk(self, key: SeriesKey):
+        """Nén buffer của series thành 1 chunk và ghi nối vào segment (gọi khi đã giữ lock)."""
+        timestamps, values = self._heads.pop(key)
+        payload = encode_chunk(timestamps, values)
+        key_bytes = f"{key[0]}\x00{key[1]}".encode('utf-8')
+        
+        if self._file.tell() >= self.segment_bytes:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._segment += 1
+            self._file = open(self._segment_path(self._segment), 'ab')
+        
+        offset = self._file.tell()
+        self._file.write(CHUNK_HEADER.pack(CHUNK_MAGIC, len(key_bytes), len(values), timestamps[0], timestamps[-1],
+                                           min(values), max(values), sum(values), len(payload)))
+        self._file.write(key_bytes)
+        self._file.write(payload)
+        payload_pos = offset + CHUNK_HEADER.size + len(key_bytes)
+        # The series count already includes these points
+        self._chunks.setdefault(key, []).append(
+            (timestamps[0], timestamps[-1], self._segment, payload_pos, len(payload),
+             len(values), min(values), max(values), sum(values)))
+        self._chunk_ends.setdefault(key, []).append(timestamps[-1])
+        self.points_written += len(values)
+        self._buffered -= len(values)
+        self._wal_dead += len(values)
+        self._segment_dirty = True
+    
+    def _write_heads(self):
+        """Đóng tất cả buffer thành chunk, kể cả chunk chưa đầy (gọi khi đã giữ lock)."""
+        for key in list(self._heads):
+            self._write_chunk(key)
+    
+    def _wal_snapshot(self) -> bytearray:
+        """Bản ghi WAL của tất cả điểm trong buffer (gọi khi đã giữ lock)."""
+        data = bytearray()
+        for key, (timestamps, values) in self._heads.items():
+            key_bytes = f"{key[0]}\x00{key[1]}".encode('utf-8')
+            seq = self._counts[key] - len(timestamps)
+            for offset, (timestamp_ms, value) in enumerate(zip(timestamps, values)):
+                data += WAL_RECORD.pack(len(key_bytes), seq + offset, timestamp_ms, value)
+                data += key_bytes
+        return data
+    
+    def _sync(self, checkpoint: bool = False):
+        """Ghi các điểm mới vào WAL và fsync; viết lại WAL khi phần lớn đã nằm trong chunk.
+        
+        Args:
+            checkpoint: Luôn viết lại WAL
+        """
+        with self._sync_lock:
+            with self._lock:
+                pending, self._wal_pending = self._wal_pending, bytearray()
+                self._oldest = None
+                self._file.flush()
+                segment_fd = os.dup(self._file.fileno()) if self._segment_dirty else None
+                self._segment_dirty = False
+                checkpoint = checkpoint or self._wal_dead >= max(self._buffered, WAL_CHECKPOINT_MIN)
+                if checkpoint:
+                    pending = self._wal_snapshot()
+                    self._wal_dead = 0
+            
+            # fsync outside the lock so appends are not blocked on the disk.
+            # Chunks must be durable before the WAL forgets their points.
+            try:
+                if segment_fd is not None:
+                    try:
+                        os.fsync(segment_fd)
+                    finally:
+                        os.close(segment_fd)
+                if checkpoint:
+                    tmp_path = self._wal_path + '.tmp'
+                    with open(tmp_path, 'wb') as f:
+                        f.write(pending)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    self._wal.close()
+                    os.replace(tmp_path, self._wal_path)
+                    self._wal = open(self._wal_path, 'ab')
+                elif pending:
+                    self._wal.write(pending)
+                    self._wal.flush()
+                    os.fsync(self._wal.fileno())
+            except OSError:
+                # Retry later; records written twice are skipped on replay (same seq)
+                if self._wal.closed:
+                    self._wal = open(self._wal_path, 'ab')
+                with self._lock:
+                    self._wal_pending[:0] = pending
+                    self._segment_dirty = self._segment_dirty or segment_fd is not None
+                    if self._oldest is None:
+                        self._oldest = time.monotonic()
+                raise
+    
+    def sync(self):
+        """Ghi các điểm mới vào WAL và fsync, không đóng chunk."""
+        self._sync()
+    
+    def flush(self):
+        """Ghi tất cả buffer thành chunk (kể cả chunk chưa đầy) và fsync ra đĩa."""
+        with self._lock:
+            self._write_heads()
+        self._sync(checkpoint=True)
+    
+    def _flush_delay(self) -> Optional[float]:
+        """Số giây tới lần ghi kế tiếp (gọi khi đã giữ lock).
+        
+        Returns:
+            0 nếu đã tới hạn, None nếu chưa có gì cần chờ
+        """
+        if self._buffered >= self.max_buffer_points:
+            return 0.0
+        if self._oldest is None or self.max_buffer_age is None:
+            return None
+        return max(0.0, self._oldest + self.max_buffer_age - time.monotonic())
+    
+    def _run_flusher(self):
+        """Vòng lặp của thread flush."""
+        while True:
+            with self._cond:
+                delay = self._flush_delay()
+                while not self._closed and delay != 0:
+                    self._cond.wait(delay)
+                    delay = self._flush_delay()
+                if self._closed:
+                    return
+                if self._buffered >= self.max_buffer_points:
+                    self._write_heads()
+            try:
+                self._sync()
+            except OSError as e:
+                print(f"❌ Lỗi ghi telemetry: {e}")
+                time.sleep(1)
+    
+    # Reads
+    
+    def _buffer(self, segment: int, end: int):
+        """mmap của segment, map lại nếu file đã dài thêm (gọi khi đã giữ lock)."""
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            if segment == self._segment:
+                self._file.flush()
+            if mapped is not None:
+                mapped.close()
+            with open(self._segment_path(segment), 'rb') as f:
+                mapped = self._maps[segment] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return mapped
+    
+    def _chunks_in_range(self, key: SeriesKey, start_ms: int, end_ms: int) -> List[ChunkRef]:
+        """Các chunk của series giao với [start_ms, end_ms] (gọi khi đã giữ lock).
+        
+        Chunk của 1 series không chồng nhau và tăng dần theo thời gian nên chỉ cần
+        bisect theo last_ts rồi đọc tới chunk đầu tiên bắt đầu sau end_ms.
+        """
+        chunks = self._chunks.get(key)
+        if not chunks:
+            return []
+        result = []
+        for index in range(bisect.bisect_left(self._chunk_ends[key], start_ms), len(chunks)):
+            chunk = chunks[index]
+            if chunk[0] > end_ms:
+                break
+            result.append(chunk)
+        return result
+    
+    def _decode(self, chunk: ChunkRef) -> Tuple[List[int], List[int]]:
+        """Giải nén 1 chunk từ mmap (gọi khi đã giữ lock)."""
+        first_ts, _, segment, payload_pos, payload_len, count = chunk[:6]
+        return decode_chunk(self._buffer(segment, payload_pos + payload_len), payload_pos, count, first_ts)
+    
+    def query(self, device_id: str, field: str, start: float, end: float) -> List[Tuple[float, int]]:
+        """Lấy các điểm của series trong khoảng [start, end].
+        
+        Args:
+            device_id: ID của thiết bị
+            field: Tên trường
+            start: Thời điểm bắt đầu (epoch giây)
+            end: Thời điểm kết thúc (epoch giây)
+        
+        Returns:
+            List (timestamp giây, giá trị)
+        """
+        start_ms, end_ms = int(start * 1000), int(end * 1000)
+        key = (device_id, field)
+        points = []
+        with self._lock:
+            sources = [self._decode(chunk) for chunk in self._chunks_in_range(key, start_ms, end_ms)]
+            if key in self._heads:
+                sources.append(self._heads[key])
+            for timestamps, values in sources:
+                points.extend((timestamp / 1000, value) for timestamp, value in zip(timestamps, values)
+                              if start_ms <= timestamp <= end_ms)
+        return points
+    
+    def downsample(self, device_id: str, field: str, start: float, end: float,
+                   max_points: int = 500) -> List[Tuple[float, int, int, float, int]]:
+        """Gộp series trong khoảng [start, end] thành tối đa max_points bucket.
+        
+        Kích thước bucket được chọn tự động theo độ dài khoảng. Chunk nằm trọn
+        trong 1 bucket dùng min/max/sum trong header, không cần giải nén.
+        
+        Args:
+            device_id: ID của thiết bị
+            field: Tên trường
+            start: Thời điểm bắt đầu (epoch giây)
+            end: Thời điểm kết thúc (epoch giây)
+            max_points: Số bucket tối đa
+        
+        Returns:
+            List (bucket_start giây, min, max, avg, count) cho các bucket có dữ liệu
+        """
+        start_ms, end_ms = int(start * 1000), int(end * 1000)
+        bucket_ms = max(1, math.ceil((end_ms - start_ms + 1) / max_points))
+        buckets: Dict[int, List] = {}  # {bucket index: [min, max, sum, count]}
+        
+        def add(index: int, low: int, high: int, total: int, count: int):
+            bucket = buckets.get(index)
+            if bucket is None:
+                buckets[index] = [low, high, total, count]
+            else:
+                bucket[0] = min(bucket[0], low)
+                bucket[1] = max(bucket[1], high)
+                bucket[2] += total
+                bucket[3] += count
+        
+        key = (device_id, field)
+        with self._lock:
+            sources = []
+            for chunk in self._chunks_in_range(key, start_ms, end_ms):
+                first_ts, last_ts, _, _, _, count, low, high, total = chunk
+                first_bucket = (first_ts - start_ms) // bucket_ms
+                if first_ts >= start_ms and last_ts <= end_ms and first_bucket == (last_ts - start_ms) // bucket_ms:
+                    add(first_bucket, low, high, total, count)
+                else:
+                    sources.append(self._decode(chunk))
+            if key in self._heads:
+                sources.append(self._heads[key])
+            
+            for timestamps, values in sources:
+                for timestamp, value in zip(timestamps, values):
+                    if start_ms <= timestamp <= end_ms:
+                        add((timestamp - start_ms) // bucket_ms, value, value, value, 1)
+        
+        return [((start_ms + index * bucket_ms) / 1000, low, high, total / count, count)
+                for index, (low, high, total, count) in sorted(buckets.items())]
+    
+    def series(self) -> List[SeriesKey]:
+        """Danh sách các series đang có.
+        
+        Returns:
+            List (device_id, field) đã sắp xếp
+        """
+        with self._lock:
+            return sorted(set(self._chunks) | set(self._heads))
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Thống kê dung lượng.
+        
+        Returns:
+            Dictionary với số điểm, số chunk, dung lượng đĩa (kể cả WAL) và số byte mỗi điểm
+        """
+        with self._sync_lock, self._lock:
+            self._file.flush()
+            chunks = sum(len(refs) for refs in self._chunks.values())
+            points = self.points_written + self._buffered
+            segment_bytes = sum(os.path.getsize(self._segment_path(segment))
+                                for segment in range(1, self._segment + 1)
+                                if os.path.exists(self._segment_path(segment)))
+            wal_bytes = self._wal.tell()
+        return {
+            'points': points,
+            'chunks': chunks,
+            'buffered': self._buffered,
+            'disk_bytes': segment_bytes + wal_bytes,
+            'wal_bytes': wal_bytes,
+            'bytes_per_point': (segment_bytes + wal_bytes) / points if points else 0.0
+        }
+    
+    def close(self):
+        """Dừng thread flush, ghi nốt buffer vào WAL và đóng các file.
+        
+        Buffer chưa đủ chunk được giữ trong WAL và nạp lại ở lần mở sau.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._flush_thread.join()
+        self._sync()
+        with self._lock:
+            self._wal.close()
+            self._file.close()
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+
+
+class TelemetryRecorder(Observer):
+    """Ghi trạng thái thiết bị vào TelemetryStore mỗi khi 1 trường thay đổi."""
+    
+    def __init__(self, controller, store: TelemetryStore):
+        """Ghi trạng thái hiện tại của mọi thiết bị rồi bắt đầu theo dõi.
+        
+        Args:
+            controller: DeviceController instance
+            store: TelemetryStore để ghi
+        """
+        self.controller = controller
+        self.store = store
+        self._last: Dict[str, Dict[str, int]] = {}  # Giá trị đã ghi gần nhất theo thiết bị
+        self._lock = threading.Lock()
+        self.update_batch(list(controller.devices))
+        controller.register_observer(self)
+    
+    @staticmethod
+    def _values(device) -> Dict[str, int]:
+        """Các trường số của thiết bị."""
+        record = device_record(device)
+        values = {}
+        for field in FIELDS:
+            if field in record:
+                value = record[field]
+                values[field] = DOOR_STATE_CODES[value] if field == 'state' else int(value)
+        return values
+    
+    def update(self, device_id: str):
+        """Ghi các trường đã thay đổi của thiết bị."""
+        self.update_batch([device_id])
+    
+    def update_batch(self, device_ids: List[str]):
+        """Ghi các trường đã thay đổi của nhiều thiết bị."""
+        now = time.time()
+        with self._lock:
+            for device_id in device_ids:
+                device = self.controller.get_device(device_id)
+                if device is None:
+                    self._last.pop(device_id, None)
+                    continue
+                last = self._last.setdefault(device_id, {})
+                for field, value in self._values(device).items():
+                    if last.get(field) != value:
+                        self.store.append(device_id, field, now, value)
+                        last[field] = value
+    
+    def on_devices_added(self, device_ids: List[str]):
+        """Ghi trạng thái ban đầu của thiết bị mới."""
+        self.update_batch(device_ids)
+    
+    def on_devices_removed(self, device_ids: List[str]):
+        """Bỏ giá trị đã ghi của các thiết bị vừa xóa (series trên đĩa được giữ lại)."""
+        with self._lock:
+            for device_id in device_ids:
+                self._last.pop(device_id, None)
+    
+    def close(self):
+        """Ngừng ghi."""
+        self.controller.unregister_observer(self)
@@ -1,9 +1,104 @@
 """Timer Manager - Quản lý hẹn giờ cho thiết bị."""
 
+import bisect
+import heapq
+import itertools
+import math
 import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
-from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass, field, replace
+from application.device_controller import Observer
+from application.latency_histogram import LatencyHistogram
+
+
+# Loại thiết bị hỗ trợ từng hành động - dùng để lọc khi timer nhắm tới cả phòng
+ACTION_DEVICE_TYPES = {
+    'set_brightness': 'light',
+    'set_speed': 'fan',
+    'lock': 'door',
+    'unlock': 'door',
+    'open': 'door',
+    'close': 'door'
+}
+
+# Giới hạn trên của delay/slack - giá trị lớn hơn làm tràn datetime khi tính deadline
+MAX_DELAY_SECONDS = 366 * 24 * 3600
+MAX_SLACK_SECONDS = 24 * 3600
+
+
+@dataclass(frozen=True)
+class TimerTarget:
+    """Bộ chọn thiết bị đích cho timer nhiều thiết bị.
+    
+    Được resolve thành danh sách device_id lúc timer chạy, thông qua
+    index phòng/loại của DeviceController. Khi có cả room và device_type
+    thì lấy giao của hai tập; device_ids luôn được thêm vào kết quả.
+    """
+    device_ids: Tuple[str, ...] = ()
+    room: Optional[str] = None
+    device_type: Optional[str] = None
+    
+    def is_empty(self) -> bool:
+        """Kiểm tra bộ chọn có rỗng không."""
+        return not self.device_ids and self.room is None and self.device_type is None
+    
+    def resolve(self, controller, action: Optional[str] = None) -> List[str]:
+        """Resolve bộ chọn thành danh sách device_id hiện có.
+        
+        Args:
+            controller: DeviceController instance
+            action: Hành động sẽ thực thi - với bộ chọn theo phòng, chỉ lấy
+                các thiết bị hỗ trợ hành động đó (VD: set_brightness -> đèn)
+            
+        Returns:
+            List device_id (không trùng lặp, giữ thứ tự)
+        """
+        selected: Dict[str, None] = {
+            device_id: None for device_id in self.device_ids
+            if controller.get_device(device_id)
+        }
+        
+        if self.room is not None or self.device_type is not None:
+            device_type = self.device_type or ACTION_DEVICE_TYPES.get(action)
+            
+            if self.room is None:
+                group = controller.get_device_ids_by_type(device_type)
+            else:
+                group = controller.get_device_ids_by_room(self.room)
+                if device_type is not None:
+                    of_type = set(controller.get_device_ids_by_type(device_type))
+                    group = [device_id for device_id in group if device_id in of_type]
+            
+            selected.update(dict.fromkeys(group))
+        
+        return list(selected)
+    
+    def describe(self) -> str:
+        """Mô tả ngắn gọn để hiển thị."""
+        parts = []
+        if self.room is not None:
+            parts.append(f"📍 {self.room}")
+        if self.device_type is not None:
+            parts.append(f"[{self.device_type}]")
+        if self.device_ids:
+            parts.append(f"{len(self.device_ids)} thiết bị")
+        return " ".join(parts)
+
+
+@dataclass
+class TimerSpec:
+    """Mô tả 1 timer cần đặt, dùng cho đặt hẹn giờ hàng loạt.
+    
+    Chỉ định device_id cho timer 1 thiết bị, hoặc target cho timer nhiều thiết bị.
+    """
+    action: str
+    delay_seconds: int
+    device_id: str = ""
+    target: Optional[TimerTarget] = None
+    params: Optional[Dict[str, Any]] = None
+    slack_seconds: float = 0
 
 
 @dataclass
@@ -15,16 +110,63 @@ class TimerTask:
     action: str
     scheduled_time: datetime
     delay_seconds: int
-    thread: threading.Timer
+    slack_seconds: float = 0.0
+    params: Optional[Dict[str, Any]] = None  # VD: {"brightness": 20}
+    target: Optional[TimerTarget] = None  # None = chỉ device_id
+    state: str = "pending"
+    seq: int = field(default=0, repr=False, compare=False)  # Thứ tự tạo, dùng làm khóa index
+    
+    # Trạng thái của timer
+    STATE_PENDING = "pending"
+    STATE_FIRED = "fired"
+    STATE_CANCELLED = "cancelled"
+    
+    @property
+    def sort_key(self):
+        """Khóa sắp xếp trong index theo thời gian (scheduled_time, seq)."""
+        return (self.scheduled_time, self.seq)
+    
+    @property
+    def device_ids(self) -> Tuple[str, ...]:
+        """Các thiết bị được chỉ định trực tiếp (dùng cho device index)."""
+        if self.target is not None:
+            return self.target.device_ids
+        return (self.device_id,)
+    
+    @property
+    def action_label(self) -> str:
+        """Hành động kèm tham số, VD: set_brightness(20)."""
+        if not self.params:
+            return self.action
+        values = ", ".join(str(value) for value in self.params.values())
+        return f"{self.action}({values})"
+    
+    def resolve_devices(self, controller) -> List[str]:
+        """Resolve danh sách thiết bị đích lúc timer chạy.
+        
+        Args:
+            controller: DeviceController instance
+            
+        Returns:
+            List device_id cần thực thi
+        """
+        if self.target is None:
+            return [self.device_id]
+        return self.target.resolve(controller, self.action)
+    
+    @property
+    def deadline(self) -> datetime:
+        """Thời điểm muộn nhất timer được phép chạy (scheduled_time + slack)."""
+        return self.scheduled_time + timedelta(seconds=self.slack_seconds)
     
     def cancel(self):
         """Hủy timer."""
-        if self.thread and self.thread.is_alive():
-            self.thread.cancel()
+        if self.state == self.STATE_PENDING:
+            self.state = self.STATE_CANCELLED
     
     def is_active(self) -> bool:
         """Kiểm tra timer còn active không."""
-        return self.thread and self.thread.is_alive()
+        return self.state == self.STATE_PENDING
     
     def time_remaining(self) -> int:
         """Tính thời gian còn lại (giây).
@@ -43,112 +185,515 @@ class TimerTask:
         """String representation."""
         remaining = self.time_remaining()
         minutes, seconds = divmod(remaining, 60)
-        return f"{self.device_name} - {self.action} (còn {minutes}p {seconds}s)"
+        return f"{self.device_name} - {self.action_label} (còn {minutes}p {seconds}s)"
+
+
+class TimerObserver:
+    """Observer nhận sự kiện vòng đời của timer.
+    
+    Được gọi từ thread gây ra sự kiện (thread gọi hàm hoặc scheduler thread),
+    sau khi TimerManager đã nhả lock. Mặc định không làm gì - chỉ override các
+    sự kiện cần dùng.
+    """
+    
+    def on_timers_added(self, tasks: List[TimerTask]):
+        """Được gọi khi có timer mới được đặt."""
+        pass
+    
+    def on_timers_fired(self, tasks: List[TimerTask]):
+        """Được gọi khi các timer đến hạn và được lấy ra để thực thi."""
+        pass
+    
+    def on_timers_cancelled(self, tasks: List[TimerTask]):
+        """Được gọi khi các timer bị hủy."""
+        pass
 
 
-class TimerManager:
+class TimerManager(Observer):
     """Quản lý hẹn giờ cho các thiết bị.
     
-    Sử dụng threading.Timer để chạy background tasks.
+    Dùng 1 scheduler thread duy nhất thay vì 1 thread cho mỗi timer.
+    Các timer đến hạn trong cùng cửa sổ dung sai (coalesce_window) được gộp
+    lại và gửi tới controller thành 1 batch lệnh với 1 lần notify observers.
+    Timer có slack có thể được chạy trễ tối đa slack giây để gộp chung batch.
+    
+    Đăng ký làm observer của controller để tự hủy timers của thiết bị bị xóa.
     """
     
-    def __init__(self, controller):
+    def __init__(self, controller, coalesce_window: float = 0.5):
         """Khởi tạo TimerManager.
         
         Args:
             controller: DeviceController instance
+            coalesce_window: Cửa sổ dung sai (giây) để gộp các timer đến hạn gần nhau
         """
         self.controller = controller
         self.active_timers: Dict[str, TimerTask] = {}
         self.timer_id_counter = 0
+        self.coalesce_window = coalesce_window
         self._lock = threading.Lock()  # Thread safety
+        self._wakeup = threading.Condition(self._lock)  # Đánh thức scheduler
+        
+        # Hàng đợi ưu tiên theo deadline (lazy deletion): timer bị hủy được bỏ qua khi pop
+        self._deadline_heap = []  # (deadline, seq, task) - quyết định lúc chạy batch
+        
+        # Index (chỉ chứa timer đang pending, cập nhật ngay khi hủy/chạy)
+        self._time_index = []  # List (scheduled_time, seq, task) đã sắp xếp
+        self._device_index: Dict[str, Dict[str, TimerTask]] = {}  # {device_id: {timer_id: task}}
+        self._seq = itertools.count()
+        
+        # Thống kê độ trễ kích hoạt / thời gian thực thi theo hành động
+        self._stats_lock = threading.Lock()
+        self._lag_stats: Dict[str, LatencyHistogram] = {}
+        self._duration_stats: Dict[str, LatencyHistogram] = {}
+        
+        self.timer_observers: List[TimerObserver] = []
+        
+        self._running = True
+        self._scheduler_thread = threading.Thread(
+            target=self._run_scheduler, name="TimerScheduler", daemon=True
+        )
+        self._scheduler_thread.start()
+        
+        # Theo dõi thiết bị bị xóa để dọn timers
+        self.controller.register_observer(self)
         print("⏰ TimerManager đã khởi tạo")
     
-    def schedule_timer(self, device_id: str, action: str, delay_seconds: int) -> Optional[str]:
+    def schedule_timer(self, device_id: str, action: str, delay_seconds: int,
+                       slack_seconds: float = 0, params: Optional[Dict[str, Any]] = None) -> Optional[str]:
         """Đặt hẹn giờ cho thiết bị.
         
         Args:
             device_id: ID của thiết bị
-            action: Hành động (turn_on, turn_off, v.v.)
+            action: Hành động (turn_on, turn_off, set_brightness, v.v.)
             delay_seconds: Số giây trước khi thực thi
+            slack_seconds: Số giây timer được phép chạy trễ để gộp batch với timer khác
+            params: Tham số của hành động (VD: {"brightness": 20})
             
         Returns:
             Timer ID nếu thành công, None nếu thất bại
         """
-        # Validate device exists
-        device = self.controller.get_device(device_id)
-        if not device:
-            print(f"❌ Không tìm thấy thiết bị ID: {device_id}")
+        spec = TimerSpec(action, delay_seconds, device_id=device_id,
+                         params=params, slack_seconds=slack_seconds)
+        error = self.validate_timer_spec(spec)
+        if error:
+            print(f"❌ {error}")
             return None
         
+        return self._create_timer(spec)
+    
+    def schedule_group_timer(self, target: TimerTarget, action: str, delay_seconds: int,
+                             slack_seconds: float = 0, params: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Đặt 1 hẹn giờ cho nhiều thiết bị (danh sách, phòng hoặc loại thiết bị).
+        
+        Thiết bị đích được resolve lúc timer chạy và thực thi thành 1 batch.
+        
+        Args:
+            target: Bộ chọn thiết bị đích
+            action: Hành động (turn_on, turn_off, set_brightness, v.v.)
+            delay_seconds: Số giây trước khi thực thi
+            slack_seconds: Số giây timer được phép chạy trễ để gộp batch với timer khác
+            params: Tham số của hành động (VD: {"brightness": 20})
+            
+        Returns:
+            Timer ID nếu thành công, None nếu thất bại
+        """
+        spec = TimerSpec(action, delay_seconds, target=target,
+                         params=params, slack_seconds=slack_seconds)
+        error = self.validate_timer_spec(spec)
+        if error:
+            print(f"❌ {error}")
+            return None
+        
+        return self._create_timer(spec)
+    
+    def schedule_timers(self, specs: Iterable[TimerSpec],
+                        on_error: Optional[Callable[[int, str], None]] = None) -> List[Optional[str]]:
+        """Đặt nhiều hẹn giờ cùng lúc.
+        
+        Tất cả spec được validate với controller trong 1 lượt, sau đó các timer
+        hợp lệ được đưa vào scheduler trong 1 lần giữ lock duy nhất.
+        
+        Args:
+            specs: Các TimerSpec cần đặt
+            on_error: Callback (vị trí, thông báo lỗi) cho spec không hợp lệ,
+                mặc định in ra console
+            
+        Returns:
+            List Timer ID theo thứ tự specs, None tại vị trí spec không hợp lệ
+        """
+        results: List[Optional[str]] = []
+        valid: List[Tuple[int, TimerSpec]] = []
+        
+        # Validate everything first, outside the lock
+        for position, spec in enumerate(specs):
+            results.append(None)
+            error = self.validate_timer_spec(spec)
+            if error:
+                if on_error:
+                    on_error(position, error)
+                else:
+                    print(f"❌ Timer #{position}: {error}")
+                continue
+            valid.append((position, spec))
+        
+        if not valid:
+            return results
+        
+        with self._lock:
+            now = datetime.now()
+            tasks = []
+            for position, spec in valid:
+                try:
+                    task = self._build_task(spec, now)
+                    task.deadline  # Raises on overflow - before anything is published
+                except (OverflowError, ValueError) as e:
+                    message = f"Không thể tính thời gian thực thi: {e}"
+                    if on_error:
+                        on_error(position, message)
+                    else:
+                        print(f"❌ Timer #{position}: {message}")
+                    continue
+                results[position] = task.timer_id
+                tasks.append(task)
+            
+            # Index first: only tasks that made it into the scheduler become visible
+            self._index_many(tasks)
+            for task in tasks:
+                self.active_timers[task.timer_id] = task
+            if tasks:
+                self._wakeup.notify()
+        
+        if not tasks:
+            return results
+        failed = len(results) - len(tasks)
+        print(f"⏰ Đã đặt {len(tasks)} hẹn giờ" + (f" ({failed} lỗi)" if failed else ""))
+        self.notify_timer_observers('on_timers_added', tasks)
+        return results
+    
+    def validate_timer_spec(self, spec: TimerSpec) -> Optional[str]:
+        """Kiểm tra 1 TimerSpec với controller.
+        
+        Args:
+            spec: TimerSpec cần kiểm tra
+            
+        Returns:
+            Thông báo lỗi, None nếu hợp lệ
+        """
+        if spec.target is None:
+            # Validate device exists
+            if not self.controller.get_device(spec.device_id):
+                return f"Không tìm thấy thiết bị ID: {spec.device_id}"
+        else:
+            if spec.target.is_empty():
+                return "Chưa chọn thiết bị đích cho timer"
+            for device_id in spec.target.device_ids:
+                if not self.controller.get_device(device_id):
+                    return f"Không tìm thấy thiết bị ID: {device_id}"
+        
         # Validate delay
+        try:
+            delay_seconds = float(spec.delay_seconds)
+            slack_seconds = float(spec.slack_seconds)
+        except (TypeError, ValueError):
+            return "Thời gian trễ/slack phải là số"
+        if not math.isfinite(delay_seconds) or not math.isfinite(slack_seconds):
+            return "Thời gian trễ/slack phải là số hữu hạn"
         if delay_seconds <= 0:
-            print(f"❌ Thời gian trễ phải lớn hơn 0")
-            return None
+            return "Thời gian trễ phải lớn hơn 0"
+        if delay_seconds > MAX_DELAY_SECONDS:
+            return f"Thời gian trễ không được vượt quá {MAX_DELAY_SECONDS} giây"
+        
+        if slack_seconds < 0:
+            return "Slack không được âm"
+        if slack_seconds > MAX_SLACK_SECONDS:
+            return f"Slack không được vượt quá {MAX_SLACK_SECONDS} giây"
+        
+        return None
+    
+    def _build_task(self, spec: TimerSpec, now: datetime) -> TimerTask:
+        """Tạo TimerTask từ spec đã validate (gọi khi đang giữ lock).
+        
+        Args:
+            spec: TimerSpec hợp lệ
+            now: Thời điểm gốc để tính scheduled_time
+            
+        Returns:
+            TimerTask mới (chưa được index)
+        """
+        # Generate timer ID
+        self.timer_id_counter += 1
+        timer_id = f"timer_{self.timer_id_counter}"
+        
+        if spec.target is None:
+            device_name = self.controller.get_device(spec.device_id).name
+        else:
+            device_name = spec.target.describe()
+        
+        return TimerTask(
+            timer_id=timer_id,
+            device_id=spec.device_id if spec.target is None else "",
+            device_name=device_name,
+            action=spec.action,
+            scheduled_time=now + timedelta(seconds=spec.delay_seconds),
+            delay_seconds=spec.delay_seconds,
+            slack_seconds=spec.slack_seconds,
+            params=dict(spec.params) if spec.params else None,
+            target=spec.target
+        )
+    
+    def _create_timer(self, spec: TimerSpec) -> str:
+        """Tạo 1 timer từ spec đã validate và đưa vào scheduler.
         
+        Returns:
+            Timer ID
+        """
         with self._lock:
-            # Generate timer ID
-            self.timer_id_counter += 1
-            timer_id = f"timer_{self.timer_id_counter}"
-            
-            # Calculate scheduled time
-            scheduled_time = datetime.now() + timedelta(seconds=delay_seconds)
-            
-            # Create callback function
-            def execute_timer():
-                self._execute_timer(timer_id, device_id, action)
-            
-            # Create threading.Timer
-            timer_thread = threading.Timer(delay_seconds, execute_timer)
-            
-            # Create TimerTask
-            task = TimerTask(
-                timer_id=timer_id,
-                device_id=device_id,
-                device_name=device.name,
-                action=action,
-                scheduled_time=scheduled_time,
-                delay_seconds=delay_seconds,
-                thread=timer_thread
-            )
+            task = self._build_task(spec, datetime.now())
             
-            # Store and start
-            self.active_timers[timer_id] = task
-            timer_thread.start()
+            # Index before storing, so a failing deadline never leaves a stranded timer
+            self._index(task)
+            self.active_timers[task.timer_id] = task
+            self._wakeup.notify()
             
             # Format time display
-            minutes, seconds = divmod(delay_seconds, 60)
+            minutes, seconds = divmod(spec.delay_seconds, 60)
             time_str = f"{minutes} phút {seconds} giây" if minutes > 0 else f"{seconds} giây"
             
-            print(f"⏰ Đã đặt hẹn giờ: {device.name} - {action} sau {time_str}")
-            print(f"   Timer ID: {timer_id}")
-            print(f"   Thời gian thực thi: {scheduled_time.strftime('%H:%M:%S')}")
+            print(f"⏰ Đã đặt hẹn giờ: {task.device_name} - {task.action_label} sau {time_str}")
+            print(f"   Timer ID: {task.timer_id}")
+            print(f"   Thời gian thực thi: {task.scheduled_time.strftime('%H:%M:%S')}")
+            if spec.slack_seconds > 0:
+                print(f"   Slack: {spec.slack_seconds} giây")
+        
+        self.notify_timer_observers('on_timers_added', [task])
+        return task.timer_id
+    
+    def _index(self, task: TimerTask):
+        """Đưa timer vào hàng đợi scheduler và các index (gọi khi đang giữ lock)."""
+        task.seq = next(self._seq)
+        heapq.heappush(self._deadline_heap, (task.deadline, task.seq, task))
+        bisect.insort(self._time_index, (task.scheduled_time, task.seq, task))
+        for device_id in task.device_ids:
+            self._device_index.setdefault(device_id, {})[task.timer_id] = task
+    
+    def _index_many(self, tasks: List[TimerTask]):
+        """Đưa nhiều timer vào scheduler và các index (gọi khi đang giữ lock).
+        
+        Nối thêm rồi sắp xếp/heapify 1 lần thay vì chèn từng phần tử.
+        """
+        for task in tasks:
+            task.seq = next(self._seq)
+            self._deadline_heap.append((task.deadline, task.seq, task))
+            self._time_index.append((task.scheduled_time, task.seq, task))
+            for device_id in task.device_ids:
+                self._device_index.setdefault(device_id, {})[task.timer_id] = task
+        
+        heapq.heapify(self._deadline_heap)
+        self._time_index.sort()
+    
+    def _unindex(self, task: TimerTask):
+        """Xóa timer khỏi các index (gọi khi đang giữ lock).
+        
+        Deadline heap dùng lazy deletion nên không cần xóa ở đây.
+        """
+        pos = bisect.bisect_left(self._time_index, task.sort_key)
+        if pos < len(self._time_index) and self._time_index[pos][2] is task:
+            del self._time_index[pos]
+        
+        self._unindex_devices(task)
+    
+    def _unindex_devices(self, task: TimerTask):
+        """Xóa timer khỏi device index (gọi khi đang giữ lock)."""
+        for device_id in task.device_ids:
+            device_timers = self._device_index.get(device_id)
+            if device_timers is not None:
+                device_timers.pop(task.timer_id, None)
+                if not device_timers:
+                    del self._device_index[device_id]
+    
+    def _compact_deadline_heap(self):
+        """Dọn các entry đã hủy/đã chạy khỏi deadline heap (gọi khi đang giữ lock).
+        
+        Chỉ rebuild khi số entry rác vượt quá nửa số timer còn lại, để chi phí
+        rebuild được phân bổ đều cho các lần hủy.
+        """
+        stale = len(self._deadline_heap) - len(self.active_timers)
+        if stale > max(64, len(self.active_timers) // 2):
+            self._deadline_heap = [entry for entry in self._deadline_heap if entry[2].is_active()]
+            heapq.heapify(self._deadline_heap)
+    
+    def _run_scheduler(self):
+        """Vòng lặp của scheduler thread: chờ tới hạn rồi chạy từng batch."""
+        while True:
+            with self._wakeup:
+                batch = self._wait_for_due_batch()
+            if batch is None:
+                return
+            self.notify_timer_observers('on_timers_fired', batch)
+            try:
+                self._execute_batch(batch)
+            except Exception as e:
+                print(f"❌ Lỗi khi thực thi batch timer: {e}")
+    
+    def _wait_for_due_batch(self) -> Optional[List[TimerTask]]:
+        """Chờ tới khi có timer đến deadline (gọi khi đang giữ lock).
+        
+        Returns:
+            Batch các timer cần chạy, None nếu scheduler đã dừng
+        """
+        while self._running:
+            # Bỏ các entry của timer đã hủy/đã chạy ở đỉnh heap
+            while self._deadline_heap and not self._deadline_heap[0][2].is_active():
+                heapq.heappop(self._deadline_heap)
+            
+            if not self._deadline_heap:
+                self._wakeup.wait()
+                continue
+            
+            wait_seconds = (self._deadline_heap[0][0] - datetime.now()).total_seconds()
+            if wait_seconds > 0:
+                self._wakeup.wait(wait_seconds)
+                continue
             
-            return timer_id
+            return self._collect_batch()
+        return None
+    
+    def _collect_batch(self) -> List[TimerTask]:
+        """Lấy tất cả timer đến hạn trong cửa sổ dung sai (gọi khi đang giữ lock).
+        
+        Timer có scheduled_time <= now + coalesce_window được gộp vào batch,
+        kể cả timer có slack chưa tới deadline.
+        
+        Returns:
+            List các TimerTask, đã được xóa khỏi active_timers
+        """
+        horizon = datetime.now() + timedelta(seconds=self.coalesce_window)
+        end = bisect.bisect_right(self._time_index, (horizon, float('inf')))
+        batch = [entry[2] for entry in self._time_index[:end]]
+        del self._time_index[:end]
+        
+        for task in batch:
+            task.state = TimerTask.STATE_FIRED
+            self.active_timers.pop(task.timer_id, None)
+            self._unindex_devices(task)
+        
+        self._compact_deadline_heap()
+        return batch
     
-    def _execute_timer(self, timer_id: str, device_id: str, action: str):
-        """Thực thi timer (gọi từ background thread).
+    def _execute_batch(self, batch: List[TimerTask]):
+        """Thực thi 1 batch timer (gọi từ scheduler thread, không giữ lock).
         
         Args:
-            timer_id: ID của timer
-            device_id: ID của thiết bị
-            action: Hành động cần thực thi
+            batch: Các timer cần thực thi
         """
-        print(f"\n⏰ TIMER KÍCH HOẠT: {timer_id}")
+        if not batch:
+            return
         
-        # Execute command
-        success = self.controller.control_device(device_id, action)
+        started_at = datetime.now()
+        started = time.perf_counter()
         
-        if success:
-            print(f"✅ Timer thực thi thành công: {action} trên {device_id}")
+        if len(batch) == 1:
+            print(f"\n⏰ TIMER KÍCH HOẠT: {batch[0].timer_id}")
         else:
-            print(f"❌ Timer thực thi thất bại: {action} trên {device_id}")
+            print(f"\n⏰ TIMER KÍCH HOẠT: {len(batch)} timers (gộp batch)")
         
-        # Remove from active timers
-        with self._lock:
-            if timer_id in self.active_timers:
-                del self.active_timers[timer_id]
-                print(f"🗑️ Đã xóa timer: {timer_id}\n")
+        # Resolve targets at fire time; each task maps to a slice of commands
+        commands = []
+        spans = []
+        for task in batch:
+            start = len(commands)
+            commands.extend(
+                (device_id, task.action, task.params)
+                for device_id in task.resolve_devices(self.controller)
+            )
+            spans.append((start, len(commands)))
+        
+        # Execute all commands as one batch (one observer notification)
+        results = self.controller.control_devices(commands)
+        self._record_stats(batch, started_at, time.perf_counter() - started)
+        
+        failed = 0
+        for task, (start, end) in zip(batch, spans):
+            succeeded = sum(1 for result in results[start:end] if result)
+            total = end - start
+            if total == 0 or succeeded < total:
+                failed += 1
+                target = task.device_id or task.device_name
+                detail = f" ({succeeded}/{total} thiết bị)" if task.target is not None else ""
+                print(f"❌ Timer thực thi thất bại: {task.action_label} trên {target}{detail}")
+        
+        if len(batch) == 1:
+            if not failed:
+                task = batch[0]
+                print(f"✅ Timer thực thi thành công: {task.action_label} trên {task.device_id or task.device_name}")
+            print(f"🗑️ Đã xóa timer: {batch[0].timer_id}\n")
+        else:
+            print(f"✅ Batch hoàn tất: {len(batch) - failed} thành công, {failed} thất bại\n")
+    
+    def _record_stats(self, batch: List[TimerTask], started_at: datetime, duration: float):
+        """Ghi độ trễ kích hoạt và thời gian thực thi của 1 batch.
+        
+        Độ trễ = thời điểm bắt đầu chạy batch - scheduled_time (timer chạy sớm
+        nhờ coalesce được tính là 0). Thời gian thực thi của mỗi timer là thời
+        gian chạy cả batch, vì kết quả chỉ được notify khi batch hoàn tất.
+        
+        Args:
+            batch: Các timer vừa thực thi
+            started_at: Thời điểm bắt đầu chạy batch
+            duration: Thời gian chạy batch (giây)
+        """
+        with self._stats_lock:
+            for task in batch:
+                lag = self._lag_stats.get(task.action)
+                if lag is None:
+                    lag = self._lag_stats[task.action] = LatencyHistogram()
+                    self._duration_stats[task.action] = LatencyHistogram()
+                lag.record((started_at - task.scheduled_time).total_seconds())
+                self._duration_stats[task.action].record(duration)
+    
+    def get_timer_stats(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Lấy thống kê độ trễ kích hoạt và thời gian thực thi theo hành động.
+        
+        Returns:
+            {action: {'lag': {...}, 'duration': {...}}}, mỗi mục gồm
+            count, mean_ms, p50_ms, p99_ms, max_ms
+        """
+        with self._stats_lock:
+            return {
+                action: {
+                    'lag': self._lag_stats[action].summary(),
+                    'duration': self._duration_stats[action].summary()
+                }
+                for action in self._lag_stats
+            }
+    
+    def reset_timer_stats(self):
+        """Xóa thống kê độ trễ."""
+        with self._stats_lock:
+            self._lag_stats.clear()
+            self._duration_stats.clear()
+    
+    def print_timer_stats(self):
+        """In thống kê độ trễ của timers."""
+        stats = self.get_timer_stats()
+        
+        if not stats:
+            print("\n⏱️ Chưa có timer nào được thực thi")
+            return
+        
+        print("\n" + "="*50)
+        print("        THỐNG KÊ ĐỘ TRỄ TIMER")
+        print("="*50)
+        
+        for action, data in sorted(stats.items()):
+            lag = data['lag']
+            duration = data['duration']
+            print(f"\n[{action}] - {lag['count']} lần")
+            print(f"  Trễ kích hoạt: p50 {lag['p50_ms']:.1f}ms | p99 {lag['p99_ms']:.1f}ms | max {lag['max_ms']:.1f}ms")
+            print(f"  Thời gian chạy: p50 {duration['p50_ms']:.1f}ms | p99 {duration['p99_ms']:.1f}ms | max {duration['max_ms']:.1f}ms")
+        
+        print("\n" + "="*50 + "\n")
     
     def cancel_timer(self, timer_id: str) -> bool:
         """Hủy một timer đang chạy.
@@ -167,9 +712,128 @@ class TimerManager:
             task = self.active_timers[timer_id]
             task.cancel()
             del self.active_timers[timer_id]
+            self._unindex(task)
+            self._compact_deadline_heap()
+            
+            print(f"❌ Đã hủy timer: {task.device_name} - {task.action_label}")
+        
+        self.notify_timer_observers('on_timers_cancelled', [task])
+        return True
+    
+    def cancel_timers(self, timer_ids: Iterable[str]) -> int:
+        """Hủy nhiều timer trong 1 lần giữ lock, với 1 sự kiện cancelled duy nhất.
+        
+        Args:
+            timer_ids: ID các timer cần hủy (ID không tồn tại được bỏ qua)
+            
+        Returns:
+            Số timer đã hủy
+        """
+        with self._lock:
+            cancelled = []
+            for timer_id in timer_ids:
+                task = self.active_timers.pop(timer_id, None)
+                if task is None:
+                    continue
+                task.cancel()
+                cancelled.append(task)
             
-            print(f"❌ Đã hủy timer: {task.device_name} - {task.action}")
-            return True
+            if cancelled:
+                self._unindex_cancelled(cancelled)
+                print(f"❌ Đã hủy {len(cancelled)} timer(s)")
+        
+        self.notify_timer_observers('on_timers_cancelled', cancelled)
+        return len(cancelled)
+    
+    def _unindex_cancelled(self, cancelled: List[TimerTask]):
+        """Bỏ các timer vừa hủy khỏi index (gọi khi đang giữ lock).
+        
+        Hủy hàng loạt dựng lại time index 1 lần thay vì xóa từng phần tử.
+        """
+        if len(cancelled) > 32:
+            self._time_index = [entry for entry in self._time_index if entry[2].is_active()]
+            for task in cancelled:
+                self._unindex_devices(task)
+        else:
+            for task in cancelled:
+                self._unindex(task)
+        self._compact_deadline_heap()
+    
+    # Timer Observer Methods
+    
+    def register_timer_observer(self, observer: TimerObserver):
+        """Đăng ký observer nhận sự kiện timer.
+        
+        Args:
+            observer: TimerObserver instance
+        """
+        if observer not in self.timer_observers:
+            self.timer_observers.append(observer)
+    
+    def unregister_timer_observer(self, observer: TimerObserver):
+        """Hủy đăng ký observer sự kiện timer.
+        
+        Args:
+            observer: TimerObserver instance
+        """
+        if observer in self.timer_observers:
+            self.timer_observers.remove(observer)
+    
+    def notify_timer_observers(self, event: str, tasks: List[TimerTask]):
+        """Gửi 1 sự kiện timer (cho cả danh sách task) tới tất cả observers.
+        
+        Args:
+            event: Tên phương thức của TimerObserver (VD: 'on_timers_fired')
+            tasks: Các timer liên quan
+        """
+        if not tasks:
+            return
+        for observer in list(self.timer_observers):
+            try:
+                getattr(observer, event)(tasks)
+            except Exception as e:
+                print(f"❌ Lỗi khi gửi sự kiện timer: {e}")
+    
+    # Observer Pattern Methods
+    
+    def update(self, device_id: str):
+        """Observer callback - thay đổi trạng thái không ảnh hưởng tới timers."""
+        pass
+    
+    def on_devices_removed(self, device_ids: List[str]):
+        """Hủy timers của các thiết bị vừa bị xóa (tra device index).
+        
+        Chi phí O(số timer của các thiết bị đó). Timer nhiều thiết bị chỉ bỏ
+        thiết bị bị xóa khỏi danh sách, và bị hủy khi không còn thiết bị đích.
+        
+        Args:
+            device_ids: ID các thiết bị vừa xóa
+        """
+        with self._lock:
+            cancelled = []
+            for device_id in device_ids:
+                for task in self._device_index.pop(device_id, {}).values():
+                    if not task.is_active():
+                        continue
+                    if task.target is not None:
+                        target = replace(
+                            task.target,
+                            device_ids=tuple(d for d in task.target.device_ids if d != device_id)
+                        )
+                        task.target = target
+                        if not target.is_empty():
+                            continue
+                    task.cancel()
+                    self.active_timers.pop(task.timer_id, None)
+                    cancelled.append(task)
+            
+            if not cancelled:
+                return
+            
+            self._unindex_cancelled(cancelled)
+            print(f"🧹 Đã hủy {len(cancelled)} timer(s) của thiết bị đã xóa")
+        
+        self.notify_timer_observers('on_timers_cancelled', cancelled)
     
     def cancel_all_timers(self) -> int:
         """Hủy tất cả timers đang chạy.
@@ -178,17 +842,22 @@ class TimerManager:
             Số lượng timers đã hủy
         """
         with self._lock:
-            count = len(self.active_timers)
+            cancelled = list(self.active_timers.values())
             
-            for task in self.active_timers.values():
+            for task in cancelled:
                 task.cancel()
             
             self.active_timers.clear()
+            self._deadline_heap.clear()
+            self._time_index.clear()
+            self._device_index.clear()
             
-            if count > 0:
-                print(f"❌ Đã hủy {count} timer(s)")
-            
-            return count
+            if cancelled:
+                print(f"❌ Đã hủy {len(cancelled)} timer(s)")
+        
+        if cancelled:
+            self.notify_timer_observers('on_timers_cancelled', cancelled)
+        return len(cancelled)
     
     def get_active_timers(self) -> List[TimerTask]:
         """Lấy danh sách các timers đang active.
@@ -213,7 +882,7 @@ class TimerManager:
         return self.active_timers.get(timer_id)
     
     def get_timers_for_device(self, device_id: str) -> List[TimerTask]:
-        """Lấy tất cả timers của một thiết bị.
+        """Lấy tất cả timers của một thiết bị (tra index, O(số timer của thiết bị)).
         
         Args:
             device_id: ID của thiết bị
@@ -221,14 +890,48 @@ class TimerManager:
         Returns:
             List các TimerTask
         """
-        return [
-            task for task in self.get_active_timers()
-            if task.device_id == device_id
-        ]
+        with self._lock:
+            return list(self._device_index.get(device_id, {}).values())
+    
+    def get_ordered_timers(self) -> List[TimerTask]:
+        """Lấy tất cả timers đang chờ, sắp xếp theo thời gian thực thi.
+        
+        Returns:
+            List các TimerTask (không cần sort lại)
+        """
+        with self._lock:
+            return [entry[2] for entry in self._time_index]
+    
+    def get_next_timers(self, count: int) -> List[TimerTask]:
+        """Lấy count timers sắp thực thi tiếp theo.
+        
+        Args:
+            count: Số timer cần lấy
+            
+        Returns:
+            List các TimerTask theo thứ tự thời gian
+        """
+        with self._lock:
+            return [entry[2] for entry in self._time_index[:max(0, count)]]
+    
+    def get_timers_between(self, start: datetime, end: datetime) -> List[TimerTask]:
+        """Lấy các timers thực thi trong khoảng [start, end] (O(log n + k)).
+        
+        Args:
+            start: Thời điểm bắt đầu
+            end: Thời điểm kết thúc
+            
+        Returns:
+            List các TimerTask theo thứ tự thời gian
+        """
+        with self._lock:
+            lo = bisect.bisect_left(self._time_index, (start,))
+            hi = bisect.bisect_right(self._time_index, (end, float('inf')))
+            return [entry[2] for entry in self._time_index[lo:hi]]
     
     def print_active_timers(self):
         """In ra danh sách timers đang active."""
-        timers = self.get_active_timers()
+        timers = self.get_ordered_timers()
         
         if not timers:
             print("\n⏰ Không có timer nào đang chạy")
@@ -238,13 +941,13 @@ class TimerManager:
         print("        TIMERS ĐANG HOẠT ĐỘNG")
         print("="*50)
         
-        for task in sorted(timers, key=lambda t: t.scheduled_time):
+        for task in timers:
             remaining = task.time_remaining()
             minutes, seconds = divmod(remaining, 60)
             
             print(f"\n[{task.timer_id}]")
             print(f"  Thiết bị: {task.device_name}")
-            print(f"  Hành động: {task.action}")
+            print(f"  Hành động: {task.action_label}")
             print(f"  Thời gian thực thi: {task.scheduled_time.strftime('%H:%M:%S')}")
             print(f"  Còn lại: {minutes} phút {seconds} giây")
         
@@ -259,4 +962,12 @@ class TimerManager:
             
             if completed:
                 print(f"🧹 Đã dọn dẹp {len(completed)} timer(s) đã hoàn thành")
-
+    
+    def shutdown(self):
+        """Dừng scheduler thread và hủy các timer còn lại."""
+        self.controller.unregister_observer(self)
+        self.cancel_all_timers()
+        with self._wakeup:
+            self._running = False
+            self._wakeup.notify()
+        self._scheduler_thread.join(timeout=1)
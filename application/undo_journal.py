@@ -0,0 +1,280 @@
+"""Undo Journal - Hoàn tác / làm lại lệnh điều khiển và đổi tên phòng."""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+from simulation.light_simulator import Light
+from simulation.fan_simulator import Fan
+from simulation.door_simulator import Door
+from application.device_controller import CommandRecorder
+
+
+# Lệnh đặt mức -> tên tham số
+LEVEL_COMMANDS = {Light: ("set_brightness", "brightness"), Fan: ("set_speed", "speed")}
+
+# (trạng thái cửa hiện tại, trạng thái cần về) -> các lệnh theo thứ tự
+DOOR_TRANSITIONS = {
+    (Door.STATE_CLOSED, Door.STATE_OPEN): ("open",),
+    (Door.STATE_CLOSED, Door.STATE_LOCKED): ("lock",),
+    (Door.STATE_OPEN, Door.STATE_CLOSED): ("close",),
+    (Door.STATE_OPEN, Door.STATE_LOCKED): ("close", "lock"),
+    (Door.STATE_LOCKED, Door.STATE_CLOSED): ("unlock",),
+    (Door.STATE_LOCKED, Door.STATE_OPEN): ("unlock", "open"),
+}
+
+# Các bước của 1 thao tác: mỗi bước là {(lệnh, tham số): [device_id...]}.
+# Bước sau chỉ chạy sau bước trước (VD: cửa phải unlock rồi mới open được).
+CommandSteps = List[Dict[Tuple[str, Optional[Tuple[str, int]]], List[str]]]
+
+
+def _capture(device) -> Tuple:
+    """Phần trạng thái có thể hoàn tác của thiết bị."""
+    if isinstance(device, Door):
+        return (device.state,)
+    if isinstance(device, Light):
+        return (device.is_on, device.brightness)
+    if isinstance(device, Fan):
+        return (device.is_on, device.speed)
+    return (device.is_on,)
+
+
+def _add_transition(steps: CommandSteps, device, device_id: str, current: Tuple, target: Tuple):
+    """Thêm các lệnh đưa thiết bị từ trạng thái current về target vào steps."""
+    if isinstance(device, Door):
+        commands = [(command, None) for command in DOOR_TRANSITIONS.get((current[0], target[0]), ())]
+    else:
+        commands = []
+        level_command = LEVEL_COMMANDS.get(type(device))
+        if level_command is not None and current[1] != target[1]:
+            command, param = level_command
+            commands.append((command, (param, target[1])))
+        if current[0] != target[0]:
+            commands.append(("turn_on" if target[0] else "turn_off", None))
+    
+    for position, key in enumerate(commands):
+        if position == len(steps):
+            steps.append({})
+        steps[position].setdefault(key, []).append(device_id)
+
+
+@dataclass
+class UndoEntry:
+    """1 thao tác có thể hoàn tác, lưu dưới dạng lệnh ngược (không lưu bản sao thiết bị)."""
+    label: str
+    undo: CommandSteps = field(default_factory=list)
+    redo: CommandSteps = field(default_factory=list)
+    rename: Optional[Tuple[str, str, List[str]]] = None  # (tên cũ, tên mới, ID thiết bị đã chuyển)
+    coalesce_key: Optional[Tuple[str, str]] = None  # (device_id, lệnh) khi chỉ có 1 lệnh
+    recorded_at: float = 0.0
+    
+    @property
+    def size(self) -> int:
+        """Số thao tác trên thiết bị được giữ (để giới hạn bộ nhớ)."""
+        if self.rename is not None:
+            return len(self.rename[2])
+        return sum(len(ids) for steps in (self.undo, self.redo) for step in steps for ids in step.values())
+
+
+class UndoJournal(CommandRecorder):
+    """Hoàn tác / làm lại lệnh điều khiển và đổi tên phòng.
+    
+    Mỗi lệnh đơn, mỗi batch của control_devices() và mỗi lần đổi tên phòng là
+    1 thao tác. Journal giữ trạng thái có thể hoàn tác gần nhất của từng thiết
+    bị (bật/tắt, độ sáng/tốc độ, trạng thái cửa) và chỉ lưu phần đã thay đổi
+    dưới dạng lệnh ngược, gom theo (lệnh, tham số) - tắt 10k đèn đang bật chỉ
+    lưu 1 lệnh turn_on cùng 10k ID. Hoàn tác 1 batch được gửi lại thành 1 lần
+    control_devices(), nên observers chỉ được thông báo 1 lần.
+    """
+    
+    def __init__(self, controller, max_entries: int = 100, max_operations: int = 1000000,
+                 coalesce_seconds: float = 1.0):
+        """Khởi tạo journal và bắt đầu ghi thao tác.
+        
+        Args:
+            controller: DeviceController instance
+            max_entries: Số thao tác tối đa có thể hoàn tác
+            max_operations: Tổng số lệnh trên thiết bị tối đa được giữ
+            coalesce_seconds: Gộp các lệnh liên tiếp cùng loại trên cùng 1 thiết bị
+                trong khoảng này (VD: kéo thanh trượt độ sáng) thành 1 thao tác
+        """
+        self.controller = controller
+        self.max_entries = max_entries
+        self.max_operations = max_operations
+        self.coalesce_seconds = coalesce_seconds
+        
+        self._lock = threading.RLock()  # Reentrant: undo()/redo() nhận lại chính lệnh mình gửi
+        self._undo_stack: deque = deque()
+        self._redo_stack: deque = deque()
+        self._applying = False  # Đang gửi lệnh của undo()/redo() - không ghi thành thao tác mới
+        self._states: Dict[str, Tuple] = {
+            device.device_id: _capture(device) for device in list(controller.devices.values())
+        }
+        controller.register_command_recorder(self)
+    
+    # CommandRecorder
+    
+    def record_command(self, device_id: str, command: str, params: Optional[Dict]):
+        """Ghi 1 lệnh đơn thành 1 thao tác."""
+        self.record_commands([(device_id, command, params)])
+    
+    def record_commands(self, commands: List[Tuple[str, str, Optional[Dict]]]):
+        """Ghi 1 batch lệnh thành 1 thao tác."""
+        with self._lock:
+            entry = UndoEntry(self._label(commands), recorded_at=time.monotonic())
+            devices = self.controller.devices
+            for device_id in dict.fromkeys(device_id for device_id, _, _ in commands):
+                device = devices.get(device_id)
+                before = self._states.get(device_id)
+                if device is None or before is None:
+                    continue
+                after = _capture(device)
+                if after == before:
+                    continue
+                self._states[device_id] = after
+                _add_transition(entry.undo, device, device_id, after, before)
+                _add_transition(entry.redo, device, device_id, before, after)
+            
+            if self._applying or not entry.undo:
+                return
+            if len(commands) == 1:
+                entry.coalesce_key = (commands[0][0], commands[0][1])
+            self._push(entry)
+    
+    def record_devices_added(self, devices: List):
+        """Bắt đầu theo dõi trạng thái các thiết bị mới."""
+        with self._lock:
+            for device in devices:
+                self._states[device.device_id] = _capture(device)
+    
+    def record_devices_removed(self, devices: List):
+        """Ngừng theo dõi các thiết bị đã xóa (lệnh ngược của chúng được bỏ qua)."""
+        with self._lock:
+            for device in devices:
+                self._states.pop(device.device_id, None)
+    
+    def record_room_renamed(self, old_name: str, new_name: str, device_ids: List[str]):
+        """Ghi thao tác đổi tên phòng: tên cũ + các thiết bị đã chuyển."""
+        with self._lock:
+            if self._applying:
+                return
+            self._push(UndoEntry(f"Đổi tên phòng '{old_name}' → '{new_name}'",
+                                 rename=(old_name, new_name, list(device_ids)),
+                                 recorded_at=time.monotonic()))
+    
+    @staticmethod
+    def _label(commands: List[Tuple[str, str, Optional[Dict]]]) -> str:
+        """Mô tả ngắn của thao tác để hiển thị."""
+        names = dict.fromkeys(command for _, command, _ in commands)
+        if len(commands) == 1:
+            return f"{commands[0][1]} {commands[0][0]}"
+        return f"{', '.join(names)} ({len(commands)} lệnh)"
+    
+    # Stacks
+    
+    def _push(self, entry: UndoEntry):
+        """Thêm thao tác mới, xóa redo và bỏ thao tác cũ nhất khi vượt giới hạn (gọi khi đã giữ lock)."""
+        self._redo_stack.clear()
+        
+        top = self._undo_stack[-1] if self._undo_stack else None
+        if (top is not None and entry.coalesce_key is not None and top.coalesce_key == entry.coalesce_key
+                and entry.recorded_at - top.recorded_at <= self.coalesce_seconds):
+            # Keep the oldest inverse, take the newest forward step
+            top.redo = entry.redo
+            top.recorded_at = entry.recorded_at
+            return
+        
+        self._undo_stack.append(entry)
+        operations = sum(item.size for item in self._undo_stack)
+        while len(self._undo_stack) > 1 and (len(self._undo_stack) > self.max_entries
+                                             or operations > self.max_operations):
+            operations -= self._undo_stack.popleft().size
+    
+    def can_undo(self) -> bool:
+        """Có thao tác để hoàn tác không."""
+        return bool(self._undo_stack)
+    
+    def can_redo(self) -> bool:
+        """Có thao tác để làm lại không."""
+        return bool(self._redo_stack)
+    
+    def undo_label(self) -> Optional[str]:
+        """Mô tả thao tác sẽ được hoàn tác (None nếu không có)."""
+        return self._undo_stack[-1].label if self._undo_stack else None
+    
+    def redo_label(self) -> Optional[str]:
+        """Mô tả thao tác sẽ được làm lại (None nếu không có)."""
+        return self._redo_stack[-1].label if self._redo_stack else None
+    
+    def undo(self) -> Optional[str]:
+        """Hoàn tác thao tác gần nhất.
+        
+        Returns:
+            Mô tả thao tác đã hoàn tác, None nếu không có gì để hoàn tác
+        """
+        with self._lock:
+            if not self._undo_stack:
+                return None
+            entry = self._undo_stack[-1]
+            self._apply(entry, entry.undo, reverse=True)  # Entry stays on the stack if this raises
+            self._undo_stack.pop()
+            self._redo_stack.append(entry)
+        print(f"↩️ Đã hoàn tác: {entry.label}")
+        return entry.label
+    
+    def redo(self) -> Optional[str]:
+        """Làm lại thao tác vừa hoàn tác.
+        
+        Returns:
+            Mô tả thao tác đã làm lại, None nếu không có gì để làm lại
+        """
+        with self._lock:
+            if not self._redo_stack:
+                return None
+            entry = self._redo_stack[-1]
+            self._apply(entry, entry.redo, reverse=False)  # Entry stays on the stack if this raises
+            self._redo_stack.pop()
+            self._undo_stack.append(entry)
+        print(f"↪️ Đã làm lại: {entry.label}")
+        return entry.label
+    
+    def _apply(self, entry: UndoEntry, steps: CommandSteps, reverse: bool):
+        """Gửi lệnh ngược/xuôi của 1 thao tác qua controller (gọi khi đã giữ lock)."""
+        self._applying = True
+        try:
+            if entry.rename is not None:
+                old_name, new_name, device_ids = entry.rename
+                if reverse:
+                    self.controller.rename_room(new_name, old_name, device_ids)
+                else:
+                    self.controller.rename_room(old_name, new_name, device_ids)
+            elif steps:
+                self.controller.control_devices(self._expand(steps))
+        finally:
+            self._applying = False
+    
+    def _expand(self, steps: CommandSteps) -> List[Tuple[str, str, Optional[Dict]]]:
+        """Chuyển các bước đã gom thành danh sách lệnh cho control_devices()."""
+        devices = self.controller.devices
+        commands = []
+        for step in steps:
+            for (command, param), device_ids in step.items():
+                params = {param[0]: param[1]} if param is not None else None
+                commands.extend((device_id, command, params) for device_id in device_ids if device_id in devices)
+        return commands
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Thống kê kích thước journal.
+        
+        Returns:
+            Dictionary với số thao tác undo/redo và tổng số lệnh trên thiết bị đang giữ
+        """
+        with self._lock:
+            return {'undo': len(self._undo_stack), 'redo': len(self._redo_stack),
+                    'operations': sum(item.size for stack in (self._undo_stack, self._redo_stack)
+                                      for item in stack)}
+    
+    def close(self):
+        """Ngừng ghi thao tác."""
+        self.controller.unregister_command_recorder(self)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Fleet Import Benchmark
+Tạo file JSON Lines/CSV chứa rất nhiều thiết bị, đo thời gian import_fleet()
+(streaming, thêm theo batch) và export_fleet(), kèm bộ nhớ đỉnh ngoài thiết bị.
+
+Chạy từ thư mục gốc của project:
+    python benchmarks/fleet_import.py --devices 500000 --format jsonl
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from application.device_controller import DeviceController
+from application.fleet_config import FLEET_FIELDS, export_fleet, import_fleet
+
+
+def write_fleet_file(path, count, file_format):
+    """Ghi file thiết bị mẫu (đèn/quạt/cửa xen kẽ, 100 phòng)."""
+    with open(path, "w", encoding="utf-8") as f:
+        if file_format == "csv":
+            f.write(",".join(FLEET_FIELDS) + "\n")
+        for i in range(count):
+            device_type = ("light", "fan", "door")[i % 3]
+            record = {"type": device_type, "device_id": f"{device_type}_{i:07d}",
+                      "name": f"Thiết bị {i}", "room": f"Phòng {i % 100}", "is_on": i % 2 == 0}
+            if device_type == "light":
+                record["brightness"] = i % 101
+            elif device_type == "fan":
+                record["speed"] = i % 3 + 1
+            else:
+                record["state"] = "closed"
+            if file_format == "csv":
+                f.write(",".join(str(record.get(name, "")) for name in FLEET_FIELDS) + "\n")
+            else:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main():
+    """Chạy benchmark."""
+    parser = argparse.ArgumentParser(description="Streaming fleet import/export benchmark")
+    parser.add_argument("--devices", type=int, default=500000, help="Số thiết bị trong file")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl", help="Định dạng file")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Số thiết bị mỗi lần add_devices()")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"fleet.{args.format}")
+        write_fleet_file(path, args.devices, args.format)
+        file_size = os.path.getsize(path)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            controller = DeviceController()
+            started = time.perf_counter()
+            report = import_fleet(path, controller, batch_size=args.batch_size)
+            import_time = time.perf_counter() - started
+            
+            export_path = os.path.join(tmp, f"export.{args.format}")
+            started = time.perf_counter()
+            export_fleet(export_path, controller.get_all_devices())
+            export_time = time.perf_counter() - started
+            
+            # Peak memory of the import itself, on a smaller run (tracemalloc slows everything down)
+            controller.remove_devices(list(controller.devices))
+            sample_path = os.path.join(tmp, f"sample.{args.format}")
+            sample_count = min(args.devices, 50000)
+            write_fleet_file(sample_path, sample_count, args.format)
+            tracemalloc.start()
+            import_fleet(sample_path, controller, batch_size=args.batch_size)
+            devices_size, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    
+    print("\n" + "="*60)
+    print("        FLEET IMPORT BENCHMARK")
+    print("="*60)
+    print(f"File: {args.format} | {args.devices} thiết bị | {file_size / 1e6:.1f} MB")
+    print(f"Nhập: {import_time:.2f}s ({args.devices / import_time:,.0f} thiết bị/s) | "
+          f"Đã thêm: {report.imported} | Lỗi: {report.failed}")
+    print(f"Xuất: {export_time:.2f}s ({args.devices / export_time:,.0f} thiết bị/s)")
+    print(f"Bộ nhớ tạm khi nhập ({sample_count} thiết bị): "
+          f"{(peak - devices_size) / 1e6:.1f} MB ngoài bản thân thiết bị")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+History Query Benchmark
+Ghi rất nhiều thay đổi trạng thái vào StateHistory rồi đo thời gian
+state_at() / device_state_at() tại các thời điểm ngẫu nhiên trong lịch sử.
+
+Chạy từ thư mục gốc của project:
+    python benchmarks/history_query.py --devices 1000 --events 500000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation.light_simulator import Light
+from application.device_controller import DeviceController
+from application.state_history import StateHistory
+
+
+def main():
+    """Chạy benchmark."""
+    parser = argparse.ArgumentParser(description="State history time-travel query benchmark")
+    parser.add_argument("--devices", type=int, default=1000, help="Số thiết bị")
+    parser.add_argument("--events", type=int, default=500000, help="Số lệnh thay đổi trạng thái")
+    parser.add_argument("--queries", type=int, default=200, help="Số truy vấn mỗi loại")
+    parser.add_argument("--checkpoint-every", type=int, default=10000, help="Số event tối thiểu giữa 2 checkpoint")
+    args = parser.parse_args()
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller = DeviceController()
+        for i in range(args.devices):
+            controller.add_device(Light(f"light_{i:05d}", f"Đèn {i}", f"Phòng {i % 20}"))
+        device_ids = list(controller.devices)
+        history = StateHistory(controller, checkpoint_every=args.checkpoint_every,
+                               max_events=args.events * 2)
+        
+        started_at = time.time()
+        started = time.perf_counter()
+        for i in range(args.events):
+            device_id = random.choice(device_ids)
+            if i % 2:
+                controller.control_device(device_id, "set_brightness", {"brightness": random.randint(0, 100)})
+            else:
+                controller.control_device(device_id, random.choice(["turn_on", "turn_off"]))
+        record_time = time.perf_counter() - started
+        ended_at = time.time()
+    
+    def measure(query):
+        times = []
+        for _ in range(args.queries):
+            moment = random.uniform(started_at, ended_at)
+            started = time.perf_counter()
+            query(moment)
+            times.append((time.perf_counter() - started) * 1000)
+        return statistics.median(times), max(times)
+    
+    home_median, home_max = measure(history.state_at)
+    device_median, device_max = measure(lambda moment: history.device_state_at(random.choice(device_ids), moment))
+    stats = history.get_stats()
+    
+    print("\n" + "="*60)
+    print("        HISTORY QUERY BENCHMARK")
+    print("="*60)
+    print(f"Thiết bị: {args.devices} | Lệnh: {args.events} | "
+          f"Event: {stats['events']} | Checkpoint: {stats['checkpoints']}")
+    print(f"Ghi lịch sử: {record_time / args.events * 1e6:.1f}µs / lệnh (gồm cả thực thi lệnh)")
+    print(f"state_at (toàn nhà):   median {home_median:7.2f}ms | max {home_max:7.2f}ms")
+    print(f"device_state_at:       median {device_median:7.3f}ms | max {device_max:7.3f}ms")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
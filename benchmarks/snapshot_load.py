@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Snapshot Benchmark
+Đo thời gian lưu snapshot nhị phân và nạp lại (mmap) cho số lượng lớn thiết bị.
+
+Chạy từ thư mục gốc của project:
+    python benchmarks/snapshot_load.py --devices 1000000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation.light_simulator import Light
+from simulation.fan_simulator import Fan
+from simulation.door_simulator import Door
+from application.device_controller import DeviceController
+from application.device_snapshot import read_snapshot, write_snapshot
+
+
+def create_devices(count):
+    """Tạo count thiết bị (đèn/quạt/cửa xen kẽ, 500 phòng).
+    
+    Args:
+        count: Số thiết bị
+    
+    Returns:
+        List thiết bị
+    """
+    devices = []
+    for i in range(count):
+        room = f"Phòng {i % 500}"
+        if i % 10 == 9:
+            devices.append(Door(f"door_{i:07d}", f"Cửa {i}", room))
+        elif i % 4 == 3:
+            devices.append(Fan(f"fan_{i:07d}", f"Quạt {i}", room, speed=i % 3 + 1))
+        else:
+            devices.append(Light(f"light_{i:07d}", f"Đèn {i}", room, brightness=i % 101))
+    return devices
+
+
+def main():
+    """Chạy benchmark."""
+    parser = argparse.ArgumentParser(description="Binary snapshot save/load benchmark")
+    parser.add_argument("--devices", type=int, default=1000000, help="Số thiết bị")
+    args = parser.parse_args()
+    
+    devices = create_devices(args.devices)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "devices.snap")
+        
+        started = time.perf_counter()
+        write_snapshot(path, devices)
+        save_time = time.perf_counter() - started
+        size_mb = os.path.getsize(path) / (1024 * 1024)
+        del devices
+        
+        started = time.perf_counter()
+        loaded = read_snapshot(path)
+        read_time = time.perf_counter() - started
+        del loaded
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            controller = DeviceController()
+            started = time.perf_counter()
+            controller.load_snapshot(path)
+            load_time = time.perf_counter() - started
+        
+        print("\n" + "="*60)
+        print("        SNAPSHOT BENCHMARK")
+        print("="*60)
+        print(f"Thiết bị: {args.devices} | Kích thước file: {size_mb:.1f}MB")
+        print(f"Lưu snapshot:               {save_time * 1000:8.1f}ms")
+        print(f"Đọc snapshot (mmap):        {read_time * 1000:8.1f}ms")
+        print(f"Nạp vào controller (+index): {load_time * 1000:7.1f}ms")
+        print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+SQLite Registry Benchmark
+Dồn lệnh liên tục vào controller khi có/không có SQLiteRegistry và so sánh
+số lệnh/giây, kèm thống kê các lần ghi batch.
+
+Chạy từ thư mục gốc của project:
+    python benchmarks/sqlite_registry.py --devices 10000 --seconds 5
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation.light_simulator import Light
+from application.device_controller import DeviceController
+from application.sqlite_registry import SQLiteRegistry
+
+
+def drive(controller, device_ids, seconds):
+    """Gửi lệnh bật/tắt/độ sáng ngẫu nhiên trong seconds giây.
+    
+    Returns:
+        Số lệnh đã gửi
+    """
+    sent = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        device_id = random.choice(device_ids)
+        if sent % 3 == 0:
+            controller.control_device(device_id, "set_brightness", {"brightness": random.randint(0, 100)})
+        else:
+            controller.control_device(device_id, random.choice(["turn_on", "turn_off"]))
+        sent += 1
+    return sent
+
+
+def main():
+    """Chạy benchmark."""
+    parser = argparse.ArgumentParser(description="SQLite registry sustained-write benchmark")
+    parser.add_argument("--devices", type=int, default=10000, help="Số thiết bị")
+    parser.add_argument("--seconds", type=float, default=5, help="Thời gian dồn lệnh mỗi lượt")
+    parser.add_argument("--interval", type=float, default=0.5, help="Chu kỳ ghi batch (giây)")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        controller = DeviceController()
+        for i in range(args.devices):
+            controller.add_device(Light(f"light_{i:06d}", f"Đèn {i}", f"Phòng {i % 100}"))
+        device_ids = list(controller.devices)
+        
+        baseline = drive(controller, device_ids, args.seconds)
+        
+        registry = SQLiteRegistry(os.path.join(tmp, "registry.db"), controller, flush_interval=args.interval)
+        mirrored = drive(controller, device_ids, args.seconds)
+        started = time.perf_counter()
+        registry.flush()
+        final_flush = time.perf_counter() - started
+        
+        on_ids = {device.device_id for device in controller.devices.values() if device.is_on}
+        in_sync = on_ids == {row["device_id"] for row in registry.find_devices(is_on=True)}
+        started = time.perf_counter()
+        registry.find_devices(room="Phòng 42", is_on=True)
+        query_time = time.perf_counter() - started
+        registry.close()
+    
+    print("\n" + "="*60)
+    print("        SQLITE REGISTRY BENCHMARK")
+    print("="*60)
+    print(f"Thiết bị: {args.devices} | Chu kỳ ghi: {args.interval}s")
+    print(f"Không registry: {baseline / args.seconds:10.0f} lệnh/s")
+    print(f"Có registry:    {mirrored / args.seconds:10.0f} lệnh/s")
+    print(f"Số lần ghi: {registry.flush_count} | Dòng đã ghi: {registry.rows_written} | "
+          f"Lần ghi cuối: {final_flush * 1000:.1f}ms")
+    print(f"Truy vấn phòng + trạng thái: {query_time * 1000:.2f}ms | Đồng bộ: {'✅' if in_sync else '❌'}")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
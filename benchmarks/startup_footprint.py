@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Startup Footprint Benchmark
+So sánh thời gian khởi động và bộ nhớ (max RSS) giữa chế độ headless và GUI.
+Mỗi chế độ được chạy bằng main.py --exit-after-startup trong process riêng.
+
+Chạy từ thư mục gốc của project (chế độ GUI cần display):
+    python benchmarks/startup_footprint.py --devices 1000 --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, "main.py")
+
+# Kiểm tra chế độ headless không kéo theo presentation/tkinter
+IMPORT_CHECK = """
+import runpy, sys
+sys.argv = ['main.py', '--headless', '--exit-after-startup', '--config', {config!r}]
+try:
+    runpy.run_path({main!r}, run_name='__main__')
+except SystemExit:
+    pass
+print('LOADED:', sorted(m for m in sys.modules if m.split('.')[0] in ('presentation', 'tkinter')))
+"""
+
+
+def write_fleet_config(path, count):
+    """Ghi file cấu hình count thiết bị (3 đèn : 1 quạt)."""
+    devices = []
+    for i in range(count):
+        device_type = "fan" if i % 4 == 3 else "light"
+        devices.append({
+            "type": device_type,
+            "device_id": f"{device_type}_{i:05d}",
+            "name": f"{device_type} {i}",
+            "room": f"Phòng {i % 50}"
+        })
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"devices": devices}, f)
+
+
+def run_once(args):
+    """Chạy main.py 1 lần.
+    
+    Returns:
+        Tuple (thời gian chạy giây, max RSS MB) hoặc None nếu thất bại
+    """
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, MAIN] + args, cwd=ROOT,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(process.pid, 0)
+    elapsed = time.perf_counter() - started
+    if not os.WIFEXITED(status) or os.WEXITSTATUS(status) != 0:
+        return None
+    # ru_maxrss: KB trên Linux, byte trên macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    return elapsed, rss_mb
+
+
+def measure(label, args, runs):
+    """Chạy 1 chế độ nhiều lần và in kết quả."""
+    results = [run_once(args) for _ in range(runs)]
+    if any(result is None for result in results):
+        print(f"{label:<10} không chạy được (thiếu display/tkinter?)")
+        return
+    times = [result[0] * 1000 for result in results]
+    rss = [result[1] for result in results]
+    print(f"{label:<10} khởi động: median {statistics.median(times):7.1f}ms | "
+          f"min {min(times):7.1f}ms | max RSS {max(rss):6.1f}MB")
+
+
+def main():
+    """Chạy benchmark."""
+    parser = argparse.ArgumentParser(description="Startup time / RSS: headless vs GUI")
+    parser.add_argument("--devices", type=int, default=1000, help="Số thiết bị trong file cấu hình")
+    parser.add_argument("--runs", type=int, default=5, help="Số lần chạy mỗi chế độ")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        config = os.path.join(tmp, "fleet.json")
+        write_fleet_config(config, args.devices)
+        
+        print("\n" + "="*60)
+        print("        STARTUP FOOTPRINT BENCHMARK")
+        print("="*60)
+        print(f"Thiết bị: {args.devices} | Số lần chạy: {args.runs}")
+        
+        measure("headless", ["--headless", "--exit-after-startup", "--config", config], args.runs)
+        measure("gui", ["--exit-after-startup", "--config", config], args.runs)
+        
+        check = subprocess.run(
+            [sys.executable, "-c", IMPORT_CHECK.format(config=config, main=MAIN)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        loaded = [line for line in check.stdout.splitlines() if line.startswith("LOADED:")]
+        print(f"Module presentation/tkinter ở chế độ headless: {loaded[0][8:] if loaded else 'không kiểm tra được'}")
+        print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
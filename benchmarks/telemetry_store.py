@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Telemetry Store Benchmark
+Ghi time-series mô phỏng nhiều ngày cho nhiều thiết bị vào TelemetryStore,
+sau đó in dung lượng (byte/điểm) và thời gian truy vấn khoảng/downsample.
+Kịch bản "live" ghi theo thời gian thực, xen kẽ các lần fsync theo tuổi
+buffer (max_buffer_age) như khi chạy thật.
+
+Chạy từ thư mục gốc của project:
+    python benchmarks/telemetry_store.py --devices 1000 --days 30
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from application.telemetry_store import TelemetryStore
+
+
+def main():
+    """Chạy benchmark."""
+    parser = argparse.ArgumentParser(description="Columnar telemetry store benchmark")
+    parser.add_argument("--devices", type=int, default=1000, help="Số thiết bị (đèn)")
+    parser.add_argument("--days", type=int, default=30, help="Số ngày lịch sử")
+    parser.add_argument("--changes-per-day", type=int, default=24, help="Số lần đổi độ sáng mỗi ngày")
+    parser.add_argument("--live-rounds", type=int, default=20,
+                        help="Số vòng ghi thời gian thực (mỗi vòng cách nhau 1 lần fsync theo tuổi buffer)")
+    parser.add_argument("--max-buffer-age", type=float, default=0.02,
+                        help="max_buffer_age (giây) của kịch bản live")
+    args = parser.parse_args()
+    
+    start = time.time() - args.days * 86400
+    interval = 86400 / args.changes_per_day
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TelemetryStore(tmp)
+        
+        started = time.perf_counter()
+        points = 0
+        for step in range(args.days * args.changes_per_day):
+            for i in range(args.devices):
+                # Jittered timestamps, brightness mostly unchanged between samples
+                timestamp = start + step * interval + random.uniform(0, 60)
+                value = 80 if step % 3 else random.choice((0, 20, 50, 80, 100))
+                store.append(f"light_{i:05d}", "brightness", timestamp, value)
+                points += 1
+        store.flush()
+        write_time = time.perf_counter() - started
+        stats = store.get_stats()
+        
+        end = start + args.days * 86400
+        started = time.perf_counter()
+        day = store.query("light_00042", "brightness", end - 86400, end)
+        query_time = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        buckets = store.downsample("light_00042", "brightness", start, end, max_points=args.days)
+        downsample_time = time.perf_counter() - started
+        store.close()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = TelemetryStore(tmp, max_buffer_age=args.max_buffer_age)
+        live_points = 0
+        started = time.perf_counter()
+        for step in range(args.live_rounds):
+            for i in range(args.devices):
+                value = 80 if step % 3 else random.choice((0, 20, 50, 80, 100))
+                store.append(f"light_{i:05d}", "brightness", time.time(), value)
+                live_points += 1
+            # Let the background thread fsync the round to the WAL before the next one
+            time.sleep(args.max_buffer_age * 3)
+        live_time = time.perf_counter() - started
+        live_stats = store.get_stats()
+        store.close()
+        
+        # Restart: buffers come back from the WAL, then are sealed into chunks
+        store = TelemetryStore(tmp, max_buffer_age=None)
+        started = time.perf_counter()
+        store.flush()
+        seal_time = time.perf_counter() - started
+        sealed_stats = store.get_stats()
+        store.close()
+    
+    print("\n" + "="*60)
+    print("        TELEMETRY STORE BENCHMARK")
+    print("="*60)
+    print(f"Thiết bị: {args.devices} | Ngày: {args.days} | Điểm: {points}")
+    print(f"Ghi: {points / write_time:10.0f} điểm/s | Chunk: {stats['chunks']}")
+    print(f"Dung lượng: {stats['disk_bytes'] / (1024 * 1024):.2f}MB | "
+          f"{stats['bytes_per_point']:.2f} byte/điểm (Python object ~ 100+ byte/điểm)")
+    print(f"Truy vấn 1 ngày ({len(day)} điểm): {query_time * 1000:.2f}ms")
+    print(f"Downsample {args.days} ngày → {len(buckets)} bucket: {downsample_time * 1000:.2f}ms")
+    print("-" * 60)
+    print(f"Live: {live_points} điểm / {args.live_rounds} vòng, fsync sau mỗi {args.max_buffer_age * 1000:.0f}ms "
+          f"({live_time:.2f}s)")
+    print(f"  Đang chạy: Chunk: {live_stats['chunks']} | WAL: {live_stats['wal_bytes'] / 1024:.0f}KB | "
+          f"{live_stats['bytes_per_point']:.2f} byte/điểm")
+    print(f"  Sau khi đóng chunk: Chunk: {sealed_stats['chunks']} | "
+          f"{sealed_stats['bytes_per_point']:.2f} byte/điểm ({seal_time * 1000:.1f}ms)")
+    print("="*60 + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Timer Stress Benchmark
+Đặt rất nhiều timer trong khi controller đang bị dồn lệnh liên tục,
+sau đó in thống kê độ trễ kích hoạt (p50/p99/max) theo hành động.
+
+Chạy từ thư mục gốc của project:
+    python benchmarks/timer_stress.py --timers 50000 --workers 4
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulation.light_simulator import Light
+from simulation.fan_simulator import Fan
+from application.device_controller import DeviceController
+from application.timer_manager import TimerManager
+
+
+def create_devices(controller, count):
+    """Tạo count thiết bị (3 đèn : 1 quạt).
+    
+    Args:
+        controller: DeviceController instance
+        count: Số thiết bị
+    
+    Returns:
+        List device_id
+    """
+    device_ids = []
+    for i in range(count):
+        if i % 4 == 3:
+            device = Fan(f"fan_{i:05d}", f"Quạt {i}", f"Phòng {i % 50}")
+        else:
+            device = Light(f"light_{i:05d}", f"Đèn {i}", f"Phòng {i % 50}")
+        controller.add_device(device)
+        device_ids.append(device.device_id)
+    return device_ids
+
+
+def saturate(controller, device_ids, stop_event, counter):
+    """Gửi lệnh liên tục tới controller cho tới khi stop_event được set."""
+    commands = ["turn_on", "turn_off"]
+    sent = 0
+    while not stop_event.is_set():
+        controller.control_device(random.choice(device_ids), random.choice(commands))
+        sent += 1
+    counter.append(sent)
+
+
+def main():
+    """Chạy benchmark."""
+    parser = argparse.ArgumentParser(description="Timer fire-latency stress benchmark")
+    parser.add_argument("--timers", type=int, default=50000, help="Số timer cần đặt")
+    parser.add_argument("--devices", type=int, default=1000, help="Số thiết bị")
+    parser.add_argument("--workers", type=int, default=4, help="Số thread dồn lệnh vào controller")
+    parser.add_argument("--spread", type=int, default=10, help="Timer được rải đều trong 1..spread giây")
+    parser.add_argument("--window", type=float, default=0.5, help="Cửa sổ coalesce (giây)")
+    args = parser.parse_args()
+    
+    # Device/timer output is very chatty - keep it out of the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        controller = DeviceController()
+        timer_manager = TimerManager(controller, coalesce_window=args.window)
+        device_ids = create_devices(controller, args.devices)
+    
+    stop_event = threading.Event()
+    counter = []
+    workers = [
+        threading.Thread(target=saturate, args=(controller, device_ids, stop_event, counter), daemon=True)
+        for _ in range(args.workers)
+    ]
+    
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for worker in workers:
+            worker.start()
+        
+        actions = [("turn_on", None), ("turn_off", None), ("set_brightness", {"brightness": 20})]
+        for i in range(args.timers):
+            action, params = actions[i % len(actions)]
+            device_id = device_ids[i % len(device_ids)]
+            if action == "set_brightness" and device_id.startswith("fan"):
+                action, params = "set_speed", {"speed": 1}
+            timer_manager.schedule_timer(device_id, action, 1 + i % args.spread, params=params)
+        schedule_time = time.perf_counter() - started
+        
+        # Wait for every timer to fire
+        while timer_manager.get_next_timers(1):
+            time.sleep(0.1)
+        time.sleep(0.5)
+        
+        stop_event.set()
+        for worker in workers:
+            worker.join()
+    
+    total = time.perf_counter() - started
+    print("\n" + "="*60)
+    print("        TIMER STRESS BENCHMARK")
+    print("="*60)
+    print(f"Timers: {args.timers} | Thiết bị: {args.devices} | Workers: {args.workers}")
+    print(f"Thời gian đặt timer: {schedule_time:.2f}s")
+    print(f"Lệnh nền đã gửi: {sum(counter)} trong {total:.2f}s")
+    timer_manager.print_timer_stats()
+    timer_manager.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,88 @@
 """
 Smart Home Controller - Main Entry Point
 Hệ thống mô phỏng điều khiển thiết bị IoT trong gia đình
+
+Cách chạy:
+    python main.py                                  # Giao diện, thiết bị mẫu
+    python main.py --config fleet.json              # Giao diện, thiết bị từ file cấu hình
+    python main.py --headless --config fleet.json   # Không giao diện (không cần tkinter/display)
+    python main.py --import-devices devices.csv     # Nhập thêm thiết bị từ file JSON Lines/CSV
+    python main.py --snapshot devices.snap          # Nạp/lưu trạng thái thiết bị qua snapshot + journal
+    python main.py --sqlite registry.db             # Mirror thiết bị vào SQLite để truy vấn
+    python main.py --telemetry telemetry/           # Lưu time-series trạng thái thiết bị
+    python main.py --profile-startup                # In thời gian từng giai đoạn khởi động
 """
 
+import time
+_PROCESS_START = time.perf_counter()  # Mốc trước khi import các module của ứng dụng
+
+import argparse
+import contextlib
+import os
+import signal
+import sys
+import threading
 from simulation.light_simulator import Light
 from simulation.fan_simulator import Fan
 from simulation.door_simulator import Door
 from application.device_controller import DeviceController
 from application.timer_manager import TimerManager
-from presentation.main_window import MainWindow
+
+
+class StartupProfile:
+    """Đo thời gian từng giai đoạn khởi động (--profile-startup)."""
+    
+    def __init__(self, enabled: bool, budget_ms: float):
+        """Khởi tạo profile.
+        
+        Args:
+            enabled: Có đo và in báo cáo không
+            budget_ms: Ngân sách thời gian khởi động (ms)
+        """
+        self.enabled = enabled
+        self.budget_ms = budget_ms
+        self.phases = []  # List (tên, giây, số module nạp thêm)
+        if enabled:
+            # Everything imported by main.py before main() ran
+            self.phases.append(("Import lõi", time.perf_counter() - _PROCESS_START, len(sys.modules)))
+    
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        """Đo 1 giai đoạn.
+        
+        Args:
+            name: Tên giai đoạn
+        """
+        if not self.enabled:
+            yield
+            return
+        modules_before = len(sys.modules)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - started, len(sys.modules) - modules_before))
+    
+    def report(self):
+        """In báo cáo thời gian khởi động."""
+        if not self.enabled:
+            return
+        total_ms = sum(seconds for _, seconds, _ in self.phases) * 1000
+        
+        print("\n" + "="*60)
+        print("        STARTUP PROFILE")
+        print("="*60)
+        for name, seconds, modules in self.phases:
+            share = seconds * 1000 / total_ms * 100 if total_ms else 0
+            print(f"  {name:<22} {seconds * 1000:8.1f}ms  {share:5.1f}%  (+{modules} module)")
+        print("-" * 60)
+        status = "✅" if total_ms <= self.budget_ms else "⚠️  VƯỢT"
+        print(f"  {'Tổng':<22} {total_ms:8.1f}ms  {status} ngân sách {self.budget_ms:.0f}ms")
+        
+        loaded = sorted(m for m in sys.modules if m.startswith("presentation."))
+        if loaded:
+            print(f"  Module giao diện đã nạp: {', '.join(m.split('.', 1)[1] for m in loaded)}")
+        print("="*60 + "\n")
 
 
 def create_sample_devices(controller):
@@ -52,42 +126,184 @@ def print_welcome():
     print("="*60 + "\n")
 
 
-def main():
-    """Hàm main - khởi chạy ứng dụng."""
+def parse_args(argv=None):
+    """Đọc tham số dòng lệnh.
+    
+    Args:
+        argv: Danh sách tham số (mặc định sys.argv)
+    
+    Returns:
+        argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(description="Smart Home Controller")
+    parser.add_argument("--headless", action="store_true",
+                        help="Chạy không giao diện (không import presentation/tkinter)")
+    parser.add_argument("--config", help="File cấu hình thiết bị (JSON) thay cho thiết bị mẫu")
+    parser.add_argument("--import-devices",
+                        help="Nhập thêm thiết bị từ file JSON Lines/CSV (streaming, theo batch)")
+    parser.add_argument("--snapshot",
+                        help="File snapshot thiết bị: nạp khi khởi động nếu đã có (thay cho --config), lưu lại khi thoát. "
+                             "Thao tác giữa 2 lần lưu được ghi vào journal <snapshot>.journal")
+    parser.add_argument("--durability-ms", type=float, default=50,
+                        help="Thời gian tối đa (ms) trước khi thao tác được fsync vào journal")
+    parser.add_argument("--sqlite", help="File SQLite để mirror thiết bị và trạng thái (ghi batch định kỳ)")
+    parser.add_argument("--history", action="store_true",
+                        help="Ghi lịch sử thay đổi trạng thái để truy vấn trạng thái tại thời điểm bất kỳ")
+    parser.add_argument("--telemetry", help="Thư mục lưu time-series trạng thái thiết bị (nén, dạng cột)")
+    parser.add_argument("--exit-after-startup", action="store_true",
+                        help="Thoát ngay khi khởi động xong (dùng để đo thời gian/bộ nhớ khởi động)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="In thời gian từng giai đoạn khởi động (import, dựng widget, frame đầu tiên)")
+    parser.add_argument("--startup-budget-ms", type=float, default=1500,
+                        help="Ngân sách thời gian khởi động dùng cho --profile-startup (ms)")
+    return parser.parse_args(argv)
+
+
+def run_headless(timer_manager, exit_after_startup: bool = False, profile: StartupProfile = None):
+    """Chạy không giao diện cho tới khi nhận SIGTERM/SIGINT.
+    
+    Args:
+        timer_manager: TimerManager instance
+        exit_after_startup: Thoát ngay sau khi khởi động
+        profile: StartupProfile để in báo cáo khởi động
+    """
+    stop_event = threading.Event()
+    
+    def _on_signal(signum, frame):
+        print(f"\n⚠️  Nhận tín hiệu {signal.Signals(signum).name}")
+        stop_event.set()
+    
+    signal.signal(signal.SIGTERM, _on_signal)
+    signal.signal(signal.SIGINT, _on_signal)
+    
+    print("✅ Đang chạy ở chế độ headless (SIGTERM/Ctrl+C để dừng)")
+    print("="*60 + "\n")
+    if profile:
+        profile.report()
+    
+    # Short waits keep the main thread responsive to signals on every platform
+    while not exit_after_startup and not stop_event.wait(0.5):
+        pass
+    
+    print("🛑 Đang dọn dẹp...")
+    timer_manager.shutdown()
+
+
+def run_gui(controller, timer_manager, exit_after_startup: bool = False, profile: StartupProfile = None):
+    """Khởi động giao diện.
+    
+    Args:
+        controller: DeviceController instance
+        timer_manager: TimerManager instance
+        exit_after_startup: Thoát ngay sau khi vẽ xong frame đầu tiên
+        profile: StartupProfile để đo các giai đoạn khởi động giao diện
+    """
+    profile = profile or StartupProfile(False, 0)
+    
+    # Imported here so headless mode never loads presentation/tkinter
+    with profile.phase("Import giao diện"):
+        import tkinter
+        from presentation.main_window import MainWindow
+    
+    print("🖥️  Khởi động giao diện...")
+    with profile.phase("Dựng widget"):
+        app = MainWindow(controller, timer_manager)
+    
+    with profile.phase("Vẽ frame đầu tiên"):
+        # MainWindow.update(device_id) is the Observer callback that shadows tk.Tk.update()
+        tkinter.Tk.update(app)
+    
+    print("✅ Ứng dụng đã sẵn sàng!")
+    print("="*60 + "\n")
+    profile.report()
+    
+    if exit_after_startup:
+        app.destroy()
+        return
+    
+    # Chạy GUI
+    app.run()
+
+
+def main(argv=None) -> int:
+    """Hàm main - khởi chạy ứng dụng.
+    
+    Returns:
+        Exit code (0 = bình thường, 1 = lỗi)
+    """
+    args = parse_args(argv)
+    profile = StartupProfile(args.profile_startup, args.startup_budget_ms)
+    exit_code = 0
+    controller = None
+    journal = None
+    registry = None
+    history = None
+    telemetry = None
     try:
         # Print welcome message
         print_welcome()
         
-        # Khởi tạo controller (Singleton)
-        print("🔧 Khởi tạo hệ thống...")
-        controller = DeviceController()
-        
-        # Khởi tạo timer manager
-        timer_manager = TimerManager(controller)
+        with profile.phase("Khởi tạo hệ thống"):
+            # Khởi tạo controller (Singleton)
+            print("🔧 Khởi tạo hệ thống...")
+            controller = DeviceController()
+            
+            # Khởi tạo timer manager
+            timer_manager = TimerManager(controller)
         
-        # Tạo thiết bị mẫu
-        create_sample_devices(controller)
+        from_snapshot = bool(args.snapshot) and os.path.exists(args.snapshot)
+        with profile.phase("Nạp thiết bị"):
+            if from_snapshot:
+                # Trạng thái đã lưu ở lần chạy trước
+                controller.load_snapshot(args.snapshot)
+            elif args.config:
+                # Thiết bị (và lịch hẹn giờ) từ file cấu hình
+                from application.fleet_config import load_fleet_config
+                load_fleet_config(args.config, controller, timer_manager)
+            else:
+                # Tạo thiết bị mẫu
+                create_sample_devices(controller)
+            
+            # Optional components are imported only when enabled, so a plain start
+            # never loads sqlite3, csv or the journal/registry/history/telemetry modules
+            # (mmap is still loaded: the controller's snapshot reader needs it)
+            if args.snapshot:
+                # Replay thao tác chưa kịp vào snapshot (crash lần trước), rồi ghi tiếp
+                from application.command_journal import CommandJournal
+                journal = CommandJournal(args.snapshot + ".journal", args.snapshot,
+                                         durability_window=args.durability_ms / 1000)
+                journal.open(controller)
+            
+            if args.import_devices:
+                from application.fleet_config import import_fleet
+                import_fleet(args.import_devices, controller)
+            
+            if args.sqlite:
+                from application.sqlite_registry import SQLiteRegistry
+                registry = SQLiteRegistry(args.sqlite, controller)
+            if args.history:
+                from application.state_history import StateHistory
+                history = StateHistory(controller)
+            if args.telemetry:
+                from application.telemetry_store import TelemetryRecorder, TelemetryStore
+                telemetry = TelemetryRecorder(controller, TelemetryStore(args.telemetry))
         
         # In thông tin hệ thống
         controller.print_summary()
         
-        # Demo một vài lệnh điều khiển
-        print("🧪 Demo điều khiển thiết bị:")
-        print("-" * 60)
-        controller.control_device("light_001", "turn_on")
-        controller.control_device("fan_001", "turn_on")
-        controller.control_device("door_001", "lock")
-        print("-" * 60 + "\n")
+        if not args.config and not from_snapshot:
+            # Demo một vài lệnh điều khiển
+            print("🧪 Demo điều khiển thiết bị:")
+            print("-" * 60)
+            controller.control_device("light_001", "turn_on")
+            controller.control_device("fan_001", "turn_on")
+            controller.control_device("door_001", "lock")
+            print("-" * 60 + "\n")
         
-        # Khởi tạo GUI
-        print("🖥️  Khởi động giao diện...")
-        app = MainWindow(controller, timer_manager)
-        
-        print("✅ Ứng dụng đã sẵn sàng!")
-        print("="*60 + "\n")
-        
-        # Chạy GUI
-        app.run()
+        if args.headless:
+            run_headless(timer_manager, args.exit_after_startup, profile)
+        else:
+            run_gui(controller, timer_manager, args.exit_after_startup, profile)
         
     except KeyboardInterrupt:
         print("\n\n⚠️  Nhận tín hiệu dừng (Ctrl+C)")
@@ -96,11 +312,28 @@ def main():
         print(f"\n❌ LỖI: {e}")
         import traceback
         traceback.print_exc()
+        exit_code = 1
     finally:
+        if telemetry is not None:
+            telemetry.close()
+            telemetry.store.close()
+        if history is not None:
+            history.close()
+        if registry is not None:
+            registry.close()
+        # Only a clean run may overwrite the previous snapshot; otherwise the
+        # journal keeps the operations for replay
+        if journal is not None:
+            try:
+                journal.close(compact=exit_code == 0)
+            except OSError as e:
+                print(f"❌ {e}")
+                exit_code = 1
         print("\n👋 Cảm ơn bạn đã sử dụng Smart Home Controller!")
         print("="*60 + "\n")
+    
+    return exit_code
 
 
 if __name__ == "__main__":
-    main()
-
+    sys.exit(main())
@@ -1,8 +1,20 @@
-"""Presentation layer - Giao diện người dùng."""
+"""Presentation layer - Giao diện người dùng.
 
-from presentation.main_window import MainWindow
-from presentation.dialogs import AddDeviceDialog, DeleteDeviceDialog, RoomManagerDialog
-from presentation.panels import DeviceControlPanel, TimerPanel
+Các class được import lười qua __getattr__ của module (PEP 562): module chỉ
+được nạp khi thuộc tính tương ứng được truy cập lần đầu.
+"""
+
+import importlib
+
+# {tên thuộc tính: module chứa nó}
+_LAZY_ATTRIBUTES = {
+    'MainWindow': 'presentation.main_window',
+    'AddDeviceDialog': 'presentation.dialogs',
+    'DeleteDeviceDialog': 'presentation.dialogs',
+    'RoomManagerDialog': 'presentation.dialogs',
+    'DeviceControlPanel': 'presentation.panels',
+    'TimerPanel': 'presentation.panels'
+}
 
 __all__ = [
     'MainWindow',
@@ -12,3 +24,17 @@ __all__ = [
     'DeviceControlPanel',
     'TimerPanel'
 ]
+
+
+def __getattr__(name):
+    """Nạp module chứa thuộc tính ở lần truy cập đầu tiên."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # Lần sau không đi qua __getattr__ nữa
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
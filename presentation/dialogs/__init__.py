@@ -1,11 +1,33 @@
-"""Dialogs package - Các hộp thoại của ứng dụng."""
+"""Dialogs package - Các hộp thoại của ứng dụng.
 
-from .add_device_dialog import AddDeviceDialog
-from .delete_device_dialog import DeleteDeviceDialog
-from .room_manager_dialog import RoomManagerDialog
+Mỗi dialog chỉ được import khi được dùng lần đầu (PEP 562).
+"""
+
+import importlib
+
+# {tên class: module con chứa nó}
+_LAZY_ATTRIBUTES = {
+    'AddDeviceDialog': '.add_device_dialog',
+    'DeleteDeviceDialog': '.delete_device_dialog',
+    'RoomManagerDialog': '.room_manager_dialog'
+}
 
 __all__ = [
     'AddDeviceDialog',
     'DeleteDeviceDialog',
     'RoomManagerDialog'
 ]
+
+
+def __getattr__(name):
+    """Nạp module chứa dialog ở lần truy cập đầu tiên."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # Lần sau không đi qua __getattr__ nữa
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
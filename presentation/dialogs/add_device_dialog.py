@@ -127,8 +127,8 @@ class AddDeviceDialog(tk.Toplevel):
             messagebox.showwarning("Cảnh báo", "Vui lòng chọn hoặc nhập phòng!", parent=self)
             return
         
-        # Generate unique ID
-        device_id = f"{device_type}_{len(self.controller.get_all_devices()) + 1:03d}"
+        # Generate unique ID (số thiết bị + 1 có thể trùng sau khi xóa/nhập thiết bị)
+        device_id = self.controller.generate_device_id(device_type)
         
         # Create device
         try:
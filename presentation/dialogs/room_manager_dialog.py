@@ -197,13 +197,8 @@ class RoomManagerDialog(tk.Toplevel):
             )
             return
         
-        # Rename room in all devices
-        devices = self.controller.get_all_devices()
-        updated_count = 0
-        for device in devices:
-            if device.room == old_name:
-                device.room = new_name
-                updated_count += 1
+        # Rename room in all devices (controller giữ index phòng đồng bộ)
+        updated_count = self.controller.rename_room(old_name, new_name)
         
         self._refresh_list()
         
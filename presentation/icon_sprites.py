@@ -0,0 +1,188 @@
+"""Icon Sprites - Cache sprite PhotoImage dựng sẵn cho icon thiết bị."""
+
+import math
+import tkinter as tk
+import weakref
+from typing import Dict, List, Tuple
+
+
+BRIGHTNESS_STEP = 10  # Độ sáng được làm tròn theo bước này để dùng chung sprite
+
+# Màu nền theo loại thiết bị và trạng thái (đèn bật dùng light_color)
+FILL_COLORS = {
+    ('fan', 'on'): '#add8e6',
+    ('door', 'open'): '#a52a2a',
+    ('other', 'on'): '#00ff00',
+}
+OFF_COLOR = '#bebebe'
+OUTLINE_COLOR = '#000000'
+GLYPH_COLOR = '#333333'
+LOCKED_GLYPH_COLOR = '#b22222'
+
+SpriteKey = Tuple[str, str, int, bool, int]  # (device_type, state, brightness_bucket, hover, size)
+
+
+def brightness_bucket(brightness: int) -> int:
+    """Làm tròn độ sáng (0-100) về bucket gần nhất."""
+    return int(round(brightness / BRIGHTNESS_STEP)) * BRIGHTNESS_STEP
+
+
+def light_color(brightness: int) -> str:
+    """Màu vàng theo độ sáng - càng sáng càng ít xanh dương.
+    
+    Args:
+        brightness: Độ sáng (0-100)
+    
+    Returns:
+        Màu RGB hex string
+    """
+    b = int(255 * (1 - brightness / 100))
+    return f'#ffff{b:02x}'
+
+
+def sprite_state(device, device_type: str) -> Tuple[str, int]:
+    """Rút gọn trạng thái thiết bị thành (state, brightness_bucket) cho sprite.
+    
+    Args:
+        device: Đối tượng thiết bị
+        device_type: Loại thiết bị
+    
+    Returns:
+        Tuple (state, brightness_bucket)
+    """
+    if device_type == 'door':
+        if getattr(device, 'is_locked', False):
+            return 'locked', 0
+        return ('open' if device.is_on else 'closed'), 0
+    
+    if device_type == 'light' and device.is_on:
+        return 'on', brightness_bucket(device.brightness)
+    return ('on' if device.is_on else 'off'), 0
+
+
+def _glyph_hit(device_type: str, u: float, v: float) -> bool:
+    """Điểm (u, v) trong hình tròn đơn vị có thuộc hình vẽ của loại thiết bị không."""
+    if device_type == 'light':
+        # Bulb + base
+        return (u * u + (v + 0.15) ** 2 <= 0.38 ** 2 or
+                (abs(u) <= 0.18 and 0.2 <= v <= 0.5))
+    if device_type == 'fan':
+        # Hub + 3 blades
+        r = math.hypot(u, v)
+        return r <= 0.15 or (r <= 0.65 and math.sin(3 * math.atan2(v, u)) > 0.5)
+    if device_type == 'door':
+        # Door frame + knob
+        inside = abs(u) <= 0.3 and -0.55 <= v <= 0.6
+        hollow = abs(u) <= 0.22 and -0.47 <= v <= 0.6
+        knob = (u - 0.12) ** 2 + (v - 0.05) ** 2 <= 0.06 ** 2
+        return (inside and not hollow) or knob
+    # Plug: 2 prongs + body
+    return ((0.1 <= abs(u) <= 0.25 and -0.5 <= v <= -0.1) or
+            (abs(u) <= 0.35 and -0.1 <= v <= 0.35))
+
+
+def sprite_rows(key: SpriteKey) -> List[Tuple[int, int, List[str]]]:
+    """Tính pixel của sprite theo từng hàng (chỉ phần nằm trong hình tròn).
+    
+    Args:
+        key: (device_type, state, brightness_bucket, hover, size)
+    
+    Returns:
+        List các tuple (x bắt đầu, y, danh sách màu) - pixel ngoài hình tròn trong suốt
+    """
+    device_type, state, bucket, hover, size = key
+    if device_type not in ('light', 'fan', 'door'):
+        device_type = 'other'
+    
+    if device_type == 'light' and state == 'on':
+        fill = light_color(bucket)
+    else:
+        fill = FILL_COLORS.get((device_type, state), OFF_COLOR)
+    glyph = LOCKED_GLYPH_COLOR if state == 'locked' else GLYPH_COLOR
+    
+    radius = size / 2
+    outline = (4 if hover else 2) / radius  # Độ dày viền theo tọa độ chuẩn hóa
+    rows = []
+    for y in range(size):
+        v = (y + 0.5 - radius) / radius
+        half = math.sqrt(max(0.0, 1 - v * v))
+        x_first = max(0, int(math.ceil(radius - half * radius - 0.5)))
+        x_last = min(size - 1, int(math.floor(radius + half * radius - 0.5)))
+        if x_last < x_first:
+            continue
+        
+        colors = []
+        for x in range(x_first, x_last + 1):
+            u = (x + 0.5 - radius) / radius
+            if u * u + v * v >= (1 - outline) ** 2:
+                colors.append(OUTLINE_COLOR)
+            elif _glyph_hit(device_type, u, v):
+                colors.append(glyph)
+            else:
+                colors.append(fill)
+        rows.append((x_first, y, colors))
+    return rows
+
+
+class SpriteCache:
+    """Cache sprite PhotoImage, dựng lười theo key và dùng lại cho mọi icon.
+    
+    Vẽ emoji bằng font trong Tk rất tốn kém và phải lặp lại cho từng item;
+    sprite chỉ được dựng 1 lần cho mỗi tổ hợp trạng thái, sau đó item canvas
+    hay Label chỉ cần đổi image.
+    """
+    
+    def __init__(self, master):
+        """Khởi tạo cache.
+        
+        Args:
+            master: Widget gốc sở hữu các PhotoImage
+        """
+        self.master = master
+        self._sprites: Dict[SpriteKey, tk.PhotoImage] = {}
+    
+    def __len__(self) -> int:
+        """Số sprite đã dựng."""
+        return len(self._sprites)
+    
+    def get(self, device_type: str, state: str, bucket: int = 0,
+            hover: bool = False, size: int = 60) -> tk.PhotoImage:
+        """Lấy sprite (dựng nếu chưa có).
+        
+        Args:
+            device_type: Loại thiết bị
+            state: Trạng thái ('on', 'off', 'open', 'closed', 'locked')
+            bucket: Bucket độ sáng (chỉ với đèn đang bật)
+            hover: Sprite có viền đậm cho hover
+            size: Kích thước (pixel)
+        
+        Returns:
+            PhotoImage
+        """
+        key = (device_type, state, bucket, hover, size)
+        image = self._sprites.get(key)
+        if image is None:
+            image = tk.PhotoImage(master=self.master, width=size, height=size)
+            for x, y, colors in sprite_rows(key):
+                image.put("{" + " ".join(colors) + "}", to=(x, y))
+            self._sprites[key] = image
+        return image
+
+
+_caches = weakref.WeakKeyDictionary()  # {Tk root: SpriteCache}
+
+
+def get_sprite_cache(widget) -> SpriteCache:
+    """Lấy cache sprite dùng chung cho cửa sổ gốc của widget.
+    
+    Args:
+        widget: Widget bất kỳ trong ứng dụng
+    
+    Returns:
+        SpriteCache
+    """
+    root = widget.nametowidget('.')
+    cache = _caches.get(root)
+    if cache is None:
+        cache = _caches[root] = SpriteCache(root)
+    return cache
@@ -1,12 +1,18 @@
 """Main Window - Cửa sổ chính của ứng dụng."""
 
+import math
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import Dict
+from typing import Dict, List
 from application.device_controller import Observer
-from presentation.dialogs import AddDeviceDialog, DeleteDeviceDialog, RoomManagerDialog
+from application.undo_journal import UndoJournal
 from presentation.panels import DeviceControlPanel, TimerPanel
 from presentation.room_visualization import RoomCanvas
+from presentation.ui_dispatcher import TkObserverAdapter
+
+
+# Ô nhập liệu tự xử lý Ctrl+Z/Ctrl+Y (ttk.Combobox/ttk.Spinbox kế thừa ttk.Entry)
+TEXT_INPUT_WIDGETS = (tk.Entry, tk.Text, tk.Spinbox, ttk.Entry)
 
 
 class MainWindow(tk.Tk, Observer):
@@ -23,15 +29,22 @@ class MainWindow(tk.Tk, Observer):
         
         self.controller = controller
         self.timer_manager = timer_manager
-        self.device_panels: Dict[str, DeviceControlPanel] = {}
+        self.device_panels: Dict[str, DeviceControlPanel] = {}  # Chỉ các card đang được dựng
+        self.panel_pool: Dict[str, List[DeviceControlPanel]] = {}  # {device_type: panels rảnh}
+        self.panel_pool_limit = 32  # Số panel rảnh tối đa giữ lại cho mỗi loại
+        self.grid_devices = []  # Toàn bộ thiết bị của device grid (sau khi lọc phòng)
         self.current_room = "Tất cả"
         
-        # Register as observer
-        self.controller.register_observer(self)
+        # Register as observer through a Tk-thread marshalling adapter,
+        # since controller notifications may come from the timer thread
+        self.ui_observer = TkObserverAdapter(self, self)
+        self.controller.register_observer(self.ui_observer)
+        self.undo_journal = UndoJournal(controller)
         
         self._setup_window()
         self._create_menu()
         self._create_widgets()
+        self.ui_observer.start()
     
     def _create_menu(self):
         """Tạo menu bar."""
@@ -44,8 +57,21 @@ class MainWindow(tk.Tk, Observer):
         device_menu.add_command(label="➕ Thêm thiết bị", command=self._on_add_device)
         device_menu.add_command(label="🗑️ Xóa thiết bị", command=self._on_remove_device)
         device_menu.add_separator()
+        device_menu.add_command(label="📥 Nhập từ file...", command=self._on_import_devices)
+        device_menu.add_command(label="📤 Xuất ra file...", command=self._on_export_devices)
+        device_menu.add_separator()
         device_menu.add_command(label="🔄 Làm mới", command=self._refresh_all)
         
+        # Edit menu (labels refreshed each time it opens)
+        edit_menu = tk.Menu(menubar, tearoff=0)
+        menubar.add_cascade(label="✏️ Chỉnh sửa", menu=edit_menu)
+        edit_menu.add_command(label="↩️ Hoàn tác", accelerator="Ctrl+Z", command=self._on_undo)
+        edit_menu.add_command(label="↪️ Làm lại", accelerator="Ctrl+Y", command=self._on_redo)
+        edit_menu.config(postcommand=self._update_edit_menu)
+        self.edit_menu = edit_menu
+        self.bind_all("<Control-z>", self._on_undo_shortcut)
+        self.bind_all("<Control-y>", self._on_redo_shortcut)
+        
         # Room menu
         room_menu = tk.Menu(menubar, tearoff=0)
         menubar.add_cascade(label="🏠 Phòng", menu=room_menu)
@@ -64,6 +90,35 @@ class MainWindow(tk.Tk, Observer):
         help_menu.add_command(label="📖 Hướng dẫn", command=self._show_help)
         help_menu.add_command(label="ℹ️ Về chương trình", command=self._show_about)
     
+    def _update_edit_menu(self):
+        """Cập nhật nhãn và trạng thái của Hoàn tác / Làm lại."""
+        undo_label = self.undo_journal.undo_label()
+        redo_label = self.undo_journal.redo_label()
+        self.edit_menu.entryconfig(0, label=f"↩️ Hoàn tác: {undo_label}" if undo_label else "↩️ Hoàn tác",
+                                   state="normal" if undo_label else "disabled")
+        self.edit_menu.entryconfig(1, label=f"↪️ Làm lại: {redo_label}" if redo_label else "↪️ Làm lại",
+                                   state="normal" if redo_label else "disabled")
+    
+    def _on_undo(self):
+        """Hoàn tác thao tác gần nhất (lệnh, batch lệnh hoặc đổi tên phòng)."""
+        if self.undo_journal.undo() is not None:
+            self._refresh_all()
+    
+    def _on_redo(self):
+        """Làm lại thao tác vừa hoàn tác."""
+        if self.undo_journal.redo() is not None:
+            self._refresh_all()
+    
+    def _on_undo_shortcut(self, event):
+        """Ctrl+Z: hoàn tác, trừ khi đang gõ trong ô nhập liệu."""
+        if not isinstance(event.widget, TEXT_INPUT_WIDGETS):
+            self._on_undo()
+    
+    def _on_redo_shortcut(self, event):
+        """Ctrl+Y: làm lại, trừ khi đang gõ trong ô nhập liệu."""
+        if not isinstance(event.widget, TEXT_INPUT_WIDGETS):
+            self._on_redo()
+    
     def _update_room_menu(self):
         """Cập nhật menu phòng với danh sách phòng hiện tại."""
         # Clear existing room items (keep "Tất cả", separator, "Quản lý phòng", and another separator)
@@ -106,30 +161,97 @@ class MainWindow(tk.Tk, Observer):
                 self._refresh_device_panels()
     
     def _layout_device_panels(self, devices):
-        """Layout device panels in grid.
+        """Layout device grid dạng ảo hóa.
+        
+        Chỉ các card nằm trong vùng nhìn thấy của devices_canvas (cộng thêm
+        vài hàng overscan) mới được dựng; chiều cao của grid vẫn đủ cho toàn
+        bộ thiết bị để thanh cuộn hoạt động bình thường.
         
         Args:
             devices: List of devices to layout
         """
-        # Clear old column configurations
-        for col in range(10):  # Clear up to 10 columns
-            self.devices_frame.grid_columnconfigure(col, weight=0, minsize=0)
-        
-        # Layout panels
-        for idx, device in enumerate(devices):
-            row = idx // self.device_grid_cols
-            col = idx % self.device_grid_cols
-            
-            panel = DeviceControlPanel(self.devices_frame, device, self.controller)
-            panel.grid(row=row, column=col, padx=6, pady=6)
-            self.device_panels[device.device_id] = panel
+        self.grid_devices = list(devices)
         
-        # Configure grid columns with fixed width (no expansion)
-        for col in range(self.device_grid_cols):
-            self.devices_frame.grid_columnconfigure(col, weight=0, minsize=self.device_card_min_width)
+        rows = math.ceil(len(self.grid_devices) / self.device_grid_cols)
+        self.devices_canvas.itemconfig(
+            self.devices_canvas_window,
+            height=max(1, rows * self.device_row_height)
+        )
+        
+        self._update_visible_panels()
+    
+    def _update_visible_panels(self):
+        """Dựng card cho các hàng đang hiển thị, hủy card đã ra khỏi vùng nhìn."""
+        self._visible_update_pending = None
+        cols = self.device_grid_cols
+        row_height = self.device_row_height
+        
+        # Visible row range (canvas may not be mapped yet on first layout)
+        view_height = self.devices_canvas.winfo_height()
+        if view_height <= 1:
+            view_height = 600
+        top = self.devices_canvas.canvasy(0)
+        first_row = max(0, int(top // row_height) - self.device_overscan_rows)
+        last_row = int((top + view_height) // row_height) + self.device_overscan_rows
+        
+        start = first_row * cols
+        end = min(len(self.grid_devices), (last_row + 1) * cols)
+        wanted = {self.grid_devices[i].device_id: i for i in range(start, end)}
+        
+        # Return cards that scrolled out of view to the pool
+        for device_id in [d for d in self.device_panels if d not in wanted]:
+            self._release_panel(self.device_panels.pop(device_id))
+            self.device_panel_slots.pop(device_id, None)
+        
+        # Build missing cards and move cards whose slot changed
+        for device_id, idx in wanted.items():
+            panel = self.device_panels.get(device_id)
+            if panel is None:
+                panel = self._acquire_panel(self.grid_devices[idx])
+                self.device_panels[device_id] = panel
+            if self.device_panel_slots.get(device_id) != idx:
+                row, col = divmod(idx, cols)
+                panel.place(x=col * self.device_card_min_width + 6, y=row * row_height + 6)
+                self.device_panel_slots[device_id] = idx
+    
+    def _acquire_panel(self, device) -> DeviceControlPanel:
+        """Lấy panel cho thiết bị: tái sử dụng panel rảnh cùng loại nếu có.
+        
+        Args:
+            device: Đối tượng thiết bị
+        
+        Returns:
+            DeviceControlPanel đã gắn với thiết bị
+        """
+        pool = self.panel_pool.get(device.get_status()['device_type'])
+        if pool:
+            panel = pool.pop()
+            panel.bind_device(device)
+            return panel
+        return DeviceControlPanel(self.devices_frame, device, self.controller)
+    
+    def _release_panel(self, panel: DeviceControlPanel):
+        """Trả panel về pool (ẩn đi), hoặc hủy nếu pool đã đầy.
+        
+        Args:
+            panel: Panel không còn được hiển thị
+        """
+        pool = self.panel_pool.setdefault(panel.device_type, [])
+        if len(pool) < self.panel_pool_limit:
+            panel.place_forget()
+            pool.append(panel)
+        else:
+            panel.destroy()
+    
+    def _schedule_visible_update(self):
+        """Gộp nhiều sự kiện cuộn/resize thành 1 lần cập nhật card."""
+        if self._visible_update_pending is None:
+            self._visible_update_pending = self.after_idle(self._update_visible_panels)
     
     def _on_add_device(self):
         """Xử lý thêm thiết bị mới."""
+        from presentation.dialogs import AddDeviceDialog  # Loaded on first use
+        
         dialog = AddDeviceDialog(self, self.controller)
         self.wait_window(dialog)
         
@@ -141,6 +263,8 @@ class MainWindow(tk.Tk, Observer):
     
     def _on_remove_device(self):
         """Xử lý xóa thiết bị."""
+        from presentation.dialogs import DeleteDeviceDialog  # Loaded on first use
+        
         dialog = DeleteDeviceDialog(self, self.controller)
         self.wait_window(dialog)
         
@@ -150,8 +274,51 @@ class MainWindow(tk.Tk, Observer):
             messagebox.showinfo("Thành công", f"Đã xóa thiết bị: {device_id}")
             self._refresh_all()
     
+    def _on_import_devices(self):
+        """Nhập thiết bị từ file CSV/JSON Lines."""
+        from tkinter import filedialog
+        from application.fleet_config import import_fleet  # Loaded on first use
+        
+        path = filedialog.askopenfilename(
+            parent=self, title="Nhập thiết bị",
+            filetypes=[("JSON Lines / CSV", "*.jsonl *.ndjson *.json *.csv"), ("Tất cả", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            report = import_fleet(path, self.controller)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Lỗi", f"Không thể nhập thiết bị: {e}")
+            return
+        
+        message = f"Đã nhập {report.imported} thiết bị, {report.failed} lỗi"
+        if report.errors:
+            message += "\n\n" + "\n".join(f"Dòng {line}: {error}" for line, error in report.errors[:10])
+        messagebox.showinfo("Nhập thiết bị", message)
+        self._refresh_all()
+    
+    def _on_export_devices(self):
+        """Xuất tất cả thiết bị ra file CSV/JSON Lines."""
+        from tkinter import filedialog
+        from application.fleet_config import export_fleet  # Loaded on first use
+        
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Xuất thiết bị", defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv")]
+        )
+        if not path:
+            return
+        try:
+            count = export_fleet(path, self.controller.get_all_devices())
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Lỗi", f"Không thể xuất thiết bị: {e}")
+            return
+        messagebox.showinfo("Xuất thiết bị", f"Đã xuất {count} thiết bị")
+    
     def _open_room_manager(self):
         """Mở dialog quản lý phòng."""
+        from presentation.dialogs import RoomManagerDialog  # Loaded on first use
+        
         dialog = RoomManagerDialog(self, self.controller)
         self.wait_window(dialog)
         
@@ -172,17 +339,17 @@ class MainWindow(tk.Tk, Observer):
     
     def _refresh_device_panels(self):
         """Làm mới panels của các thiết bị."""
-        # Clear existing panels
+        # Return existing panels to the pool (only the visible window is ever built)
         for panel in self.device_panels.values():
-            panel.destroy()
+            self._release_panel(panel)
         self.device_panels.clear()
+        self.device_panel_slots.clear()
         
         # Get devices (with room filter if needed)
-        devices = self.controller.get_all_devices()
-        
-        # Filter by room if needed
         if self.current_room != "Tất cả":
-            devices = [d for d in devices if d.room == self.current_room]
+            devices = self.controller.get_devices_by_room(self.current_room)
+        else:
+            devices = self.controller.get_all_devices()
         
         # Re-layout with current column count
         self._layout_device_panels(devices)
@@ -217,6 +384,9 @@ class MainWindow(tk.Tk, Observer):
         • Menu "Thiết bị" > "Thêm thiết bị": Thêm thiết bị mới
         • Menu "Thiết bị" > "Xóa thiết bị": Xóa thiết bị hiện có
         
+        HOÀN TÁC:
+        • Ctrl+Z / Ctrl+Y hoặc menu "Chỉnh sửa": Hoàn tác / làm lại lệnh điều khiển và đổi tên phòng
+        
         QUẢN LÝ PHÒNG:
         • Menu "Phòng": Lọc thiết bị theo phòng
         • Khi thêm thiết bị, có thể tạo phòng mới
@@ -247,8 +417,7 @@ class MainWindow(tk.Tk, Observer):
         self.geometry("1200x800")
         self.configure(bg="#f0f0f0")
         
-        # Center window
-        self.update_idletasks()
+        # Center window (screen size is known without flushing pending layout)
         x = (self.winfo_screenwidth() // 2) - (1200 // 2)
         y = (self.winfo_screenheight() // 2) - (800 // 2)
         self.geometry(f"1200x800+{x}+{y}")
@@ -284,10 +453,6 @@ class MainWindow(tk.Tk, Observer):
         left_frame = ttk.Frame(controls_container)
         left_frame.pack(side="left", fill="both", expand=True, padx=(0, 10))
         
-        # Set minimum size to prevent being squeezed too small
-        self.update_idletasks()
-        left_frame.update_idletasks()
-        
         ttk.Label(left_frame, text="Danh sách thiết bị:", font=("Arial", 12, "bold")).pack(anchor="w", pady=(0, 10))
         
         # Scrollable frame for devices (grid layout)
@@ -309,7 +474,13 @@ class MainWindow(tk.Tk, Observer):
         
         # Create window for frame inside canvas
         devices_canvas_window = devices_canvas.create_window((5, 5), window=devices_frame, anchor="nw")
-        devices_canvas.configure(yscrollcommand=devices_scrollbar.set)
+        
+        # Scrolling changes which cards are visible
+        def _on_devices_scroll(first, last):
+            devices_scrollbar.set(first, last)
+            self._schedule_visible_update()
+        
+        devices_canvas.configure(yscrollcommand=_on_devices_scroll)
         
         # Bind canvas resize to update frame width
         def _on_canvas_width_change(event):
@@ -326,9 +497,13 @@ class MainWindow(tk.Tk, Observer):
         self.devices_canvas = devices_canvas
         self.devices_canvas_window = devices_canvas_window  # Store window ID
         
-        # Config for grid layout (dynamic columns)
+        # Config for grid layout (dynamic columns, virtualized rows)
         self.device_card_min_width = 232  # Card width (200) + padx (6*2) + margins (20)
+        self.device_row_height = 212  # Tallest card (door/light ~200) + pady (6*2)
+        self.device_overscan_rows = 1  # Extra rows built above/below the viewport
         self.device_grid_cols = 1  # Will be calculated dynamically
+        self.device_panel_slots: Dict[str, int] = {}  # {device_id: grid index} of built cards
+        self._visible_update_pending = None
         
         # Bind resize event to recalculate columns
         self.after(100, self._calculate_initial_columns)
@@ -346,12 +521,14 @@ class MainWindow(tk.Tk, Observer):
                 if hasattr(self, '_resize_timer'):
                     self.after_cancel(self._resize_timer)
                 self._resize_timer = self.after(100, self._refresh_device_panels)
+            else:
+                # Height change may reveal more rows
+                self._schedule_visible_update()
         
         devices_canvas.bind("<Configure>", _on_canvas_resize_with_grid)
         
-        # Create device panels in grid
-        devices = self.controller.get_all_devices()
-        self._layout_device_panels(devices)
+        # Create device panels in grid (visible rows only)
+        self._layout_device_panels(self.controller.get_all_devices())
         
         # Right side - Timer panel (pack AFTER to be on top in z-order)
         right_frame = ttk.Frame(controls_container, width=350)
@@ -390,6 +567,26 @@ class MainWindow(tk.Tk, Observer):
         # Update status bar
         self._update_status()
     
+    def update_batch(self, device_ids):
+        """Observer callback cho batch - cập nhật từng thiết bị, status bar 1 lần.
+        
+        Args:
+            device_ids: Danh sách ID các thiết bị đã thay đổi
+        """
+        for device_id in device_ids:
+            if device_id in self.device_panels:
+                self.device_panels[device_id].update_display()
+            
+            if hasattr(self, 'room_canvas'):
+                self.room_canvas.update_device_icon(device_id)
+        
+        self._update_status()
+    
     def run(self):
         """Chạy ứng dụng."""
-        self.mainloop()
+        try:
+            self.mainloop()
+        finally:
+            # Window is gone - stop receiving controller notifications
+            self.controller.unregister_observer(self.ui_observer)
+            self.undo_journal.close()
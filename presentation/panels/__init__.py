@@ -1,9 +1,31 @@
-"""Panels package - Các panel của ứng dụng."""
+"""Panels package - Các panel của ứng dụng.
 
-from .device_control_panel import DeviceControlPanel
-from .timer_panel import TimerPanel
+Mỗi panel chỉ được import khi được dùng lần đầu (PEP 562).
+"""
+
+import importlib
+
+# {tên class: module con chứa nó}
+_LAZY_ATTRIBUTES = {
+    'DeviceControlPanel': '.device_control_panel',
+    'TimerPanel': '.timer_panel'
+}
 
 __all__ = [
     'DeviceControlPanel',
     'TimerPanel'
 ]
+
+
+def __getattr__(name):
+    """Nạp module chứa panel ở lần truy cập đầu tiên."""
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value  # Lần sau không đi qua __getattr__ nữa
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
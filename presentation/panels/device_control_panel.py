@@ -2,6 +2,8 @@
 
 import tkinter as tk
 from tkinter import ttk
+from presentation.icon_sprites import get_sprite_cache, sprite_state
+from presentation.ui_dispatcher import get_command_stream
 
 
 class DeviceControlPanel(ttk.Frame):
@@ -20,6 +22,10 @@ class DeviceControlPanel(ttk.Frame):
         self.controller = controller
         self.device_id = device.device_id
         self.device_type = device.get_status()['device_type']
+        self.sprites = get_sprite_cache(self)
+        self._sprite = None  # (state, brightness_bucket) đang hiển thị
+        self.command_stream = get_command_stream(self, controller)
+        self._dragging = False  # Đang kéo slider - không ghi đè giá trị người dùng đang chọn
         
         self._create_widgets()
         self.update_display()
@@ -30,10 +36,11 @@ class DeviceControlPanel(ttk.Frame):
         header_frame = ttk.Frame(self)
         header_frame.grid(row=0, column=0, columnspan=2, sticky="ew", pady=(0, 10))
         
-        # Device name and icon - aligned to top
-        icon = self._get_device_icon()
-        ttk.Label(header_frame, text=icon, font=("Arial", 22)).pack(side="left", anchor="n", padx=(0, 10))
-        ttk.Label(header_frame, text=self.device.name, font=("Arial", 10, "bold")).pack(side="left", anchor="n")
+        # Device sprite and name - aligned to top (sprite set in update_display)
+        self.icon_label = ttk.Label(header_frame)
+        self.icon_label.pack(side="left", anchor="n", padx=(0, 10))
+        self.name_label = ttk.Label(header_frame, text=self.device.name, font=("Arial", 10, "bold"))
+        self.name_label.pack(side="left", anchor="n")
         
         # Status label - fixed width for consistent alignment
         self.status_label = ttk.Label(self, text="", font=("Arial", 8), width=15, anchor="w")
@@ -69,6 +76,8 @@ class DeviceControlPanel(ttk.Frame):
             command=lambda v: self._on_brightness_change()
         )
         self.brightness_scale.grid(row=3, column=1, sticky="ew", pady=5)
+        self.brightness_scale.bind("<ButtonPress-1>", lambda e: self._set_dragging(True))
+        self.brightness_scale.bind("<ButtonRelease-1>", lambda e: self._set_dragging(False))
         
         self.brightness_label = ttk.Label(self, text=f"{self.device.brightness}%")
         self.brightness_label.grid(row=4, column=1, sticky="w")
@@ -120,14 +129,23 @@ class DeviceControlPanel(ttk.Frame):
         self.unlock_button = ttk.Button(lock_frame, text="🔓 Mở khóa", command=self._on_unlock, width=10)
         self.unlock_button.pack(side="left", padx=5)
     
-    def _get_device_icon(self) -> str:
-        """Lấy icon emoji cho thiết bị."""
-        icons = {
-            'light': '💡',
-            'fan': '🌀',
-            'door': '🚪'
-        }
-        return icons.get(self.device_type, '🔌')
+    def bind_device(self, device):
+        """Gắn panel sang một thiết bị khác cùng loại (tái sử dụng widget).
+        
+        Args:
+            device: Đối tượng thiết bị mới
+        
+        Raises:
+            ValueError: Nếu thiết bị khác loại với panel
+        """
+        device_type = device.get_status()['device_type']
+        if device_type != self.device_type:
+            raise ValueError(f"Panel {self.device_type} không thể gắn với thiết bị {device_type}")
+        
+        self.device = device
+        self.device_id = device.device_id
+        self.name_label.config(text=device.name)
+        self.update_display()
     
     def _on_turn_on(self):
         """Xử lý sự kiện bật thiết bị."""
@@ -141,7 +159,13 @@ class DeviceControlPanel(ttk.Frame):
         """Xử lý thay đổi độ sáng."""
         level = int(self.brightness_var.get())
         self.brightness_label.config(text=f"{level}%")
-        self.controller.control_device(self.device_id, "set_brightness", {"brightness": level})
+        self.command_stream.submit(self.device_id, "set_brightness", {"brightness": level})
+    
+    def _set_dragging(self, dragging: bool):
+        """Đánh dấu đang kéo slider; khi thả thì gửi ngay giá trị cuối."""
+        self._dragging = dragging
+        if not dragging:
+            self.command_stream.flush(self.device_id)
     
     def _set_speed(self, speed):
         """Đặt tốc độ quạt."""
@@ -170,6 +194,13 @@ class DeviceControlPanel(ttk.Frame):
         if not status:
             return
         
+        # Update header sprite (shared cache, switched only on bucketed state change)
+        sprite = sprite_state(self.device, self.device_type)
+        if sprite != self._sprite:
+            self._sprite = sprite
+            state, bucket = sprite
+            self.icon_label.config(image=self.sprites.get(self.device_type, state, bucket, size=32))
+        
         # Update status label
         is_on = status['is_on']
         
@@ -201,7 +232,7 @@ class DeviceControlPanel(ttk.Frame):
             self.status_label.config(text=status_text, foreground=status_color)
         
         # Update device-specific displays
-        if self.device_type == "light":
+        if self.device_type == "light" and not self._dragging:
             self.brightness_var.set(status['brightness'])
             self.brightness_label.config(text=f"{status['brightness']}%")
         elif self.device_type == "fan":
@@ -1,11 +1,31 @@
 """Timer Panel - Panel quản lý hẹn giờ."""
 
+import bisect
 import tkinter as tk
 from tkinter import ttk, messagebox
+from application.timer_manager import TimerObserver, TimerTarget
+from presentation.ui_dispatcher import TkTimerObserverAdapter
 
 
-class TimerPanel(ttk.LabelFrame):
-    """Panel quản lý hẹn giờ."""
+class TimerPanel(ttk.LabelFrame, TimerObserver):
+    """Panel quản lý hẹn giờ.
+    
+    Danh sách timer được cập nhật theo sự kiện của TimerManager (đặt, kích
+    hoạt, hủy) và 1 nhịp tick 1 Hz dùng chung cho thời gian còn lại.
+    Danh sách được ảo hóa: listbox chỉ chứa các dòng đang nhìn thấy, nên số
+    timer không ảnh hưởng tới số dòng Tk phải vẽ.
+    """
+    
+    VISIBLE_ROWS = 8  # Số dòng của listbox ảo
+    FILTER_DELAY_MS = 150  # Debounce khi gõ ô lọc
+    
+    ROOM_PREFIX = "📍 "  # Tiền tố cho các lựa chọn "cả phòng" trong combobox thiết bị
+    
+    # Tham số cho các hành động có giá trị: {action: (param_name, from, to, default)}
+    ACTION_PARAMS = {
+        "set_brightness": ("brightness", 0, 100, 50),
+        "set_speed": ("speed", 1, 3, 1)
+    }
     
     def __init__(self, parent, controller, timer_manager):
         """Khởi tạo timer panel.
@@ -18,8 +38,23 @@ class TimerPanel(ttk.LabelFrame):
         super().__init__(parent, text="⏰ Hẹn giờ", padding="10")
         self.controller = controller
         self.timer_manager = timer_manager
+        self._rows = []  # TimerTask khớp bộ lọc, theo thời gian thực thi
+        self._row_keys = []  # sort_key tương ứng, dùng để chèn/xóa bằng bisect
+        self._row_text = []  # Nội dung của các dòng đang hiển thị
+        self._top = 0  # Vị trí trong _rows của dòng đầu tiên đang hiển thị
+        self._selected_ids = set()  # Timer đã chọn (giữ nguyên khi cuộn)
+        self._filter_query = ""
+        self._filter_id = None
+        self._render_pending = None
+        self._tick_id = None
         
         self._create_widgets()
+        
+        # Timer events arrive on the scheduler thread - marshal them to Tk
+        self.timer_events = TkTimerObserverAdapter(self, self)
+        self.timer_manager.register_timer_observer(self.timer_events)
+        self.timer_events.start()
+        self._tick()
     
     def _create_widgets(self):
         """Tạo widgets cho timer panel."""
@@ -30,9 +65,22 @@ class TimerPanel(ttk.LabelFrame):
         
         # Action selection
         ttk.Label(self, text="Hành động:").grid(row=1, column=0, sticky="w", pady=5)
-        self.action_combo = ttk.Combobox(self, values=["turn_on", "turn_off"], state="readonly", width=20)
+        action_frame = ttk.Frame(self)
+        action_frame.grid(row=1, column=1, pady=5, padx=5)
+        
+        self.action_combo = ttk.Combobox(
+            action_frame, values=["turn_on", "turn_off", "set_brightness", "set_speed"],
+            state="readonly", width=14
+        )
         self.action_combo.current(0)
-        self.action_combo.grid(row=1, column=1, pady=5, padx=5)
+        self.action_combo.pack(side="left", padx=(0, 5))
+        self.action_combo.bind("<<ComboboxSelected>>", lambda e: self._on_action_change())
+        
+        # Action parameter (brightness/speed)
+        self.param_var = tk.IntVar(value=0)
+        self.param_spinbox = ttk.Spinbox(action_frame, from_=0, to=100, textvariable=self.param_var, width=5)
+        self.param_spinbox.pack(side="left")
+        self._on_action_change()
         
         # Time input
         ttk.Label(self, text="Sau:").grid(row=2, column=0, sticky="w", pady=5)
@@ -50,17 +98,37 @@ class TimerPanel(ttk.LabelFrame):
         # Schedule button
         ttk.Button(self, text="⏰ Đặt hẹn giờ", command=self._on_schedule).grid(row=3, column=0, columnspan=2, pady=10)
         
-        # Active timers list
-        ttk.Label(self, text="Timers đang chạy:").grid(row=4, column=0, columnspan=2, sticky="w", pady=(10, 5))
+        # Active timers list (virtual: listbox only holds the visible rows)
+        self.count_label = ttk.Label(self, text="Timers đang chạy: 0")
+        self.count_label.grid(row=4, column=0, columnspan=2, sticky="w", pady=(10, 5))
+        
+        ttk.Label(self, text="🔍 Lọc:").grid(row=5, column=0, sticky="w", pady=5)
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self._schedule_filter())
+        ttk.Entry(self, textvariable=self.filter_var, width=22).grid(row=5, column=1, pady=5, padx=5)
         
-        self.timer_listbox = tk.Listbox(self, height=5, width=40)
-        self.timer_listbox.grid(row=5, column=0, columnspan=2, pady=5)
+        list_frame = ttk.Frame(self)
+        list_frame.grid(row=6, column=0, columnspan=2, pady=5)
         
-        # Cancel button
-        ttk.Button(self, text="❌ Hủy timer", command=self._on_cancel).grid(row=6, column=0, columnspan=2, pady=5)
+        self.timer_listbox = tk.Listbox(list_frame, height=self.VISIBLE_ROWS, width=38,
+                                        selectmode="extended", exportselection=False)
+        self.timer_listbox.pack(side="left")
+        self.timer_listbox.bind("<<ListboxSelect>>", lambda e: self._on_select())
+        self.timer_listbox.bind("<MouseWheel>", lambda e: self._scroll_by(-1 if e.delta > 0 else 1))
+        self.timer_listbox.bind("<Button-4>", lambda e: self._scroll_by(-1))
+        self.timer_listbox.bind("<Button-5>", lambda e: self._scroll_by(1))
+        
+        self.timer_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self._on_scrollbar)
+        self.timer_scrollbar.pack(side="right", fill="y")
+        
+        # Cancel buttons
+        cancel_frame = ttk.Frame(self)
+        cancel_frame.grid(row=7, column=0, columnspan=2, pady=5)
+        ttk.Button(cancel_frame, text="❌ Hủy đã chọn", command=self._on_cancel).pack(side="left", padx=2)
+        ttk.Button(cancel_frame, text="❌ Hủy theo lọc", command=self._on_cancel_filtered).pack(side="left", padx=2)
         
         # Refresh button
-        ttk.Button(self, text="🔄 Làm mới", command=self.refresh_timer_list).grid(row=7, column=0, columnspan=2, pady=5)
+        ttk.Button(self, text="🔄 Làm mới", command=self.refresh_timer_list).grid(row=8, column=0, columnspan=2, pady=5)
         
         # Initial refresh
         self.refresh_device_list()
@@ -74,56 +142,247 @@ class TimerPanel(ttk.LabelFrame):
             messagebox.showwarning("Cảnh báo", "Vui lòng chọn thiết bị")
             return
         
-        # Find device by name
-        devices = self.controller.get_all_devices()
-        device = next((d for d in devices if d.name == device_name), None)
-        if not device:
-            messagebox.showerror("Lỗi", "Không tìm thấy thiết bị")
-            return
-        
-        # Get action
+        # Get action and its parameters
         action = self.action_combo.get()
+        params = None
+        if action in self.ACTION_PARAMS:
+            params = {self.ACTION_PARAMS[action][0]: self.param_var.get()}
         
         # Calculate delay in seconds
         time_value = self.time_var.get()
         unit = self.unit_combo.get()
         delay_seconds = time_value * (60 if unit == "phút" else 1)
         
-        # Schedule timer
-        timer_id = self.timer_manager.schedule_timer(device.device_id, action, delay_seconds)
+        # Schedule timer (whole room or a single device)
+        if device_name.startswith(self.ROOM_PREFIX):
+            target = TimerTarget(room=device_name[len(self.ROOM_PREFIX):])
+            timer_id = self.timer_manager.schedule_group_timer(target, action, delay_seconds, params=params)
+        else:
+            # Find device by name
+            devices = self.controller.get_all_devices()
+            device = next((d for d in devices if d.name == device_name), None)
+            if not device:
+                messagebox.showerror("Lỗi", "Không tìm thấy thiết bị")
+                return
+            timer_id = self.timer_manager.schedule_timer(device.device_id, action, delay_seconds, params=params)
         
         if timer_id:
             messagebox.showinfo("Thành công", f"Đã đặt hẹn giờ: {device_name} - {action}")
-            self.refresh_timer_list()
         else:
             messagebox.showerror("Lỗi", "Không thể đặt hẹn giờ")
     
+    def _on_action_change(self):
+        """Bật/tắt ô nhập tham số theo hành động đã chọn."""
+        action = self.action_combo.get()
+        if action in self.ACTION_PARAMS:
+            _, low, high, default = self.ACTION_PARAMS[action]
+            self.param_spinbox.config(from_=low, to=high)
+            self.param_var.set(default)
+            self.param_spinbox.state(['!disabled'])
+        else:
+            self.param_spinbox.state(['disabled'])
+    
     def _on_cancel(self):
-        """Hủy timer đã chọn."""
-        selection = self.timer_listbox.curselection()
-        if not selection:
+        """Hủy các timer đã chọn (1 lần gọi cancel_timers)."""
+        if not self._selected_ids:
             messagebox.showwarning("Cảnh báo", "Vui lòng chọn timer cần hủy")
             return
         
-        timer_text = self.timer_listbox.get(selection[0])
-        timer_id = timer_text.split("]")[0][1:]  # Extract timer_id from [timer_1]
+        count = self.timer_manager.cancel_timers(list(self._selected_ids))
+        self._selected_ids.clear()
+        if count:
+            messagebox.showinfo("Thành công", f"Đã hủy {count} timer")
+    
+    def _on_cancel_filtered(self):
+        """Hủy tất cả timer đang khớp bộ lọc (1 lần gọi cancel_timers)."""
+        if not self._rows:
+            messagebox.showwarning("Cảnh báo", "Không có timer nào khớp bộ lọc")
+            return
         
-        if self.timer_manager.cancel_timer(timer_id):
-            messagebox.showinfo("Thành công", "Đã hủy timer")
-            self.refresh_timer_list()
+        if not messagebox.askyesno("Xác nhận", f"Hủy {len(self._rows)} timer đang hiển thị theo bộ lọc?"):
+            return
+        
+        count = self.timer_manager.cancel_timers([task.timer_id for task in self._rows])
+        messagebox.showinfo("Thành công", f"Đã hủy {count} timer")
     
     def refresh_device_list(self):
         """Làm mới danh sách thiết bị."""
         devices = self.controller.get_all_devices()
         device_names = [d.name for d in devices]
+        device_names += [f"{self.ROOM_PREFIX}{room}" for room in self.controller.get_rooms()]
         self.device_combo['values'] = device_names
         if device_names:
             self.device_combo.current(0)
     
     def refresh_timer_list(self):
-        """Làm mới danh sách timer."""
+        """Dựng lại toàn bộ danh sách timer (theo bộ lọc) từ TimerManager."""
+        # Ordered view của TimerManager - đã sắp xếp theo thời gian thực thi
+        self._set_rows(self.timer_manager.get_ordered_timers())
+    
+    def _set_rows(self, candidates):
+        """Đặt lại danh sách theo bộ lọc hiện tại.
+        
+        Args:
+            candidates: Các TimerTask đã sắp xếp theo thời gian thực thi
+        """
+        query = self._filter_query
+        self._rows = [task for task in candidates if self._matches(task, query)] if query else list(candidates)
+        self._row_keys = [task.sort_key for task in self._rows]
+        self._top = 0
+        self._render_rows()
+    
+    @staticmethod
+    def _matches(task, query: str) -> bool:
+        """Timer có khớp chuỗi lọc không (tên/ID thiết bị hoặc hành động)."""
+        return query in f"{task.device_name} {task.device_id} {task.action_label}".lower()
+    
+    def _schedule_filter(self):
+        """Áp dụng bộ lọc sau khi người dùng ngừng gõ."""
+        if self._filter_id is not None:
+            self.after_cancel(self._filter_id)
+        self._filter_id = self.after(self.FILTER_DELAY_MS, self._apply_filter)
+    
+    def _apply_filter(self):
+        """Lọc danh sách theo chuỗi trong ô lọc.
+        
+        Nếu chuỗi mới chứa chuỗi cũ thì kết quả là tập con của danh sách
+        hiện tại, nên chỉ cần lọc lại danh sách đang hiển thị.
+        """
+        self._filter_id = None
+        query = self.filter_var.get().strip().lower()
+        previous, self._filter_query = self._filter_query, query
+        if query == previous:
+            return
+        if previous and previous in query:
+            self._set_rows(self._rows)
+        else:
+            self.refresh_timer_list()
+    
+    def _render_rows(self):
+        """Vẽ lại các dòng đang nhìn thấy, thanh cuộn và số lượng."""
+        self._render_pending = None
+        count = len(self._rows)
+        self._top = max(0, min(self._top, count - self.VISIBLE_ROWS))
+        window = self._rows[self._top:self._top + self.VISIBLE_ROWS]
+        
+        self._row_text = [str(task) for task in window]
         self.timer_listbox.delete(0, tk.END)
+        if window:
+            self.timer_listbox.insert(tk.END, *self._row_text)
+        for index, task in enumerate(window):
+            if task.timer_id in self._selected_ids:
+                self.timer_listbox.selection_set(index)
+        
+        if count:
+            self.timer_scrollbar.set(self._top / count, (self._top + len(window)) / count)
+        else:
+            self.timer_scrollbar.set(0, 1)
+        
+        text = f"Timers đang chạy: {count}"
+        if self._filter_query:
+            text += f" / {len(self.timer_manager.active_timers)}"
+        self.count_label.config(text=text)
+    
+    def _schedule_render(self):
+        """Gộp nhiều thay đổi trong 1 frame thành 1 lần vẽ lại."""
+        if self._render_pending is None:
+            self._render_pending = self.after_idle(self._render_rows)
+    
+    def _scroll_by(self, rows: int):
+        """Cuộn danh sách ảo.
+        
+        Args:
+            rows: Số dòng (âm = lên trên)
+        """
+        self._top += rows
+        self._render_rows()
+        return "break"
+    
+    def _on_scrollbar(self, *args):
+        """Xử lý lệnh từ thanh cuộn (moveto / scroll units|pages)."""
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * len(self._rows))
+            self._render_rows()
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self._scroll_by(step * self.VISIBLE_ROWS if args[2] == "pages" else step)
+    
+    def _on_select(self):
+        """Ghi nhận lựa chọn của các dòng đang hiển thị."""
+        selected = set(self.timer_listbox.curselection())
+        for index, task in enumerate(self._rows[self._top:self._top + self.VISIBLE_ROWS]):
+            if index in selected:
+                self._selected_ids.add(task.timer_id)
+            else:
+                self._selected_ids.discard(task.timer_id)
+    
+    # Timer Observer Methods (gọi trên Tk thread qua TkTimerObserverAdapter)
+    
+    def on_timers_added(self, tasks):
+        """Chèn timer mới (khớp bộ lọc) vào đúng vị trí theo thời gian thực thi."""
+        for task in tasks:
+            if not task.is_active() or (self._filter_query and not self._matches(task, self._filter_query)):
+                continue
+            index = bisect.bisect_left(self._row_keys, task.sort_key)
+            self._rows.insert(index, task)
+            self._row_keys.insert(index, task.sort_key)
+            if index < self._top:
+                self._top += 1  # Keep the visible rows in place
+        self._schedule_render()
+    
+    def on_timers_fired(self, tasks):
+        """Bỏ các timer đã kích hoạt khỏi danh sách."""
+        self._remove_rows(tasks)
+    
+    def on_timers_cancelled(self, tasks):
+        """Bỏ các timer đã hủy khỏi danh sách."""
+        self._remove_rows(tasks)
+    
+    def _remove_rows(self, tasks):
+        """Xóa các timer khỏi danh sách (tìm theo sort_key bằng bisect)."""
+        if len(tasks) > 32:
+            # Bulk removal: rebuild once instead of deleting one by one
+            removed = {task.timer_id for task in tasks}
+            before = self._rows[:self._top]
+            self._top -= sum(1 for task in before if task.timer_id in removed)
+            self._rows = [task for task in self._rows if task.timer_id not in removed]
+            self._row_keys = [task.sort_key for task in self._rows]
+            self._selected_ids -= removed
+        else:
+            for task in tasks:
+                index = bisect.bisect_left(self._row_keys, task.sort_key)
+                if index < len(self._rows) and self._rows[index] is task:
+                    del self._rows[index]
+                    del self._row_keys[index]
+                    if index < self._top:
+                        self._top -= 1
+                self._selected_ids.discard(task.timer_id)
+        self._schedule_render()
+    
+    def _tick(self):
+        """Nhịp 1 Hz: chỉ ghi lại các dòng đang hiển thị có số giây thay đổi."""
+        if self._render_pending is not None:
+            # Rows changed since the last render - it will redraw everything anyway
+            self._tick_id = self.after(1000, self._tick)
+            return
+        
+        for index, task in enumerate(self._rows[self._top:self._top + len(self._row_text)]):
+            text = str(task)
+            if text != self._row_text[index]:
+                self._row_text[index] = text
+                self.timer_listbox.delete(index)
+                self.timer_listbox.insert(index, text)
+                if task.timer_id in self._selected_ids:
+                    self.timer_listbox.selection_set(index)
         
-        timers = self.timer_manager.get_active_timers()
-        for task in sorted(timers, key=lambda t: t.scheduled_time):
-            self.timer_listbox.insert(tk.END, str(task))
+        self._tick_id = self.after(1000, self._tick)
+    
+    def destroy(self):
+        """Hủy panel: dừng tick và ngừng nhận sự kiện timer."""
+        for after_id in (self._tick_id, self._filter_id, self._render_pending):
+            if after_id is not None:
+                self.after_cancel(after_id)
+        self._tick_id = self._filter_id = self._render_pending = None
+        self.timer_events.stop()
+        self.timer_manager.unregister_timer_observer(self.timer_events)
+        super().destroy()
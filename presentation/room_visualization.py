@@ -1,7 +1,10 @@
 """Room Visualization - Hiển thị sơ đồ phòng với thiết bị."""
 
+import math
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog
+from presentation.icon_sprites import get_sprite_cache, sprite_state
+from presentation.ui_dispatcher import get_command_stream
 
 
 class DevicePopup(tk.Toplevel):
@@ -18,6 +21,7 @@ class DevicePopup(tk.Toplevel):
         super().__init__(parent)
         self.device = device
         self.controller = controller
+        self.command_stream = get_command_stream(self, controller)
         
         self.title(f"⚙️ {device.name}")
         self.geometry("300x250")
@@ -138,6 +142,7 @@ class DevicePopup(tk.Toplevel):
                 command=lambda v: self._set_brightness(int(float(v)))
             )
             scale.pack(fill="x", padx=20, pady=5)
+            scale.bind("<ButtonRelease-1>", lambda e: self.command_stream.flush(self.device.device_id))
             
         elif device_type == 'fan':
             ttk.Label(parent, text="Tốc độ:", font=("Arial", 9)).pack(pady=(5, 0))
@@ -182,8 +187,8 @@ class DevicePopup(tk.Toplevel):
         self.destroy()
     
     def _set_brightness(self, value):
-        """Đặt độ sáng đèn."""
-        self.controller.control_device(self.device.device_id, "set_brightness", {"brightness": value})
+        """Đặt độ sáng đèn (qua command stream - giới hạn tần suất khi kéo)."""
+        self.command_stream.submit(self.device.device_id, "set_brightness", {"brightness": value})
     
     def _set_speed(self, speed):
         """Đặt tốc độ quạt."""
@@ -202,7 +207,32 @@ class DevicePopup(tk.Toplevel):
 
 
 class RoomCanvas(ttk.Frame):
-    """Canvas hiển thị sơ đồ phòng với các thiết bị."""
+    """Canvas hiển thị sơ đồ phòng với các thiết bị.
+    
+    Hỗ trợ zoom (con lăn chuột) và kéo (chuột phải/giữa). Khi zoom nhỏ hơn
+    LOD_ZOOM, mỗi phòng được vẽ thành 1 ô tổng hợp thay cho từng thiết bị.
+    Chỉ các item nằm trong vùng nhìn thấy mới tồn tại trên canvas.
+    """
+    
+    MIN_ZOOM = 0.3
+    MAX_ZOOM = 2.0
+    LOD_ZOOM = 0.6  # Dưới mức này hiển thị ô tổng hợp theo phòng
+    ZOOM_STEP = 1.2
+    
+    ICON_RADIUS = 30
+    DEVICE_SPACING = 100  # Khoảng cách tâm 2 icon cạnh nhau (2 * bán kính + 40)
+    FLOOR_MARGIN = 50
+    GRID_STEP_X = 100  # Đường lưới trang trí trên sàn (tọa độ thế giới)
+    GRID_STEP_Y = 50
+    GRID_MAX_LINES = 400  # Mỗi chiều; nền rất lớn thì bỏ bớt đường lưới
+    # Khung phòng trong tọa độ thế giới: vừa là ô tổng hợp, vừa chứa cụm thiết bị
+    ROOM_PADDING_X = 60  # Mép khung -> tâm cột icon đầu tiên
+    ROOM_HEADER = 70  # Mép trên khung (tên phòng) -> tâm hàng icon đầu tiên
+    ROOM_FOOTER = 70  # Tâm hàng icon cuối -> mép dưới khung (chừa nhãn tên)
+    MIN_TILE_WIDTH = 220
+    MIN_TILE_HEIGHT = 140
+    TILE_GAP = 40
+    HIT_BUCKET = 100  # Kích thước ô lưới của chỉ mục hit-test (pixel)
     
     def __init__(self, parent, controller, current_room="Tất cả"):
         """Khởi tạo room canvas.
@@ -214,20 +244,48 @@ class RoomCanvas(ttk.Frame):
         """
         super().__init__(parent)
         self.controller = controller
-        self.device_icons = {}
+        self.device_icons = {}  # {device_id: {'image', 'label', 'sprite', 'pos', ...}} - chỉ thiết bị trong viewport
+        self.room_tiles = {}  # {room: {'rect', 'text', 'pos'}} - chỉ dùng khi zoom nhỏ
         self.current_room = current_room
+        self._title_id = None
+        self._background_key = None  # Layout mà nền (tag "background") đang vẽ
+        self._background_view = None  # (zoom, view_x, view_y) mà các item nền đang ở
+        self._outlines_state = None  # Trạng thái hiển thị của khung phòng ("normal"/"hidden")
+        
+        # View state: screen = world * zoom - view
+        self.zoom = 1.0
+        self.view_x = 0.0
+        self.view_y = 0.0
+        self._pan_start = None
+        
+        # World layout (tính lại khi refresh)
+        self._shown_devices = []
+        self._shown_rooms = []
+        self._room_layout = {}  # {room: (x, y, width, height, số cột, vị trí thiết bị đầu tiên, số thiết bị)}
+        self._content_size = None  # (width, height) hoặc None nếu canvas chưa render
+        self._layout_key = None  # Thay đổi khi layout/kích thước thay đổi (nền cần vẽ lại)
+        self._dirty_rooms = set()
+        self._tile_update_pending = None
+        
+        # Hit-test index over drawn items: key = ('device', device_id) | ('room', room)
+        self._hit_buckets = {}  # {(cell_x, cell_y): {key: bbox}}
+        self._hit_cells = {}  # {key: [cell, ...]}
+        self._hovered = None
+        
+        self.sprites = get_sprite_cache(self)
         
         self._create_canvas()
-        self._draw_room()
         self._place_devices()
     
     def set_room(self, room_name: str):
-        """Đổi phòng hiện tại.
+        """Đổi phòng hiện tại (đưa view về zoom 100%, góc trên trái).
         
         Args:
             room_name: Tên phòng hoặc "Tất cả"
         """
         self.current_room = room_name
+        self.zoom = 1.0
+        self.view_x = self.view_y = 0.0
         self.refresh()
     
     def _create_canvas(self):
@@ -237,141 +295,401 @@ class RoomCanvas(ttk.Frame):
         
         # Bind resize event
         self.canvas.bind('<Configure>', self._on_canvas_resize)
+        
+        # One canvas-level binding per event; targets resolved via the hit-test index
+        self.canvas.bind('<Button-1>', self._on_click)
+        self.canvas.bind('<Motion>', self._on_motion)
+        self.canvas.bind('<Leave>', lambda e: self._set_hovered(None))
+        
+        # Zoom (Windows/macOS: MouseWheel, X11: Button-4/5)
+        self.canvas.bind('<MouseWheel>', lambda e: self._zoom_at(e.x, e.y, self.ZOOM_STEP if e.delta > 0 else 1 / self.ZOOM_STEP))
+        self.canvas.bind('<Button-4>', lambda e: self._zoom_at(e.x, e.y, self.ZOOM_STEP))
+        self.canvas.bind('<Button-5>', lambda e: self._zoom_at(e.x, e.y, 1 / self.ZOOM_STEP))
+        
+        # Pan (right or middle button drag)
+        for button in ('2', '3'):
+            self.canvas.bind(f'<ButtonPress-{button}>', self._on_pan_start)
+            self.canvas.bind(f'<B{button}-Motion>', self._on_pan_move)
     
     def _draw_room(self):
-        """Vẽ layout phòng."""
-        # Get canvas dimensions
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
+        """Đặt nền theo view hiện tại (tag "background").
         
-        # Skip if canvas not yet rendered
-        if canvas_width <= 1 or canvas_height <= 1:
+        Sàn, lưới và khung các phòng nằm trong tọa độ thế giới và chỉ được vẽ
+        lại khi layout hoặc kích thước canvas thay đổi; khi pan/zoom các item
+        có sẵn chỉ được scale/move theo view mới. Khung và tên phòng chỉ hiện
+        ở chế độ chi tiết (trùng vị trí ô tổng hợp khi zoom nhỏ).
+        """
+        if self._content_size is None:
+            self.canvas.delete("background")
+            self.canvas.delete("title")
+            self._title_id = None
+            self._background_key = None
             return
         
-        # Calculate floor dimensions with margins
-        margin = 50
-        floor_x1 = margin
-        floor_y1 = margin
-        floor_x2 = canvas_width - margin
-        floor_y2 = canvas_height - margin
-        
-        # Draw floor
-        self.canvas.create_rectangle(floor_x1, floor_y1, floor_x2, floor_y2, 
-                                     fill="#e6e6d0", outline="#8b8b7a", width=3)
+        if self._layout_key != self._background_key:
+            self._build_background()
+        else:
+            self._transform_background()
         
-        # Draw title
+        state = "hidden" if self._is_overview() else "normal"
+        if state != self._outlines_state:
+            self.canvas.itemconfig("room_outline", state=state)
+            self._outlines_state = state
+    
+    def _build_background(self):
+        """Vẽ lại toàn bộ nền theo layout hiện tại, tại view hiện tại."""
+        self.canvas.delete("background")
+        self.canvas.delete("title")
+        content_width, content_height = self._content_size
+        margin = self.FLOOR_MARGIN
+        
+        # Floor: the whole content area
+        floor_x1, floor_y1 = self._to_screen(margin, margin)
+        floor_x2, floor_y2 = self._to_screen(content_width - margin, content_height - margin)
+        self.canvas.create_rectangle(floor_x1, floor_y1, floor_x2, floor_y2,
+                                     fill="#e6e6d0", outline="#8b8b7a", width=3,
+                                     tags="background")
+        
+        # Grid lines (subtle) over the whole floor, thinned out on very large floors
+        for step, vertical in ((self.GRID_STEP_X, True), (self.GRID_STEP_Y, False)):
+            length = (content_width if vertical else content_height) - 2 * margin
+            step *= max(1, math.ceil(length / step / self.GRID_MAX_LINES))
+            for value in range(margin + step, margin + int(length), step):
+                if vertical:
+                    sx1, sy1 = self._to_screen(value, margin)
+                    sx2, sy2 = self._to_screen(value, content_height - margin)
+                else:
+                    sx1, sy1 = self._to_screen(margin, value)
+                    sx2, sy2 = self._to_screen(content_width - margin, value)
+                self.canvas.create_line(sx1, sy1, sx2, sy2, fill="#d0d0c0", dash=(2, 4), tags="background")
+        
+        # Room outlines: same rectangles as the overview tiles
+        for room, (room_x, room_y, width, height, _, _, _) in self._room_layout.items():
+            rx1, ry1 = self._to_screen(room_x, room_y)
+            rx2, ry2 = self._to_screen(room_x + width, room_y + height)
+            self.canvas.create_rectangle(rx1, ry1, rx2, ry2, outline="#b0b09a", width=2,
+                                         tags=("background", "room_outline"))
+            # Label offset in world units so scaling keeps it at the same place in the frame
+            tx, ty = self._to_screen(room_x + 10, room_y + 8)
+            self.canvas.create_text(tx, ty, text=f"📍 {room}", anchor="nw",
+                                    font=("Arial", 10, "bold"), fill="#6b6b5a",
+                                    tags=("background", "room_outline"))
+        self._outlines_state = None
+        
+        # Title stays fixed at the top of the canvas
         room_display = self.current_room if self.current_room != "Tất cả" else "Tất cả phòng"
-        center_x = canvas_width // 2
-        self.canvas.create_text(center_x, 30, text=f"🏠 {room_display}", font=("Arial", 14, "bold"))
-        
-        # Draw grid lines (subtle)
-        for i in range(floor_x1 + 200, floor_x2, 100):
-            self.canvas.create_line(i, floor_y1, i, floor_y2, fill="#d0d0c0", dash=(2, 4))
-        for i in range(floor_y1 + 50, floor_y2, 50):
-            self.canvas.create_line(floor_x1, i, floor_x2, i, fill="#d0d0c0", dash=(2, 4))
+        self._title_id = self.canvas.create_text(self.canvas.winfo_width() // 2, 30, text=f"🏠 {room_display}",
+                                                 font=("Arial", 14, "bold"), tags="title")
+        
+        # Keep background below the title and device items
+        self.canvas.tag_lower("title")
+        self.canvas.tag_lower("background")
+        self._background_key = self._layout_key
+        self._background_view = (self.zoom, self.view_x, self.view_y)
+    
+    def _transform_background(self):
+        """Đưa các item nền từ view lúc vẽ sang view hiện tại (scale + move, không tạo item)."""
+        old_zoom, old_x, old_y = self._background_view
+        if (old_zoom, old_x, old_y) == (self.zoom, self.view_x, self.view_y):
+            return
+        # screen = world * zoom - view  =>  new = (old + old_view) * ratio - new_view
+        ratio = self.zoom / old_zoom
+        if ratio != 1:
+            self.canvas.scale("background", 0, 0, ratio, ratio)
+        self.canvas.move("background", old_x * ratio - self.view_x, old_y * ratio - self.view_y)
+        self._background_view = (self.zoom, self.view_x, self.view_y)
     
     def _place_devices(self):
-        """Đặt các thiết bị vào sơ đồ."""
-        devices = self.controller.get_all_devices()
-        
-        # Filter by room if needed
+        """Tính lại layout thế giới (mỗi phòng 1 khung chứa cụm thiết bị) rồi vẽ viewport."""
         if self.current_room != "Tất cả":
-            devices = [d for d in devices if d.room == self.current_room]
-        
-        # Calculate positions
-        positions = self._calculate_positions(len(devices))
+            self._shown_rooms = [self.current_room]
+        else:
+            self._shown_rooms = self.controller.get_rooms()
         
-        # Skip if positions not calculated yet (canvas not rendered)
-        if len(positions) < len(devices):
-            return
+        self._shown_devices = []
+        room_counts = []
+        for room in self._shown_rooms:
+            devices = self.controller.get_devices_by_room(room)
+            room_counts.append((room, len(self._shown_devices), len(devices)))
+            self._shown_devices.extend(devices)
         
-        for i, device in enumerate(devices):
-            x, y = positions[i]
-            self._create_device_icon(device, x, y)
+        self._calculate_layout(room_counts)
+        self._render_viewport()
     
-    def _calculate_positions(self, count):
-        """Tính toán vị trí cho các thiết bị.
+    def _calculate_layout(self, room_counts):
+        """Xếp khung các phòng (tọa độ thế giới, zoom 100%).
+        
+        Thiết bị của mỗi phòng được xếp thành lưới bên trong khung của phòng
+        đó; các khung được xếp theo hàng, xuống hàng khi vượt chiều rộng
+        canvas. Ô tổng hợp (zoom nhỏ) dùng đúng các khung này, nên 2 mức
+        hiển thị chung 1 hệ tọa độ.
         
         Args:
-            count: Số lượng thiết bị
-            
-        Returns:
-            List các tuple (x, y)
+            room_counts: List (phòng, vị trí thiết bị đầu tiên, số thiết bị)
         """
-        positions = []
-        
-        # Get canvas dimensions
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
+        self._room_layout = {}
+        self._content_size = None
         
         # Skip if canvas not yet rendered
-        if canvas_width <= 1 or canvas_height <= 1:
-            return positions
-        
-        # Calculate floor dimensions
-        floor_margin = 50
-        device_margin_x = 150
-        device_margin_y = 70
-        
-        floor_width = canvas_width - 2 * floor_margin
-        floor_height = canvas_height - 2 * floor_margin
-        
-        available_width = floor_width - 2 * device_margin_x
-        
-        # Icon radius = 30, minimum gap between icons = 40px
-        # So minimum center-to-center distance = 2*30 + 40 = 100px
-        min_spacing = 100
+        canvas_width = self.canvas.winfo_width()
+        if canvas_width <= 1 or self.canvas.winfo_height() <= 1:
+            return
         
-        # Calculate how many devices can fit per row
-        max_per_row = max(1, (available_width + min_spacing) // min_spacing)
+        spacing = self.DEVICE_SPACING
+        start = self.FLOOR_MARGIN + self.TILE_GAP
+        row_width = max(canvas_width - 2 * start, self.MIN_TILE_WIDTH)
+        # Most icon columns a room can use without overflowing the canvas width
+        max_cols = max(1, int(row_width - 2 * self.ROOM_PADDING_X) // spacing + 1)
+        
+        x = y = start
+        shelf_height = 0
+        content_right = start
+        for room, first, count in room_counts:
+            cols = max(1, min(max_cols, math.ceil(math.sqrt(count)) if self.current_room == "Tất cả" else count))
+            rows = max(1, math.ceil(count / cols))
+            width = max(self.MIN_TILE_WIDTH, 2 * self.ROOM_PADDING_X + (cols - 1) * spacing)
+            height = max(self.MIN_TILE_HEIGHT, self.ROOM_HEADER + (rows - 1) * spacing + self.ROOM_FOOTER)
+            
+            if x > start and x + width > start + row_width:
+                x = start
+                y += shelf_height + self.TILE_GAP
+                shelf_height = 0
+            self._room_layout[room] = (x, y, width, height, cols, first, count)
+            x += width + self.TILE_GAP
+            shelf_height = max(shelf_height, height)
+            content_right = max(content_right, x)
+        
+        self._content_size = (content_right + self.FLOOR_MARGIN,
+                              y + shelf_height + self.TILE_GAP + self.FLOOR_MARGIN)
+        self._layout_key = (canvas_width, self.current_room, self._content_size, tuple(self._room_layout.items()))
+    
+    def _visible_rooms(self, pad: float):
+        """Các phòng có khung giao với viewport (mở rộng pad pixel mỗi phía).
         
-        # Calculate number of rows needed
-        import math
-        num_rows = math.ceil(count / max_per_row)
+        Returns:
+            List (phòng, layout của phòng)
+        """
+        x1, y1, x2, y2 = self._visible_world_rect(pad)
+        return [(room, layout) for room, layout in self._room_layout.items()
+                if not (layout[0] + layout[2] < x1 or layout[0] > x2 or
+                        layout[1] + layout[3] < y1 or layout[1] > y2)]
+    
+    def _is_overview(self) -> bool:
+        """Đang ở chế độ ô tổng hợp theo phòng hay không."""
+        return self.zoom < self.LOD_ZOOM
+    
+    def _render_viewport(self):
+        """Vẽ nền và các item nằm trong viewport theo mức zoom hiện tại."""
+        if self._content_size is None:
+            return
+        self._clamp_view()
+        self._draw_room()
         
-        # Calculate vertical spacing
-        spacing_y = 100  # Fixed spacing between rows
-        start_x = floor_margin + device_margin_x
-        start_y = floor_margin + device_margin_y
+        if self._is_overview():
+            for device_id in list(self.device_icons):
+                self._delete_device_icon(device_id)
+            self._render_room_tiles()
+        else:
+            for room in list(self.room_tiles):
+                self._delete_room_tile(room)
+            self._render_device_icons()
+    
+    def _visible_world_rect(self, pad: float):
+        """Vùng thế giới đang nhìn thấy (mở rộng pad pixel mỗi phía).
         
-        # Calculate fixed horizontal spacing based on max_per_row
-        spacing_x = (available_width // max(1, max_per_row - 1)) if max_per_row > 1 else 0
-        spacing_x = max(spacing_x, min_spacing)
+        Returns:
+            Tuple (x1, y1, x2, y2) theo tọa độ thế giới
+        """
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        return ((self.view_x - pad) / self.zoom, (self.view_y - pad) / self.zoom,
+                (self.view_x + width + pad) / self.zoom, (self.view_y + height + pad) / self.zoom)
+    
+    def _to_screen(self, world_x: float, world_y: float):
+        """Đổi tọa độ thế giới sang tọa độ canvas."""
+        return (round(world_x * self.zoom - self.view_x), round(world_y * self.zoom - self.view_y))
+    
+    def _render_device_icons(self):
+        """Diff icon thiết bị với các vị trí trong khung phòng nằm trong viewport.
         
-        # Place devices in grid layout (unlimited rows, left to right)
-        for i in range(count):
-            row = i // max_per_row
-            col = i % max_per_row
-            
-            # Calculate x position (always from left to right)
-            x = start_x + col * spacing_x
+        Thiết bị mới vào viewport được tạo item, thiết bị ra khỏi viewport bị
+        xóa item, thiết bị còn lại chỉ được di chuyển nếu vị trí thay đổi.
+        """
+        spacing = self.DEVICE_SPACING
+        devices = self._shown_devices
+        
+        # Cells of each visible room's grid intersecting the viewport (icon + label overhang)
+        pad = self.ICON_RADIUS + 30
+        x1, y1, x2, y2 = self._visible_world_rect(pad)
+        wanted = {}
+        for _, (room_x, room_y, _, _, cols, first, count) in self._visible_rooms(pad):
+            origin_x = room_x + self.ROOM_PADDING_X
+            origin_y = room_y + self.ROOM_HEADER
+            rows = math.ceil(count / cols)
+            col_first = max(0, math.ceil((x1 - origin_x) / spacing))
+            col_last = min(cols - 1, math.floor((x2 - origin_x) / spacing))
+            row_first = max(0, math.ceil((y1 - origin_y) / spacing))
+            row_last = min(rows - 1, math.floor((y2 - origin_y) / spacing))
+            for row in range(row_first, row_last + 1):
+                for col in range(col_first, col_last + 1):
+                    index = row * cols + col
+                    if index >= count:
+                        break
+                    device = devices[first + index]
+                    wanted[device.device_id] = (device, self._to_screen(origin_x + col * spacing,
+                                                                        origin_y + row * spacing))
+        
+        # Remove items of devices no longer shown
+        for device_id in [d for d in self.device_icons if d not in wanted]:
+            self._delete_device_icon(device_id)
+        
+        for device_id, (device, (x, y)) in wanted.items():
+            icon_data = self.device_icons.get(device_id)
+            if icon_data is None:
+                self._create_device_icon(device, x, y)
+                continue
             
-            # Calculate y position
-            y = start_y + row * spacing_y
+            if icon_data['pos'] != (x, y):
+                old_x, old_y = icon_data['pos']
+                for key in ('image', 'label'):
+                    self.canvas.move(icon_data[key], x - old_x, y - old_y)
+                icon_data['pos'] = (x, y)
+                self._index_hit(('device', device_id), self._device_bbox(x, y))
             
-            positions.append((x, y))
+            if icon_data['name'] != device.name:
+                self.canvas.itemconfig(icon_data['label'], text=device.name)
+                icon_data['name'] = device.name
+    
+    def _delete_device_icon(self, device_id: str):
+        """Xóa các canvas item của một thiết bị.
         
-        return positions
+        Args:
+            device_id: ID của thiết bị
+        """
+        icon_data = self.device_icons.pop(device_id)
+        for key in ('image', 'label'):
+            self.canvas.delete(icon_data[key])
+        self._unindex_hit(('device', device_id))
+    
+    def _render_room_tiles(self):
+        """Diff ô tổng hợp của các phòng nằm trong viewport (đúng khung của phòng)."""
+        wanted = {}
+        for room, (room_x, room_y, width, height, _, _, _) in self._visible_rooms(0):
+            x, y = self._to_screen(room_x, room_y)
+            wanted[room] = (x, y, round(width * self.zoom), round(height * self.zoom))
+        
+        for room in [r for r in self.room_tiles if r not in wanted]:
+            self._delete_room_tile(room)
+        
+        for room, (x, y, width, height) in wanted.items():
+            tile = self.room_tiles.get(room)
+            if tile is None:
+                self._create_room_tile(room, x, y, width, height)
+            elif tile['pos'] != (x, y, width, height):
+                self.canvas.coords(tile['rect'], x, y, x + width, y + height)
+                self.canvas.coords(tile['text'], x + width // 2, y + height // 2)
+                tile['pos'] = (x, y, width, height)
+                self._index_hit(('room', room), (x, y, x + width, y + height))
     
-    def _get_light_color(self, device):
-        """Tính màu cho đèn dựa trên độ sáng.
+    def _room_stats(self, room: str):
+        """Thống kê của 1 phòng cho ô tổng hợp.
         
         Args:
-            device: Đối tượng thiết bị đèn
-            
+            room: Tên phòng
+        
         Returns:
-            Màu RGB hex string
+            Tuple (số thiết bị bật, tổng số thiết bị, độ sáng trung bình của đèn hoặc None)
         """
-        if not device.is_on:
-            return 'gray'
+        devices = self.controller.get_devices_by_room(room)
+        devices_on = sum(1 for device in devices if device.is_on)
+        
+        # Lights that are off contribute 0 to the room's brightness
+        levels = [device.brightness if device.is_on else 0
+                  for device in devices if hasattr(device, 'brightness')]
+        average = round(sum(levels) / len(levels)) if levels else None
+        return devices_on, len(devices), average
+    
+    def _room_tile_text(self, room: str) -> str:
+        """Nội dung ô tổng hợp của 1 phòng."""
+        devices_on, total, average = self._room_stats(room)
+        text = f"{room}\n🟢 {devices_on} bật / ⚫ {total - devices_on} tắt"
+        if average is not None:
+            text += f"\n💡 Độ sáng TB: {average}%"
+        return text
+    
+    def _create_room_tile(self, room: str, x: int, y: int, width: int, height: int):
+        """Tạo ô tổng hợp cho 1 phòng.
         
-        # Tính màu vàng dựa trên độ sáng (0-100)
-        brightness = getattr(device, 'brightness', 100)
-        # Từ màu vàng đậm (255, 255, 0) đến vàng nhạt theo brightness
-        r = 255
-        g = 255
-        b = int(255 * (1 - brightness / 100))  # Giảm blue theo độ sáng
-        return f'#{r:02x}{g:02x}{b:02x}'
+        Args:
+            room: Tên phòng
+            x, y: Góc trên trái (tọa độ canvas)
+            width, height: Kích thước ô
+        """
+        rect = self.canvas.create_rectangle(x, y, x + width, y + height,
+                                            fill="#fffaf0", outline="#8b8b7a", width=2)
+        text = self.canvas.create_text(x + width // 2, y + height // 2,
+                                       text=self._room_tile_text(room),
+                                       font=("Arial", 9), justify="center")
+        self.room_tiles[room] = {'rect': rect, 'text': text, 'pos': (x, y, width, height)}
+        self._index_hit(('room', room), (x, y, x + width, y + height))
+    
+    def _delete_room_tile(self, room: str):
+        """Xóa các canvas item của ô phòng."""
+        tile = self.room_tiles.pop(room)
+        self.canvas.delete(tile['rect'])
+        self.canvas.delete(tile['text'])
+        self._unindex_hit(('room', room))
+    
+    def _zoom_to_room(self, room: str):
+        """Zoom về 100% và đưa khung của phòng lên góc trên trái viewport."""
+        layout = self._room_layout.get(room)
+        if layout is None:
+            return
+        self.zoom = 1.0
+        self.view_x = layout[0] - self.TILE_GAP
+        self.view_y = layout[1] - self.TILE_GAP
+        self._render_viewport()
+    
+    def _clamp_view(self):
+        """Giới hạn view trong phạm vi nội dung."""
+        content_width, content_height = self._content_size
+        limit_x = max(0.0, content_width * self.zoom - self.canvas.winfo_width())
+        limit_y = max(0.0, content_height * self.zoom - self.canvas.winfo_height())
+        self.view_x = min(max(self.view_x, 0.0), limit_x)
+        self.view_y = min(max(self.view_y, 0.0), limit_y)
+    
+    def _zoom_at(self, x: int, y: int, factor: float):
+        """Zoom quanh điểm (x, y) trên canvas.
+        
+        Args:
+            x, y: Tọa độ con trỏ
+            factor: Hệ số nhân zoom
+        """
+        zoom = min(self.MAX_ZOOM, max(self.MIN_ZOOM, self.zoom * factor))
+        if zoom == self.zoom:
+            return
+        
+        # Keep the world point under the cursor fixed
+        world_x = (x + self.view_x) / self.zoom
+        world_y = (y + self.view_y) / self.zoom
+        self.zoom = zoom
+        self.view_x = world_x * zoom - x
+        self.view_y = world_y * zoom - y
+        self._render_viewport()
+    
+    def _on_pan_start(self, event):
+        """Bắt đầu kéo view."""
+        self._pan_start = (event.x, event.y)
+    
+    def _on_pan_move(self, event):
+        """Kéo view theo chuột."""
+        if self._pan_start is None:
+            return
+        last_x, last_y = self._pan_start
+        self._pan_start = (event.x, event.y)
+        self.view_x -= event.x - last_x
+        self.view_y -= event.y - last_y
+        self._render_viewport()
     
     def _create_device_icon(self, device, x, y):
         """Tạo icon cho thiết bị.
@@ -381,71 +699,120 @@ class RoomCanvas(ttk.Frame):
             x, y: Tọa độ
         """
         device_type = device.get_status()['device_type']
+        state, bucket = sprite_state(device, device_type)
         
-        # Icon mapping
-        icons = {
-            'light': ('💡', 'yellow', 'gray'),
-            'fan': ('🌀', 'lightblue', 'gray'),
-            'door': ('🚪', 'brown', 'gray')
-        }
-        
-        icon, color_on, color_off = icons.get(device_type, ('🔌', 'green', 'gray'))
-        
-        # Get color based on device state
-        if device_type == 'light':
-            fill_color = self._get_light_color(device)
-        else:
-            fill_color = color_on if device.is_on else color_off
-        
-        # Draw circle background
-        r = 30
-        circle = self.canvas.create_oval(
-            x - r, y - r, x + r, y + r,
-            fill=fill_color,
-            outline="black", width=2
-        )
-        
-        # Draw icon
-        icon_id = self.canvas.create_text(
-            x, y - 5, text=icon, font=("Arial", 24)
+        # Single image item from the shared sprite cache; keep the hover sprite when re-rendered
+        hover = self._hovered == ('device', device.device_id)
+        image_id = self.canvas.create_image(
+            x, y, image=self.sprites.get(device_type, state, bucket, hover=hover, size=2 * self.ICON_RADIUS)
         )
         
         # Draw label
         label_id = self.canvas.create_text(
-            x, y + r + 15, text=device.name,
+            x, y + self.ICON_RADIUS + 15, text=device.name,
             font=("Arial", 9)
         )
         
         # Store references
         self.device_icons[device.device_id] = {
-            'circle': circle,
-            'icon': icon_id,
+            'image': image_id,
             'label': label_id,
-            'color_on': color_on,
-            'color_off': color_off,
-            'device_type': device_type
+            'sprite': (state, bucket),
+            'device_type': device_type,
+            'pos': (x, y),
+            'name': device.name
         }
         
-        # Bind click events
-        self.canvas.tag_bind(circle, '<Button-1>', lambda e, did=device.device_id: self._on_device_click(did))
-        self.canvas.tag_bind(icon_id, '<Button-1>', lambda e, did=device.device_id: self._on_device_click(did))
-        self.canvas.tag_bind(label_id, '<Button-1>', lambda e, did=device.device_id: self._on_device_click(did))
+        self._index_hit(('device', device.device_id), self._device_bbox(x, y))
+    
+    def _device_bbox(self, x: int, y: int):
+        """Vùng click của icon thiết bị (vòng tròn + nhãn tên)."""
+        r = self.ICON_RADIUS
+        return (x - r, y - r, x + r, y + r + 25)
+    
+    def _index_hit(self, key, bbox):
+        """Thêm (hoặc cập nhật) vùng của 1 item vào chỉ mục hit-test.
+        
+        Args:
+            key: ('device', device_id) hoặc ('room', room)
+            bbox: Tuple (x1, y1, x2, y2) theo tọa độ canvas
+        """
+        self._drop_hit_cells(key)
+        x1, y1, x2, y2 = bbox
+        size = self.HIT_BUCKET
+        cells = [(cx, cy)
+                 for cx in range(int(x1 // size), int(x2 // size) + 1)
+                 for cy in range(int(y1 // size), int(y2 // size) + 1)]
+        for cell in cells:
+            self._hit_buckets.setdefault(cell, {})[key] = bbox
+        self._hit_cells[key] = cells
+    
+    def _unindex_hit(self, key):
+        """Xóa 1 item (đã bị xóa khỏi canvas) khỏi chỉ mục hit-test."""
+        self._drop_hit_cells(key)
+        if self._hovered == key:
+            self._hovered = None
+            self.canvas.config(cursor="")
+    
+    def _drop_hit_cells(self, key):
+        """Bỏ key khỏi các ô lưới đang chứa nó."""
+        for cell in self._hit_cells.pop(key, ()):
+            bucket = self._hit_buckets.get(cell)
+            if bucket is not None:
+                bucket.pop(key, None)
+                if not bucket:
+                    del self._hit_buckets[cell]
+    
+    def _hit_test(self, x: int, y: int):
+        """Tìm item tại điểm (x, y) trên canvas.
         
-        # Bind hover effects
-        self.canvas.tag_bind(circle, '<Enter>', lambda e, c=circle: self._on_hover_enter(c))
-        self.canvas.tag_bind(circle, '<Leave>', lambda e, c=circle: self._on_hover_leave(c))
-        self.canvas.tag_bind(icon_id, '<Enter>', lambda e, c=circle: self._on_hover_enter(c))
-        self.canvas.tag_bind(icon_id, '<Leave>', lambda e, c=circle: self._on_hover_leave(c))
+        Returns:
+            Key của item hoặc None
+        """
+        size = self.HIT_BUCKET
+        bucket = self._hit_buckets.get((int(x // size), int(y // size)))
+        if bucket:
+            for key, (x1, y1, x2, y2) in bucket.items():
+                if x1 <= x <= x2 and y1 <= y <= y2:
+                    return key
+        return None
+    
+    def _set_hovered(self, key):
+        """Đổi item đang hover - chỉ chạm vào item cũ và item mới."""
+        if key == self._hovered:
+            return
+        if self._hovered is not None:
+            self._highlight(self._hovered, 2)
+        if key is not None:
+            self._highlight(key, 4)
+        self.canvas.config(cursor="hand2" if key is not None else "")
+        self._hovered = key
     
-    def _on_hover_enter(self, circle_id):
-        """Xử lý khi hover vào thiết bị."""
-        self.canvas.itemconfig(circle_id, width=4)
-        self.canvas.config(cursor="hand2")
+    def _highlight(self, key, width: int):
+        """Đặt độ dày viền cho item (hiệu ứng hover)."""
+        kind, target = key
+        if kind == 'device' and target in self.device_icons:
+            icon_data = self.device_icons[target]
+            state, bucket = icon_data['sprite']
+            self.canvas.itemconfig(icon_data['image'], image=self.sprites.get(
+                icon_data['device_type'], state, bucket, hover=width > 2, size=2 * self.ICON_RADIUS))
+        elif kind == 'room' and target in self.room_tiles:
+            self.canvas.itemconfig(self.room_tiles[target]['rect'], width=width)
     
-    def _on_hover_leave(self, circle_id):
-        """Xử lý khi hover ra khỏi thiết bị."""
-        self.canvas.itemconfig(circle_id, width=2)
-        self.canvas.config(cursor="")
+    def _on_motion(self, event):
+        """Xử lý di chuột trên canvas (hover)."""
+        self._set_hovered(self._hit_test(event.x, event.y))
+    
+    def _on_click(self, event):
+        """Xử lý click trên canvas: mở popup thiết bị hoặc zoom vào phòng."""
+        key = self._hit_test(event.x, event.y)
+        if key is None:
+            return
+        kind, target = key
+        if kind == 'device':
+            self._on_device_click(target)
+        else:
+            self._zoom_to_room(target)
     
     def _on_device_click(self, device_id: str):
         """Xử lý khi click vào thiết bị.
@@ -470,11 +837,19 @@ class RoomCanvas(ttk.Frame):
         self._resize_timer = self.after(100, self.refresh)
     
     def update_device_icon(self, device_id: str):
-        """Cập nhật icon thiết bị.
+        """Cập nhật icon thiết bị (hoặc ô tổng hợp của phòng khi zoom nhỏ).
         
         Args:
             device_id: ID của thiết bị
         """
+        if self.room_tiles:
+            device = self.controller.get_device(device_id)
+            if device and device.room in self.room_tiles:
+                self._dirty_rooms.add(device.room)
+                if self._tile_update_pending is None:
+                    self._tile_update_pending = self.after_idle(self._flush_room_tiles)
+            return
+        
         if device_id not in self.device_icons:
             return
         
@@ -484,17 +859,24 @@ class RoomCanvas(ttk.Frame):
         
         icon_data = self.device_icons[device_id]
         
-        # Get color based on device type
-        if icon_data.get('device_type') == 'light':
-            color = self._get_light_color(device)
-        else:
-            color = icon_data['color_on'] if device.is_on else icon_data['color_off']
-        
-        self.canvas.itemconfig(icon_data['circle'], fill=color)
+        # Switch sprite only when the bucketed state changed
+        sprite = sprite_state(device, icon_data['device_type'])
+        if sprite != icon_data['sprite']:
+            icon_data['sprite'] = sprite
+            state, bucket = sprite
+            hover = self._hovered == ('device', device_id)
+            self.canvas.itemconfig(icon_data['image'], image=self.sprites.get(
+                icon_data['device_type'], state, bucket, hover=hover, size=2 * self.ICON_RADIUS))
     
     def refresh(self):
-        """Làm mới toàn bộ canvas."""
-        self.canvas.delete("all")
-        self.device_icons.clear()
-        self._draw_room()
+        """Làm mới canvas - chỉ cập nhật phần thay đổi (nền, vị trí, thiết bị thêm/xóa)."""
         self._place_devices()
+    
+    def _flush_room_tiles(self):
+        """Cập nhật nội dung các ô phòng có thiết bị thay đổi (gộp theo frame)."""
+        self._tile_update_pending = None
+        for room in self._dirty_rooms:
+            tile = self.room_tiles.get(room)
+            if tile:
+                self.canvas.itemconfig(tile['text'], text=self._room_tile_text(room))
+        self._dirty_rooms.clear()
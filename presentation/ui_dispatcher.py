@@ -0,0 +1,217 @@
+"""UI Dispatcher - Chuyển thông báo từ các thread nền về Tk thread."""
+
+import queue
+import weakref
+from typing import Dict, List
+from application.command_stream import CommandStream
+from application.device_controller import Observer
+from application.timer_manager import TimerObserver
+
+
+class TkObserverAdapter(Observer):
+    """Observer trung gian giữa controller và một observer chạy trên Tk thread.
+    
+    Controller có thể notify từ bất kỳ thread nào (VD: scheduler của timer),
+    nhưng Tk widget chỉ được phép truy cập từ Tk thread. Adapter này chỉ đẩy
+    sự kiện vào một queue thread-safe; Tk thread lấy ra theo từng frame qua
+    after(). Nhiều thay đổi của cùng một thiết bị trong một frame được gộp
+    thành một lần cập nhật widget.
+    """
+    
+    EVENT_UPDATE = "update"
+    EVENT_ADDED = "added"
+    EVENT_REMOVED = "removed"
+    
+    def __init__(self, widget, target: Observer, fps: int = 30):
+        """Khởi tạo adapter.
+        
+        Args:
+            widget: Tk widget dùng để lên lịch after() (thường là cửa sổ chính)
+            target: Observer nhận sự kiện trên Tk thread
+            fps: Số lần xử lý queue mỗi giây
+        """
+        self.widget = widget
+        self.target = target
+        self.frame_ms = max(1, 1000 // fps)
+        self._events = queue.SimpleQueue()
+        self._after_id = None
+        self._running = False
+    
+    # Observer Pattern Methods (gọi từ bất kỳ thread nào)
+    
+    def update(self, device_id: str):
+        """Đưa thay đổi của 1 thiết bị vào queue."""
+        self._events.put((self.EVENT_UPDATE, device_id))
+    
+    def update_batch(self, device_ids: List[str]):
+        """Đưa thay đổi của nhiều thiết bị vào queue (1 phần tử cho cả batch)."""
+        self._events.put((self.EVENT_UPDATE, list(device_ids)))
+    
+    def on_devices_added(self, device_ids: List[str]):
+        """Đưa sự kiện thêm thiết bị vào queue."""
+        self._events.put((self.EVENT_ADDED, list(device_ids)))
+    
+    def on_devices_removed(self, device_ids: List[str]):
+        """Đưa sự kiện xóa thiết bị vào queue."""
+        self._events.put((self.EVENT_REMOVED, list(device_ids)))
+    
+    # Tk thread
+    
+    def start(self):
+        """Bắt đầu xử lý queue theo frame (gọi trên Tk thread)."""
+        if not self._running:
+            self._running = True
+            self._after_id = self.widget.after(self.frame_ms, self._drain)
+    
+    def stop(self):
+        """Dừng xử lý queue."""
+        self._running = False
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+    
+    def _drain(self):
+        """Lấy hết sự kiện trong queue, gộp theo thiết bị rồi chuyển cho target."""
+        changed: Dict[str, None] = {}  # dict giữ thứ tự, loại trùng lặp
+        added: Dict[str, None] = {}
+        removed: Dict[str, None] = {}
+        
+        while True:
+            try:
+                kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            
+            if kind == self.EVENT_UPDATE:
+                if isinstance(payload, list):
+                    changed.update(dict.fromkeys(payload))
+                else:
+                    changed[payload] = None
+            elif kind == self.EVENT_ADDED:
+                added.update(dict.fromkeys(payload))
+                for device_id in payload:
+                    removed.pop(device_id, None)
+            elif kind == self.EVENT_REMOVED:
+                removed.update(dict.fromkeys(payload))
+                for device_id in payload:
+                    added.pop(device_id, None)
+        
+        try:
+            if removed:
+                self.target.on_devices_removed(list(removed))
+            if added:
+                self.target.on_devices_added(list(added))
+            if changed:
+                self.target.update_batch(list(changed))
+        except Exception as e:
+            print(f"❌ Lỗi khi cập nhật giao diện: {e}")
+        finally:
+            if self._running:
+                self._after_id = self.widget.after(self.frame_ms, self._drain)
+
+
+class TkTimerObserverAdapter(TimerObserver):
+    """TimerObserver trung gian, chuyển sự kiện timer về Tk thread theo frame.
+    
+    Sự kiện fired thường đến từ scheduler thread; adapter gộp các sự kiện
+    trong 1 frame và bỏ qua timer vừa thêm đã bị hủy/chạy ngay trong frame đó.
+    """
+    
+    def __init__(self, widget, target: TimerObserver, fps: int = 10):
+        """Khởi tạo adapter.
+        
+        Args:
+            widget: Tk widget dùng để lên lịch after()
+            target: TimerObserver nhận sự kiện trên Tk thread
+            fps: Số lần xử lý queue mỗi giây
+        """
+        self.widget = widget
+        self.target = target
+        self.frame_ms = max(1, 1000 // fps)
+        self._events = queue.SimpleQueue()
+        self._after_id = None
+        self._running = False
+    
+    # TimerObserver Methods (gọi từ bất kỳ thread nào)
+    
+    def on_timers_added(self, tasks):
+        """Đưa sự kiện đặt timer vào queue."""
+        self._events.put(('on_timers_added', list(tasks)))
+    
+    def on_timers_fired(self, tasks):
+        """Đưa sự kiện timer kích hoạt vào queue."""
+        self._events.put(('on_timers_fired', list(tasks)))
+    
+    def on_timers_cancelled(self, tasks):
+        """Đưa sự kiện hủy timer vào queue."""
+        self._events.put(('on_timers_cancelled', list(tasks)))
+    
+    # Tk thread
+    
+    def start(self):
+        """Bắt đầu xử lý queue theo frame (gọi trên Tk thread)."""
+        if not self._running:
+            self._running = True
+            self._after_id = self.widget.after(self.frame_ms, self._drain)
+    
+    def stop(self):
+        """Dừng xử lý queue."""
+        self._running = False
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+    
+    def _drain(self):
+        """Lấy hết sự kiện trong queue, gộp theo timer rồi chuyển cho target."""
+        added: Dict[str, object] = {}  # {timer_id: task}
+        removed: Dict[str, Dict[str, object]] = {'on_timers_fired': {}, 'on_timers_cancelled': {}}
+        
+        while True:
+            try:
+                event, tasks = self._events.get_nowait()
+            except queue.Empty:
+                break
+            
+            for task in tasks:
+                if event == 'on_timers_added':
+                    added[task.timer_id] = task
+                elif added.pop(task.timer_id, None) is None:
+                    # Target never saw this timer if it was added in the same frame
+                    removed[event][task.timer_id] = task
+        
+        try:
+            for event, tasks in removed.items():
+                if tasks:
+                    getattr(self.target, event)(list(tasks.values()))
+            if added:
+                self.target.on_timers_added(list(added.values()))
+        except Exception as e:
+            print(f"❌ Lỗi khi cập nhật danh sách timer: {e}")
+        finally:
+            if self._running:
+                self._after_id = self.widget.after(self.frame_ms, self._drain)
+
+
+_command_streams = weakref.WeakKeyDictionary()  # {Tk root: CommandStream}
+
+
+def get_command_stream(widget, controller) -> CommandStream:
+    """Lấy CommandStream dùng chung cho cửa sổ gốc của widget.
+    
+    Giá trị đang chờ được gửi qua after() nên lệnh luôn chạy trên Tk thread.
+    
+    Args:
+        widget: Widget bất kỳ trong ứng dụng
+        controller: DeviceController instance
+    
+    Returns:
+        CommandStream
+    """
+    root = widget.nametowidget('.')
+    stream = _command_streams.get(root)
+    if stream is None:
+        stream = _command_streams[root] = CommandStream(
+            controller, scheduler=lambda delay, callback: root.after(max(1, int(delay * 1000)), callback),
+            cancel=root.after_cancel
+        )
+    return stream
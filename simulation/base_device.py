@@ -1,10 +1,13 @@
 """Base Device - Abstract base class for all IoT devices."""
 
 from abc import ABC, abstractmethod
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Dict, Any
 
 
+LAST_UPDATE_EPOCH = datetime(1970, 1, 1)  # Mốc của last_update dạng số (snapshot)
+
+
 class BaseDevice(ABC):
     """Abstract base class cho tất cả thiết bị IoT.
     
@@ -26,6 +29,22 @@ class BaseDevice(ABC):
         self.is_on = False
         self.last_update = datetime.now()
     
+    @property
+    def last_update(self) -> datetime:
+        """Thời điểm cập nhật gần nhất.
+        
+        Thiết bị nạp từ snapshot giữ giá trị dạng số microsecond kể từ
+        1970-01-01 (giờ địa phương) và chỉ tạo datetime khi được đọc lần đầu.
+        """
+        if not isinstance(self._last_update, datetime):
+            self._last_update = LAST_UPDATE_EPOCH + timedelta(microseconds=self._last_update)
+        return self._last_update
+    
+    @last_update.setter
+    def last_update(self, value: datetime):
+        """Đặt thời điểm cập nhật."""
+        self._last_update = value
+    
     @abstractmethod
     def turn_on(self) -> bool:
         """Bật thiết bị.